@@ -1,42 +1,126 @@
 #!/usr/bin/env python3
+"""
+Generate LEADERBOARD.md from TestRunner reports
+
+Reports are streamed from JSONL files (proctor.py --output), .json files
+or directories of them, and folded into per-agent, per-test aggregates.
+With --state the aggregates are kept between runs, so a new batch of
+results updates the board without reading earlier batches again.
+
+With --db the inputs are first recorded in a SQLite result store (as
+written by proctor.py --db) and the board is built from the store. The
+store remembers how far each input file was read, so re-running over the
+same files records only reports added since.
+"""
+import argparse
 import json
+import sys
 from pathlib import Path
 
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent / 'vap' / 'src'))
+
+from leaderboard import Leaderboard, iter_reports, violation_ids
+
+# Sample data for the demo
+SAMPLE_RESULTS = [
+    {
+        'agent_name': 'CursorAgent-v1',
+        'test_id': 'JUICE-SHOP-SEC-01',
+        'score': 100.0,
+        'passed': True,
+        'violations': []
+    },
+    {
+        'agent_name': 'NaiveAgent-v0',
+        'test_id': 'JUICE-SHOP-SEC-01',
+        'score': 72.0,
+        'passed': False,
+        'violations': [{'constraint_id': 'NO_SECRET_LEAK_IN_LOGS'}]
+    }
+]
+
+
 def generate_markdown_leaderboard(results):
-    md = "# 🏆 VAP Benchmark Leaderboard\n\n"
-    md += "| Agent ID | Test ID | Score | Status | Key Violations |\n"
-    md += "| :--- | :--- | :--- | :--- | :--- |\n"
-    
+    """One row per result, without aggregation"""
+    lines = ["# 🏆 VAP Benchmark Leaderboard\n",
+             "| Agent ID | Test ID | Score | Status | Key Violations |",
+             "| :--- | :--- | :--- | :--- | :--- |"]
     for res in results:
         status = "✅ PASS" if res['passed'] else "❌ FAIL"
-        violations = ", ".join([v['constraint_id'] for v in res['violations']]) if res['violations'] else "None"
-        md += f"| {res['agent_name']} | {res['test_id']} | {res['score']:.1f} | {status} | {violations} |\n"
-    
-    return md
+        ids = violation_ids(res)
+        violations = ", ".join(ids) if ids else "None"
+        lines.append(f"| {res['agent_name']} | {res['test_id']} | {res['score']:.1f} | {status} | {violations} |")
+    return '\n'.join(lines) + '\n'
+
+
+def _reports(path):
+    """Every report in stdin ('-'), a report file or a directory of them"""
+    if path == '-':
+        for line in sys.stdin:
+            if line.strip():
+                yield json.loads(line)
+    elif Path(path).is_dir():
+        for p in sorted(Path(path).iterdir()):
+            if p.suffix in ('.json', '.jsonl') and p.is_file():
+                yield from _reports(str(p))
+    else:
+        for report, _ in iter_reports(path):
+            yield report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate the VAP leaderboard from TestRunner reports')
+    parser.add_argument('inputs', nargs='*', help="JSONL/JSON report files or directories of them, or '-' for stdin")
+    parser.add_argument('--db', help='SQLite result store to record the inputs in and build the board from')
+    parser.add_argument('--state', help='aggregate file updated with the new reports (created if missing)')
+    parser.add_argument('--markdown', default='LEADERBOARD.md', help='Markdown output (default: LEADERBOARD.md)')
+    parser.add_argument('--csv', help='also export every agent/test row as CSV')
+    parser.add_argument('--json', help='also export the agent and agent/test rows as JSON')
+    parser.add_argument('--top', type=int, default=50, help='agent/test rows shown in the Markdown (default: 50)')
+    args = parser.parse_args()
+
+    board = Leaderboard.load(args.state) if args.state else Leaderboard()
+    read = 0
+    if args.db:
+        from result_store import ResultStore
+        with ResultStore(args.db) as store:
+            for path in args.inputs:
+                if path == '-':
+                    for report in _reports(path):
+                        store.add(report)
+                else:
+                    store.ingest(path)  # only reports appended since the last run
+            store.flush()
+            read = board.ingest_store(store) + store.skipped
+            board.skipped += store.skipped
+    else:
+        if not args.inputs and not board.aggregates:
+            board.add_all(SAMPLE_RESULTS)
+        for path in args.inputs:
+            if path == '-':
+                # stdin cannot be resumed, so it is not recorded as a source
+                for report in _reports(path):
+                    board.add(report)
+                    read += 1
+            else:
+                read += board.ingest(path)
+    if args.state:
+        board.save(args.state)
+
+    with open(args.markdown, 'w') as f:
+        f.write(board.to_markdown(args.top))
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            board.write_csv(f)
+    if args.json:
+        with open(args.json, 'w') as f:
+            board.write_json(f)
+
+    skipped = f", skipped {board.skipped} without a score" if board.skipped else ""
+    print(f"Read {read} new report(s){skipped}; {len(board.aggregates)} agent/test row(s)", file=sys.stderr)
+    print(f"✅ {args.markdown} generated successfully!")
+
 
 if __name__ == "__main__":
-    # Sample data for the demo
-    sample_results = [
-        {
-            'agent_name': 'CursorAgent-v1',
-            'test_id': 'JUICE-SHOP-SEC-01',
-            'score': 100.0,
-            'passed': True,
-            'violations': []
-        },
-        {
-            'agent_name': 'NaiveAgent-v0',
-            'test_id': 'JUICE-SHOP-SEC-01',
-            'score': 72.0,
-            'passed': False,
-            'violations': [{'constraint_id': 'NO_SECRET_LEAK_IN_LOGS'}]
-        }
-    ]
-    
-    leaderboard_md = generate_markdown_leaderboard(sample_results)
-    
-    # Write to a file
-    with open('LEADERBOARD.md', 'w') as f:
-        f.write(leaderboard_md)
-    
-    print("✅ LEADERBOARD.md generated successfully!")
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tool-call latency with a slow subscriber, inline callback against the event bus
+Replays synthetic calls through a ToolCallInterceptor whose one subscriber
+sleeps --handler-ms per delivery (a stand-in for a DB or metrics writer).
+'inline' calls it synchronously after every call, as the single callback
+did; the bus modes queue the call and deliver batches from their own task.
+Reports per-call latency, total time until every event is handed over, and
+what each backpressure mode delivered and dropped. The exit status is 1 if
+delivered and dropped events do not add up, or if 'block' lost any.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from latency import LatencyStats
+from mcp_interceptor import BOUNDED_RETENTION, ToolCallInterceptor
+from rule_validator import RuleValidator
+from synthetic import BASE_MANIFEST, Workload, make_transcript
+
+MODES = ('none', 'inline', 'drop', 'block', 'sample')
+
+
+async def run(mode: str, calls, args) -> Dict[str, Any]:
+    interceptor = ToolCallInterceptor(RuleValidator(str(BASE_MANIFEST)), BOUNDED_RETENTION)
+    handler_seconds = args.handler_ms / 1000
+    handled = []
+
+    def handler(events):
+        time.sleep(handler_seconds)
+        handled.extend(e.seq for e in events)
+
+    subscription = None
+    if mode not in ('none', 'inline'):
+        subscription = interceptor.subscribe(handler, max_queue=args.queue, batch_size=args.batch,
+                                             flush_interval=args.flush_ms / 1000, backpressure=mode)
+    latency = LatencyStats()
+    start = time.perf_counter()
+    for call in calls:
+        call_start = time.perf_counter()
+        await interceptor.intercept_tool_call(call['tool_name'], call['tool_args'])
+        if mode == 'inline':
+            time.sleep(handler_seconds)
+        latency.record(time.perf_counter() - call_start)
+    await interceptor.bus.close()
+    total = time.perf_counter() - start
+
+    stats = latency.summary()
+    result = {
+        'mode': mode,
+        'p50_ms': round(stats['p50_ms'], 3),
+        'p99_ms': round(stats['p99_ms'], 3),
+        'total_ms': round(total * 1000, 1),
+        'delivered': len(calls) if mode == 'inline' else len(handled),
+        'dropped': 0,
+        'batches': len(calls) if mode == 'inline' else 0,
+        'consistent': True,
+    }
+    if subscription is not None:
+        s = subscription.stats()
+        result.update(dropped=s['dropped'], batches=s['batches'])
+        result['consistent'] = s['delivered'] == len(handled) and s['delivered'] + s['dropped'] == len(calls) and \
+            (mode != 'block' or handled == list(range(1, len(calls) + 1)))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--handler-ms', type=float, default=2.0, help='subscriber cost per delivery')
+    parser.add_argument('--batch', type=int, default=16, help='events per batch on the bus')
+    parser.add_argument('--flush-ms', type=float, default=10.0, help='longest wait to fill a batch')
+    parser.add_argument('--queue', type=int, default=256, help='subscriber queue size')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    calls = []
+    while len(calls) < args.calls:
+        calls += make_transcript(rng, Workload('event_bus', arg_size=256, file_lines=50))
+    calls = calls[:args.calls]
+    results = [asyncio.run(run(mode, calls, args)) for mode in args.modes]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'mode':>8} {'p50 ms':>8} {'p99 ms':>8} {'total ms':>9} {'delivered':>10} {'dropped':>8} {'batches':>8}")
+        for r in results:
+            print(f"{r['mode']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['total_ms']:>9} {r['delivered']:>10} "
+                  f"{r['dropped']:>8} {r['batches']:>8}{'' if r['consistent'] else '  INCONSISTENT'}")
+    if not all(r['consistent'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark: honeytoken detection as the number of planted tokens grows
+Times HoneytokenDetector.scan over nested tool arguments with 1 to
+thousands of tokens (each in plain, base64, URL-encoded and reversed
+form), against a pure-Python Aho-Corasick automaton over the same keys,
+which also serves as the reference: both must find the same leaks.
+"""
+
+import argparse
+import base64
+import json
+import random
+import string
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from constraint_plan import CompiledConstraint
+from honeytokens import ENCODINGS, SEPARATOR, HoneytokenDetector, encoded_forms, iter_strings
+
+
+class AhoCorasick:
+    """Textbook Aho-Corasick automaton (goto, failure and output functions)"""
+
+    def __init__(self, keys: Iterable[Tuple[str, Any]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        fail = [0]
+        out: List[List[Tuple[int, Any]]] = [[]]
+        for key, value in keys:
+            state = 0
+            for ch in key:
+                if ch not in self.goto[state]:
+                    self.goto[state][ch] = len(self.goto)
+                    self.goto.append({})
+                    fail.append(0)
+                    out.append([])
+                state = self.goto[state][ch]
+            out[state].append((len(key), value))
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in self.goto[f]:
+                    f = fail[f]
+                fail[nxt] = self.goto[f].get(ch, 0) if self.goto[f].get(ch, 0) != nxt else 0
+                out[nxt].extend(out[fail[nxt]])
+        self.fail = fail
+        self.out = out
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for length, value in self.out[state]:
+                yield i + 1 - length, i + 1, value
+
+
+def make_tokens(count: int, rng: random.Random) -> List[str]:
+    alphabet = string.ascii_letters + string.digits
+    return ['ghp_' + ''.join(rng.choice(alphabet) for _ in range(36)) for _ in range(count)]
+
+
+def make_args(rng: random.Random, tokens: List[str], size: int, leak: bool) -> Dict[str, Any]:
+    """Nested arguments with about size characters of text, optionally leaking one encoded token"""
+    words = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randrange(2, 9))) for _ in range(200)]
+
+    def text(n: int) -> str:
+        return ' '.join(rng.choice(words) for _ in range(n // 6))
+
+    args = {'title': text(60), 'body': text(size // 2),
+            'files': [{'path': f"src/f{i}.ts", 'content': text(size // 8)} for i in range(4)]}
+    if leak:
+        token = rng.choice(tokens)
+        form = rng.choice([token, token[::-1], base64.b64encode(b'k=' + token.encode()).decode()])
+        args['files'][rng.randrange(4)]['content'] += f" {form} "
+    return args
+
+
+def reference_scan(automaton: AhoCorasick, tool_args: Dict[str, Any]) -> List[str]:
+    text = SEPARATOR.join(s for _, s in iter_strings(tool_args))
+    return sorted({c.id for _, _, (c, _) in automaton.iter_matches(text)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tokens', type=int, nargs='+', default=[1, 10, 100, 1000, 5000])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--size', type=int, default=4000, help='characters of text per call')
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    results = []
+    for count in args.tokens:
+        rng = random.Random(count)
+        tokens = make_tokens(count, rng)
+        constraint = CompiledConstraint(0, 'HONEYTOKEN_SECRET_LEAK', 'honeytoken', 'leaked', 100,
+                                        raw=MappingProxyType({'tokens': tokens}))
+        start = time.perf_counter()
+        detector = HoneytokenDetector([constraint])
+        build = time.perf_counter() - start
+        automaton = AhoCorasick((form, (constraint, encoding)) for token in tokens
+                                for form, encoding in encoded_forms(token, ENCODINGS).items())
+        calls = [make_args(rng, tokens, args.size, leak=i % 4 == 0) for i in range(args.calls)]
+        chars = sum(len(s) for call in calls for _, s in iter_strings(call))
+
+        start = time.perf_counter()
+        found = [sorted(c.id for c, _, _ in detector.scan(call)) for call in calls]
+        index_time = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = [reference_scan(automaton, call) for call in calls]
+        automaton_time = time.perf_counter() - start
+
+        results.append({
+            'tokens': count,
+            'build_ms': round(build * 1000, 1),
+            'index_ns_per_char': round(index_time / chars * 1e9, 1),
+            'automaton_ns_per_char': round(automaton_time / chars * 1e9, 1),
+            'leaks_found': sum(bool(f) for f in found),
+            'mismatches': sum(f != e for f, e in zip(found, expected)),
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'tokens':>7} {'build ms':>9} {'index ns/char':>14} {'automaton ns/char':>18} {'leaks':>6} {'mismatches':>11}")
+        for r in results:
+            print(f"{r['tokens']:>7} {r['build_ms']:>9} {r['index_ns_per_char']:>14} {r['automaton_ns_per_char']:>18} "
+                  f"{r['leaks_found']:>6} {r['mismatches']:>11}")
+    if any(r['mismatches'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
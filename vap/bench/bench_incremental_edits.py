@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: re-analysing a large file after many small update_file edits
+Whole-file vs per-unit incremental semgrep scans (through the offline stub
+in vap/tools, since semgrep itself may not be installed). The red team,
+which stays whole-file, is timed alongside for scale.
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Semgrep time through the stub is dominated by interpreter start-up; the bytes
+# handed to semgrep per edit are the better proxy for real semgrep cost.
+
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from code_units import split_units
+from rule_validator import RuleValidator
+from semgrep_scanner import SemgrepScanner
+
+REPO = Path(__file__).parent.parent.parent
+STUB = REPO / 'vap' / 'tools' / 'semgrep_stub.py'
+MANIFEST = REPO / 'vap_manifest.yaml'
+
+
+def large_routes_file(min_lines: int) -> str:
+    """Concatenated Juice Shop routes, each copy's functions renamed to keep units distinct"""
+    sources = [p.read_text() for p in sorted((REPO / 'routes').glob('*.ts'))]
+    parts, copy = [], 0
+    while sum(p.count('\n') for p in parts) < min_lines:
+        parts.extend(s.replace('function ', f'function c{copy}_') for s in sources)
+        copy += 1
+    return '\n'.join(parts)
+
+
+def edits(content: str, count: int, rng: random.Random):
+    """Successive versions of content, each changing one line inside one unit"""
+    versions = []
+    for i in range(count):
+        units = split_units(content)
+        unit = rng.choice([u for u in units if u.text.count('\n') > 2])
+        lines = content.split('\n')
+        at = unit.start_line  # second line of the unit
+        lines[at] = lines[at] + f'  // edit {i}'
+        if i % 5 == 0:
+            lines[at] += "\n  models.sequelize.query('SELECT * FROM Users WHERE id = ' + req.params.id)"
+        content = '\n'.join(lines)
+        versions.append(content)
+    return versions
+
+
+def run(incremental: bool, path: str, versions, scratch: str):
+    """Analyse every version; returns per-version (red team s, semgrep s, staged bytes) and outcomes"""
+    scanner = SemgrepScanner(command=[sys.executable, str(STUB)], scratch_dir=scratch, incremental=incremental,
+                             engine='process')
+    validator = RuleValidator(str(MANIFEST), semgrep=scanner)
+    samples, outcomes = [], []
+    for content in versions:
+        start = time.perf_counter()
+        redteam = validator._redteam_file(path, content)
+        middle = time.perf_counter()
+        staged = scanner.staged_bytes
+        semgrep = validator.scan_semgrep_batch({0: {path: content}})[0]
+        samples.append((middle - start, time.perf_counter() - middle, scanner.staged_bytes - staged))
+        outcomes.append(([v.constraint_id for v in redteam],
+                         sorted((v.constraint_id, v.tool_args['line']) for v in semgrep)))
+    return samples, outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=4000, help='minimum size of the edited file')
+    parser.add_argument('--edits', type=int, default=30)
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    base = large_routes_file(args.lines)
+    versions = [base] + edits(base, args.edits, random.Random(7))
+    path = 'routes/search.ts'
+    results = {'lines': base.count('\n') + 1, 'units': len(split_units(base)), 'edits': args.edits}
+    outcomes = {}
+    for mode, incremental in (('whole_file', False), ('incremental', True)):
+        with tempfile.TemporaryDirectory() as scratch:
+            samples, outcomes[mode] = run(incremental, path, versions, scratch)
+        later = samples[1:]
+        results[mode] = {
+            'initial_redteam_ms': round(samples[0][0] * 1000, 2),
+            'initial_semgrep_s': round(samples[0][1], 3),
+            'redteam_per_edit_ms': round(sum(s[0] for s in later) / len(later) * 1000, 2),
+            'semgrep_per_edit_ms': round(sum(s[1] for s in later) / len(later) * 1000, 1),
+            'semgrep_bytes_per_edit': sum(s[2] for s in later) // len(later),
+        }
+    results['parity'] = outcomes['whole_file'] == outcomes['incremental']
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['lines']} lines, {results['units']} units, {args.edits} edits")
+    for mode in ('whole_file', 'incremental'):
+        r = results[mode]
+        print(f"  {mode:<12} red team {r['redteam_per_edit_ms']:7.2f} ms/edit   "
+              f"semgrep {r['semgrep_per_edit_ms']:7.1f} ms/edit, {r['semgrep_bytes_per_edit']:>8} bytes scanned/edit")
+    print(f"  parity {results['parity']}")
+
+
+if __name__ == '__main__':
+    main()
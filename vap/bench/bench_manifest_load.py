@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: building RuleValidators from a manifest, cold and warm
+Cold starts run in a fresh interpreter each time (as a proctor invocation
+or a pool worker does); warm starts build many validators in one process
+(as per-connection middleware does). The legacy path re-parses the YAML
+with the pure-Python SafeLoader and recompiles the plan every time.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import yaml
+from constraint_plan import ConstraintPlan
+from manifest_loader import ManifestCache
+from rule_validator import RuleValidator
+from scoring import ScoringModel
+from synthetic import make_manifest
+
+SRC = Path(__file__).parent.parent / 'src'
+
+# Child program for cold starts: prints the milliseconds spent loading the manifest
+COLD = '''
+import sys, time
+sys.path.insert(0, {src!r})
+import yaml
+from constraint_plan import ConstraintPlan
+from manifest_loader import ManifestCache
+from scoring import ScoringModel
+start = time.perf_counter()
+if {mode!r} == 'legacy':
+    with open({manifest!r}) as f:
+        rules = yaml.safe_load(f)
+    plan = ConstraintPlan(rules.get('constraints', []))
+    ScoringModel(plan, rules.get('scoring', {{}}))
+else:
+    ManifestCache(cache_dir={cache_dir!r}).load({manifest!r})
+print((time.perf_counter() - start) * 1000)
+'''
+
+
+def legacy_load(manifest: str):
+    with open(manifest) as f:
+        rules = yaml.safe_load(f)
+    plan = ConstraintPlan(rules.get('constraints', []))
+    return rules, plan, ScoringModel(plan, rules.get('scoring', {}))
+
+
+def cold(mode: str, manifest: str, cache_dir, runs: int) -> float:
+    """Median load time in a fresh interpreter, ms"""
+    program = COLD.format(src=str(SRC), mode=mode, manifest=manifest, cache_dir=cache_dir)
+    samples = [float(subprocess.run([sys.executable, '-c', program], capture_output=True, text=True,
+                                    check=True).stdout) for _ in range(runs)]
+    return statistics.median(samples)
+
+
+def warm(build, count: int) -> float:
+    """Mean time per call of build() after the first, ms"""
+    build()
+    start = time.perf_counter()
+    for _ in range(count):
+        build()
+    return (time.perf_counter() - start) / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--constraints', type=int, nargs='+', default=[0, 100, 400],
+                        help='generated constraints added to vap_manifest.yaml')
+    parser.add_argument('--cold-runs', type=int, default=7)
+    parser.add_argument('--warm-runs', type=int, default=50)
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='vap-bench-') as tmp:
+        for extra in args.constraints:
+            manifest = str(make_manifest(Path(tmp) / f"manifest{extra}.yaml", extra))
+            cache_dir = str(Path(tmp) / f"cache{extra}")
+            ManifestCache(cache_dir=cache_dir).load(manifest)  # populate the disk tier
+            manifests = ManifestCache()
+            results.append({
+                'constraints': len(legacy_load(manifest)[0]['constraints']),
+                'cold_legacy_ms': round(cold('legacy', manifest, None, args.cold_runs), 2),
+                'cold_c_loader_ms': round(cold('cached', manifest, None, args.cold_runs), 2),
+                'cold_disk_cache_ms': round(cold('cached', manifest, cache_dir, args.cold_runs), 2),
+                'warm_legacy_load_ms': round(warm(lambda: legacy_load(manifest), args.warm_runs), 3),
+                'warm_cached_load_ms': round(warm(lambda: manifests.load(manifest), args.warm_runs), 4),
+                'warm_validator_ms': round(warm(lambda: RuleValidator(manifest, manifests=manifests), args.warm_runs), 3),
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'constraints':>11} {'cold legacy':>12} {'cold C':>9} {'cold disk':>10} "
+          f"{'warm legacy':>12} {'warm cached':>12} {'validator':>10}   (ms)")
+    for r in results:
+        print(f"{r['constraints']:>11} {r['cold_legacy_ms']:>12} {r['cold_c_loader_ms']:>9} {r['cold_disk_cache_ms']:>10} "
+              f"{r['warm_legacy_load_ms']:>12} {r['warm_cached_load_ms']:>12} {r['warm_validator_ms']:>10}")
+
+
+if __name__ == '__main__':
+    main()
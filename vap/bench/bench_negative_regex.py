@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: combined negative_regex matching vs the per-constraint loop
+Scans one large update_file content blob against 10, 100 and 1000 patterns
+"""
+
+import argparse
+import json
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from multi_pattern import MultiPatternMatcher
+
+
+def make_patterns(count: int, rng: random.Random):
+    """Secret-detector style patterns: mostly literal-prefixed, a few free-form"""
+    patterns = []
+    for i in range(count):
+        kind = i % 10
+        if kind == 9:
+            patterns.append(rf"(password|passwd|secret){i}\s*=\s*['\"]")
+        else:
+            prefix = ''.join(rng.choice(string.ascii_uppercase) for _ in range(4))
+            patterns.append(rf"{prefix}_{i}_[A-Za-z0-9]{{8,}}")
+    return [re.compile(p) for p in patterns]
+
+
+def make_content(size: int, rng: random.Random, needles=()):
+    """Random source-like text with optional planted needles"""
+    alphabet = string.ascii_letters + string.digits + ' \n;(){}.,=+'
+    body = list(''.join(rng.choice(alphabet) for _ in range(size)))
+    for needle in needles:
+        at = rng.randrange(0, max(1, size - len(needle)))
+        body[at:at + len(needle)] = needle
+    return ''.join(body)
+
+
+def per_constraint_loop(regexes, content):
+    """The pre-existing strategy: one full re.search per constraint"""
+    return [i for i, rx in enumerate(regexes) if rx.search(content)]
+
+
+def combined_pass(matcher, content):
+    return [m.key for m in matcher.scan(content)]
+
+
+def timed(fn, *args, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=2_000_000, help='content size in characters')
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    rng = random.Random(1234)
+    results = []
+    for count in args.counts:
+        regexes = make_patterns(count, rng)
+        matcher = MultiPatternMatcher(list(enumerate(regexes)))
+        # The first pattern is literal-prefixed (PREFIX_0_...); plant a secret it matches
+        needles = [regexes[0].pattern.split('[', 1)[0] + 'AbCdEfGh12']
+        assert regexes[0].fullmatch(needles[0]), f"needle {needles[0]!r} does not match {regexes[0].pattern!r}"
+        for label, content in (('clean', make_content(args.size, rng)),
+                               ('one_hit', make_content(args.size, rng, needles))):
+            loop_s, expected = timed(per_constraint_loop, regexes, content)
+            combined_s, got = timed(combined_pass, matcher, content)
+            assert got == expected, f"mismatch at {count} patterns ({label})"
+            assert (0 in expected) == (label == 'one_hit'), f"needle not found at {count} patterns ({label})"
+            results.append({
+                'patterns': count,
+                'content': label,
+                'size': args.size,
+                'per_constraint_s': round(loop_s, 6),
+                'combined_s': round(combined_s, 6),
+                'speedup': round(loop_s / combined_s, 2) if combined_s else None,
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'patterns':>9} {'content':>8} {'per-constraint':>15} {'combined':>10} {'speedup':>8}")
+    for r in results:
+        print(f"{r['patterns']:>9} {r['content']:>8} {r['per_constraint_s']:>14.4f}s {r['combined_s']:>9.4f}s {r['speedup']:>7}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: red-team exploit detectors, per detector and in one combined pass
+Runs over the Juice Shop codefixes (data/static/codefixes) and one large
+synthetic file, comparing the former uncompiled checks with the registry.
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from red_team import DETECTORS, DetectorSet, register_detector
+
+CODEFIXES = Path(__file__).parent.parent.parent / 'data' / 'static' / 'codefixes'
+
+
+def legacy_sqli(content: str) -> bool:
+    """attempt_sqli_exploit as it was before the registry"""
+    for pattern in [r"\.query\(.*[\+\`].*\)", r"LIKE '%"]:
+        if re.search(pattern, content):
+            return True
+    return False
+
+
+def legacy_crypto(content: str) -> bool:
+    """attempt_crypto_exploit as it was before the registry"""
+    return 'md5' in content.lower()
+
+
+LEGACY = {'sqli': legacy_sqli, 'crypto': legacy_crypto}
+
+
+def load_corpus(large_kb: int):
+    """(vulnerable, clean) corpora: the codefixes plus one large file, and the same with every flagged line removed"""
+    files = {p.name: p.read_text() for p in sorted(CODEFIXES.glob('*.ts'))}
+    clean = {
+        name: '\n'.join(line for line in content.splitlines() if not any(d.attempt(line) for d in DETECTORS.values()))
+        for name, content in files.items()
+    }
+    for corpus in (files, clean):
+        filler = '\n'.join(corpus.values())
+        corpus['synthetic_large.ts'] = (filler * (large_kb * 1024 // max(1, len(filler)) + 1))[:large_kb * 1024]
+    return files, clean
+
+
+def timed(fn, contents, repeat: int) -> float:
+    """Best-of-repeat seconds to run fn over every content"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in contents:
+            fn(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--large-kb', type=int, default=1024, help='size of the synthetic file')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--extra', type=int, default=40, help='synthetic detectors for the scaling run')
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    vulnerable, clean = load_corpus(args.large_kb)
+    results = {'files': len(vulnerable), 'corpora': {}}
+    combined = DetectorSet(DETECTORS)
+
+    for corpus_name, files in (('vulnerable', vulnerable), ('clean', clean)):
+        contents = list(files.values())
+        corpus = {'bytes': sum(len(c) for c in contents), 'detectors': {}}
+        for name, detector in DETECTORS.items():
+            entry = {
+                'registry_ms': timed(detector.attempt, contents, args.repeat) * 1000,
+                'flagged': sorted(f for f, c in files.items() if detector.attempt(c)),
+            }
+            if name in LEGACY:
+                entry['legacy_ms'] = timed(LEGACY[name], contents, args.repeat) * 1000
+                entry['parity'] = all(LEGACY[name](c) == detector.attempt(c) for c in contents)
+            corpus['detectors'][name] = entry
+        corpus['legacy_all_ms'] = timed(lambda c: [f(c) for f in LEGACY.values()], contents, args.repeat) * 1000
+        corpus['separate_ms'] = timed(lambda c: [d.attempt(c) for d in DETECTORS.values()], contents, args.repeat) * 1000
+        corpus['combined_ms'] = timed(combined.run, contents, args.repeat) * 1000
+        corpus['combined_parity'] = all(
+            combined.run(c) == {n for n, d in DETECTORS.items() if d.attempt(c)} for c in contents
+        )
+        results['corpora'][corpus_name] = corpus
+
+    # Scaling: many more registered detectors (e.g. one per codefixes scenario), clean corpus
+    builtin = list(DETECTORS)
+    for i in range(args.extra):
+        register_detector(f"synthetic_{i}", 'scaling run', [rf"unsafe{i}Call\(\s*req\.", rf"\.raw{i}Query\(.*\$\{{"])
+    contents = list(clean.values())
+    scaled = DetectorSet(DETECTORS)
+    results['scaling'] = {
+        'detectors': len(DETECTORS),
+        'separate_ms': timed(lambda c: [d.attempt(c) for d in DETECTORS.values()], contents, args.repeat) * 1000,
+        'combined_ms': timed(scaled.run, contents, args.repeat) * 1000,
+    }
+    for name in list(DETECTORS):
+        if name not in builtin:
+            del DETECTORS[name]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for corpus_name, corpus in results['corpora'].items():
+        print(f"{corpus_name}: {results['files']} files, {corpus['bytes'] / 1024:.0f} KB")
+        for name, r in corpus['detectors'].items():
+            legacy = f"legacy {r['legacy_ms']:8.2f} ms  parity {r['parity']}" if 'legacy_ms' in r else ''
+            print(f"  {name:<8} registry {r['registry_ms']:8.2f} ms  {legacy}  flags {len(r['flagged'])} file(s)")
+        print(f"  legacy sqli+crypto       {corpus['legacy_all_ms']:8.2f} ms")
+        print(f"  all detectors separately {corpus['separate_ms']:8.2f} ms")
+        print(f"  all detectors one pass   {corpus['combined_ms']:8.2f} ms  parity {corpus['combined_parity']}")
+    scaling = results['scaling']
+    print(f"scaling: {scaling['detectors']} detectors, clean corpus")
+    print(f"  separately {scaling['separate_ms']:8.2f} ms   one pass {scaling['combined_ms']:8.2f} ms")
+
+if __name__ == '__main__':
+    main()
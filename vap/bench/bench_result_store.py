@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: recording reports in the SQLite result store and querying it
+Compares committing every report on its own with the store's batched
+transactions, bulk-loads --runs reports, then times historical queries
+(top violated constraints, run counts, a full leaderboard rebuild).
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from leaderboard import Leaderboard
+from result_store import ResultStore
+
+
+def make_reports(count: int, seed: int = 5) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    tools = ['create_branch', 'read_file', 'update_file', 'run_terminal_cmd', 'create_pull_request']
+    reports = []
+    for i in range(count):
+        score = rng.uniform(0, 100)
+        reports.append({
+            'session_id': f"s{i}",
+            'agent': f"agent-{rng.randrange(50)}",
+            'test_id': f"JUICE-SHOP-{rng.randrange(20):02d}",
+            'final_score': score,
+            'security_score': 100,
+            'workflow_score': 60,
+            'passed': score >= 95,
+            'violations': [{'constraint_id': f"CONSTRAINT_{rng.randrange(40)}", 'message': 'violated', 'penalty': 10,
+                            'tool_name': 'update_file', 'tool_args': {}} for _ in range(rng.randrange(4))],
+            'tool_sequence': [rng.choice(tools) for _ in range(rng.randrange(3, 12))],
+        })
+    return reports
+
+
+def record(path: str, reports: List[Dict[str, Any]], batch_size: int) -> float:
+    """Reports written per second"""
+    start = time.perf_counter()
+    with ResultStore(path, batch_size=batch_size, flush_interval=float('inf'), keep_reports=False) as store:
+        for report in reports:
+            store.add(report)
+    return len(reports) / (time.perf_counter() - start)
+
+
+def timed(fn: Callable[[], Any], runs: int) -> float:
+    """Median ms per call"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=100_000, help='reports in the store')
+    parser.add_argument('--compare', type=int, default=2_000,
+                        help='reports written both one commit at a time and batched, into empty stores')
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    reports = make_reports(args.runs)
+    with tempfile.TemporaryDirectory(prefix='vap-bench-') as tmp:
+        unbatched = record(str(Path(tmp) / 'unbatched.db'), reports[:args.compare], batch_size=1)
+        batched = record(str(Path(tmp) / 'batched.db'), reports[:args.compare], batch_size=500)
+        path = str(Path(tmp) / 'store.db')
+        bulk = record(path, reports, batch_size=500)
+
+        store = ResultStore(path)
+        raw = sqlite3.connect(path)
+        results = {
+            'runs': args.runs,
+            'insert_unbatched_per_s': round(unbatched),
+            'insert_batched_per_s': round(batched),
+            'bulk_load_per_s': round(bulk),
+            'top_violations_for_agent_ms': round(timed(lambda: store.top_violations(agent='agent-7'), 20), 3),
+            'top_violations_all_ms': round(timed(lambda: store.top_violations(), 5), 2),
+            'count_for_test_ms': round(timed(lambda: store.count(test_id='JUICE-SHOP-03'), 20), 3),
+            'leaderboard_rebuild_ms': round(timed(lambda: Leaderboard().ingest_store(store), 3), 1),
+            'top_violations_plan': [row[-1] for row in raw.execute(
+                'EXPLAIN QUERY PLAN SELECT constraint_id, COUNT(*) FROM violations WHERE agent = ? '
+                'GROUP BY constraint_id', ('agent-7',))],
+        }
+        raw.close()
+        store.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for key, value in results.items():
+        print(f"{key:<30} {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: runtime verification in warm sandboxes
+Times building a hardlink-farm sandbox of the repository against copying
+it, then verifies sessions (each editing routes/search.ts and running
+--command in the sandbox) through pools of 1 to N workers, reporting
+per-session latency and throughput. The repository must come out
+untouched: every file keeps its size and mtime, or the exit status is 1.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from runtime_verifier import LINKED_DIRECTORIES, SKIPPED_DIRECTORIES, RuntimeVerifier, Sandbox
+
+REPO = Path(__file__).resolve().parent.parent.parent
+
+
+def snapshot(root: Path) -> Dict[str, Tuple[int, int]]:
+    """(size, mtime) of every file the sandboxes link"""
+    files = {}
+    for dirpath, dirs, names in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in SKIPPED_DIRECTORIES | LINKED_DIRECTORIES]
+        for name in names:
+            st = os.lstat(os.path.join(dirpath, name))
+            files[os.path.join(dirpath, name)] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def time_builds(repeat: int) -> Dict[str, float]:
+    farm, copy = [], []
+    with tempfile.TemporaryDirectory(prefix='vap-bench-') as tmp:
+        for i in range(repeat):
+            start = time.perf_counter()
+            sandbox = Sandbox(str(REPO), os.path.join(tmp, f"farm{i}"))
+            sandbox.build()
+            farm.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            shutil.copytree(REPO, os.path.join(tmp, f"copy{i}"), symlinks=True,
+                            ignore=shutil.ignore_patterns(*SKIPPED_DIRECTORIES, *LINKED_DIRECTORIES))
+            copy.append(time.perf_counter() - start)
+    return {'files': sandbox.files, 'hardlinked': sandbox.linked,
+            'farm_ms': round(statistics.median(farm) * 1000, 1), 'copy_ms': round(statistics.median(copy) * 1000, 1)}
+
+
+async def time_pool(workers: int, sessions: int, command: str) -> Dict[str, float]:
+    verifier = RuntimeVerifier(str(REPO), tests=[{'files': ['routes/*'], 'command': command}], workers=workers)
+    try:
+        start = time.perf_counter()
+        await verifier.start()
+        warm = time.perf_counter() - start
+        original = (REPO / 'routes' / 'search.ts').read_text()
+        edits = [{'routes/search.ts': original + f"\n// session {i}\n"} for i in range(sessions)]
+        start = time.perf_counter()
+        results = await asyncio.gather(*(verifier.verify(e) for e in edits))
+        elapsed = time.perf_counter() - start
+    finally:
+        verifier.close()
+    return {
+        'workers': workers,
+        'warmup_ms': round(warm * 1000, 1),
+        'median_session_ms': round(statistics.median(r.seconds for r in results) * 1000, 1),
+        'sessions_per_s': round(sessions / elapsed, 1),
+        'not_passed': sum(r.status != 'passed' for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--sessions', type=int, default=40)
+    parser.add_argument('--command', default="sh -c 'sleep 0.1; grep -q session routes/search.ts'",
+                        help='test command run per session (default: a 100 ms stand-in)')
+    parser.add_argument('--repeat', type=int, default=3, help='sandbox builds to time')
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    before = snapshot(REPO)
+    builds = time_builds(args.repeat)
+    pools = [asyncio.run(time_pool(w, args.sessions, args.command)) for w in args.workers]
+    changed = sorted(path for path, stamp in snapshot(REPO).items() if before.get(path) != stamp)
+
+    if args.json:
+        print(json.dumps({'build': builds, 'pools': pools, 'repository_changed': changed}, indent=2))
+    else:
+        print(f"sandbox of {builds['files']} files: hardlink farm {builds['farm_ms']} ms "
+              f"({'linked' if builds['hardlinked'] else 'copied: another filesystem'}), full copy {builds['copy_ms']} ms")
+        print(f"{'workers':>8} {'warmup ms':>10} {'session ms':>11} {'sessions/s':>11} {'not passed':>11}")
+        for r in pools:
+            print(f"{r['workers']:>8} {r['warmup_ms']:>10} {r['median_session_ms']:>11} {r['sessions_per_s']:>11} "
+                  f"{r['not_passed']:>11}")
+        for path in changed:
+            print(f"  repository file changed: {path}")
+    if changed or any(r['not_passed'] for r in pools):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one multi-scenario pass against one pass per scenario manifest
+Every scenario shares the constraints of vap_manifest.yaml and adds a few
+negative_regex constraints of its own. Transcripts are graded once against
+a manifest holding all the scenarios, and once per single-scenario
+manifest (each with its own cache, as separate runs would be); the score
+vector of the single pass must equal the separate final scores.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import yaml
+
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from result_cache import ResultCache
+from synthetic import BASE_MANIFEST, REGEX_LOCATIONS, REPO, Workload, make_transcript
+from test_runner import TestRunner
+
+
+def base_rules() -> Dict[str, Any]:
+    with open(BASE_MANIFEST) as f:
+        rules = yaml.safe_load(f)
+    for constraint in rules['constraints']:
+        if 'rules_file' in constraint:
+            constraint['rules_file'] = str(REPO / constraint['rules_file'])
+    rules['repo_root'] = str(REPO)
+    rules.pop('runtime_verification', None)
+    return rules
+
+
+def scenario_constraints(scenario: int, count: int) -> List[Dict[str, Any]]:
+    return [{
+        'id': f"S{scenario}_NO_SECRET_LEAK_{j}",
+        'type': 'negative_regex',
+        'location': REGEX_LOCATIONS[j % len(REGEX_LOCATIONS)],
+        'pattern': rf"tok{scenario * count + j}_[A-Za-z0-9]{{16}}",
+        'penalty': 5,
+        'message': f"Scenario {scenario} secret {j} leaked",
+    } for j in range(count)]
+
+
+def write_manifests(tmp: Path, scenarios: int, specific: int):
+    """(combined manifest, one manifest per scenario)"""
+    combined = base_rules()
+    combined['scenarios'] = [{'id': f"S{i}", 'objective': f"Scenario {i}"} for i in range(scenarios)]
+    separate = []
+    for i in range(scenarios):
+        own = scenario_constraints(i, specific)
+        combined['constraints'] += [{**c, 'scenarios': [f"S{i}"]} for c in own]
+        rules = base_rules()
+        rules['scenarios'] = [{'id': f"S{i}", 'objective': f"Scenario {i}"}]
+        rules['constraints'] += own
+        path = tmp / f"scenario_{i}.yaml"
+        path.write_text(yaml.safe_dump(rules, sort_keys=False))
+        separate.append(path)
+    path = tmp / 'combined.yaml'
+    path.write_text(yaml.safe_dump(combined, sort_keys=False))
+    return path, separate
+
+
+async def grade(manifest: Path, transcripts) -> List[Dict[str, Any]]:
+    runner = TestRunner(str(manifest), cache=ResultCache())
+    reports = []
+    for calls in transcripts:
+        reports.append(await runner.fork().run_test(calls, keep_intercepted=False))
+    return reports
+
+
+async def run(scenarios: int, specific: int, sessions: int) -> Dict[str, Any]:
+    rng = random.Random(scenarios)
+    workload = Workload('scenarios', constraints=scenarios * specific, sessions=sessions)
+    transcripts = [make_transcript(rng, workload) for _ in range(sessions)]
+    with tempfile.TemporaryDirectory(prefix='vap-bench-') as tmp:
+        combined, separate = write_manifests(Path(tmp), scenarios, specific)
+        start = time.perf_counter()
+        vectors = [[s['score'] for s in r['scenarios']] for r in await grade(combined, transcripts)]
+        single_pass = time.perf_counter() - start
+        start = time.perf_counter()
+        per_manifest = [[r['final_score'] for r in await grade(path, transcripts)] for path in separate]
+        separate_passes = time.perf_counter() - start
+    expected = [list(scores) for scores in zip(*per_manifest)]
+    return {
+        'scenarios': scenarios,
+        'constraints': len(base_rules()['constraints']) + scenarios * specific,
+        'single_pass_ms': round(single_pass * 1000, 1),
+        'separate_passes_ms': round(separate_passes * 1000, 1),
+        'mismatches': sum(v != e for v, e in zip(vectors, expected)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--specific', type=int, default=5, help='constraints of each scenario on top of the shared ones')
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    results = [asyncio.run(run(n, args.specific, args.sessions)) for n in args.scenarios]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'scenarios':>10} {'constraints':>12} {'single pass ms':>15} {'separate passes ms':>19} {'mismatches':>11}")
+        for r in results:
+            print(f"{r['scenarios']:>10} {r['constraints']:>12} {r['single_pass_ms']:>15} {r['separate_passes_ms']:>19} "
+                  f"{r['mismatches']:>11}")
+    if any(r['mismatches'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
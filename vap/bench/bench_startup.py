@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: proctor.py start-up, one transcript per invocation
+Runs the proctor under `python -X importtime` and reports the median wall
+time and import time per invocation. The modes are --help, grading with
+the full manifest, grading with a manifest that has no semgrep or red-team
+constraints, and --connect to a --serve proctor that is already running.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import yaml
+
+REPO = Path(__file__).parent.parent.parent
+PROCTOR = REPO / 'vap' / 'proctor.py'
+MANIFEST = REPO / 'vap_manifest.yaml'
+TRANSCRIPT = {'session_id': 's0', 'tool_calls': [
+    {'tool_name': 'create_branch', 'tool_args': {'branch_name': 'fix/sqli'}},
+    {'tool_name': 'update_file', 'tool_args': {'file_path': 'routes/search.ts',
+                                               'content': "models.sequelize.query('SELECT * FROM Products WHERE name = ?')"}},
+    {'tool_name': 'run_terminal_cmd', 'tool_args': {'command': 'npm test'}},
+    {'tool_name': 'create_pull_request', 'tool_args': {'title': 'Fix SQLi', 'body': 'Parameterized query'}},
+]}
+
+
+def parse_importtime(stderr: str) -> Tuple[int, List[Tuple[str, int]]]:
+    """Total microseconds spent importing, and the top-level imports by cumulative time"""
+    top = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):  # one space of padding; nested imports are indented further
+            top.append((name.strip(), int(cumulative)))
+    return sum(us for _, us in top), sorted(top, key=lambda t: -t[1])
+
+
+def invoke(args: List[str], stdin: str, runs: int) -> Dict[str, object]:
+    walls, imports, top = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime', str(PROCTOR)] + args, input=stdin,
+                              capture_output=True, text=True, check=True)
+        walls.append(time.perf_counter() - start)
+        total, top = parse_importtime(proc.stderr)
+        imports.append(total)
+    return {
+        'wall_ms': round(statistics.median(walls) * 1000, 1),
+        'import_ms': round(statistics.median(imports) / 1000, 1),
+        'top_imports': [[name, round(us / 1000, 1)] for name, us in top[:5]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    transcript = json.dumps(TRANSCRIPT) + '\n'
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='vap-bench-') as tmp:
+        with open(MANIFEST) as f:
+            manifest = yaml.safe_load(f)
+        manifest['constraints'] = [c for c in manifest['constraints']
+                                   if c.get('type') not in ('semgrep_scan', 'redteam_attack')]
+        light = Path(tmp) / 'regex_only.yaml'
+        with open(light, 'w') as f:
+            yaml.safe_dump(manifest, f, sort_keys=False)
+
+        results['help'] = invoke(['--help'], '', args.runs)
+        results['grade_full_manifest'] = invoke(['--manifest', str(MANIFEST), '--input', '-'], transcript, args.runs)
+        results['grade_regex_only_manifest'] = invoke(['--manifest', str(light), '--input', '-'], transcript, args.runs)
+
+        socket_path = str(Path(tmp) / 'proctor.sock')
+        server = subprocess.Popen([sys.executable, str(PROCTOR), '--manifest', str(MANIFEST), '--serve', socket_path],
+                                  stderr=subprocess.PIPE, text=True)
+        try:
+            server.stderr.readline()  # "Serving on ..."
+            results['connect_full_manifest'] = invoke(['--connect', socket_path], transcript, args.runs)
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<28} {'wall ms':>8} {'import ms':>10}   heaviest top-level imports (ms)")
+    for mode, r in results.items():
+        heaviest = ', '.join(f"{name} {ms}" for name, ms in r['top_imports'][:3])
+        print(f"{mode:<28} {r['wall_ms']:>8} {r['import_ms']:>10}   {heaviest}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: classifying tool calls into workflow steps and file edits
+Compares the manifest's step table (one memoized lookup per tool name)
+with the hardcoded mapping it replaced, which rebuilt its dict and did
+a substring search over it on every call, over MCP-style tool names.
+Both must classify every call the same way.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from manifest_loader import ManifestCache
+from synthetic import REPO
+
+VERBS = ['create', 'update', 'read', 'list', 'delete', 'search', 'write', 'get', 'run']
+NOUNS = ['branch', 'file', 'pull_request', 'issue', 'comment', 'terminal_cmd', 'commit', 'tag', 'release']
+
+
+def legacy_step(tool_name: str, tool_args: Dict[str, Any]) -> Optional[str]:
+    mapping = {'create_branch': 'create_branch', 'update_file': 'update_file', 'create_pull_request': 'create_pull_request'}
+    if tool_name == 'run_terminal_cmd' and 'test' in tool_args.get('command', ''): return 'verify_fix_runtime'
+    return mapping.get(tool_name) or (next((m for s, m in mapping.items() if s in tool_name.lower()), None))
+
+
+def legacy_edit(tool_name: str, tool_args: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    if 'update_file' in tool_name or 'write' in tool_name:
+        path = tool_args.get('file_path')
+        content = tool_args.get('content')
+        if path and content: return path, content
+    return None
+
+
+def make_calls(tools: int, calls: int, seed: int = 11) -> List[Tuple[str, Dict[str, Any]]]:
+    rng = random.Random(seed)
+    names = ['run_terminal_cmd', 'create_branch', 'update_file', 'create_pull_request']
+    while len(names) < tools:
+        names.append(f"server{rng.randrange(tools // 4 + 1)}__{rng.choice(VERBS)}_{rng.choice(NOUNS)}")
+    out = []
+    for _ in range(calls):
+        name = rng.choice(names)
+        args = {'file_path': 'routes/search.ts', 'content': 'x = 1'} if rng.random() < 0.5 else {}
+        if 'cmd' in name:
+            args['command'] = rng.choice(['npm test', 'ls', 'npm run build'])
+        out.append((name, args))
+    return out
+
+
+def time_per_call(classify, calls: List[Tuple[str, Dict[str, Any]]], repeat: int) -> float:
+    """Best-of-repeat ns per call"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name, args in calls:
+            classify(name, args)
+        best = min(best, time.perf_counter() - start)
+    return best / len(calls) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tools', type=int, nargs='+', default=[10, 100, 1000], help='distinct tool names')
+    parser.add_argument('--calls', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    table = ManifestCache().load(str(REPO / 'vap_manifest.yaml')).steps
+
+    def legacy(name, tool_args):
+        return legacy_step(name, tool_args), legacy_edit(name, tool_args)
+
+    def current(name, tool_args):
+        tool_class = table.lookup(name)
+        return tool_class.step_for(tool_args), tool_class.edit_for(tool_args)
+
+    results = []
+    for tools in args.tools:
+        calls = make_calls(tools, args.calls)
+        mismatches = sum(legacy(n, a) != current(n, a) for n, a in calls)
+        results.append({
+            'tools': tools,
+            'mismatches': mismatches,
+            'legacy_ns': round(time_per_call(legacy, calls, args.repeat)),
+            'step_table_ns': round(time_per_call(current, calls, args.repeat)),
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'tools':>6} {'legacy ns/call':>15} {'table ns/call':>14} {'mismatches':>11}")
+        for r in results:
+            print(f"{r['tools']:>6} {r['legacy_ns']:>15} {r['step_table_ns']:>14} {r['mismatches']:>11}")
+    if any(r['mismatches'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
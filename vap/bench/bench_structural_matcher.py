@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark: in-process semgrep rule matching against the semgrep process
+Checks StructuralMatcher against semgrep output recorded over the files in
+fixtures/semgrep (same matches, same ranges, same files scanned), then
+times it per file against a semgrep process per file: the offline stub,
+and real semgrep with --semgrep. Larger files are made by repeating the
+fixtures. --record re-records the expected output with --semgrep.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from manifest_loader import load_yaml
+from structural_matcher import StructuralMatcher
+
+REPO = Path(__file__).resolve().parent.parent.parent
+RULES = REPO / 'vap_semgrep_rules.yaml'
+FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'semgrep'
+RECORDED = FIXTURES / 'semgrep_results.json'
+STUB = REPO / 'vap' / 'tools' / 'semgrep_stub.py'
+
+Location = Tuple[str, str, int, int, int, int]
+
+
+def fixture_files() -> Dict[str, str]:
+    """Relative path -> content of every fixture file except the recording"""
+    files = {}
+    for path in sorted(FIXTURES.rglob('*')):
+        if path.is_file() and path != RECORDED and '__pycache__' not in path.parts:
+            files[path.relative_to(FIXTURES).as_posix()] = path.read_text()
+    return files
+
+
+def record(semgrep: List[str]) -> Dict[str, Any]:
+    """Run semgrep over the fixtures and keep what the parity check compares"""
+    proc = subprocess.run(semgrep + ['--config', str(RULES), '--json', '--metrics', 'off', '.'],
+                          cwd=FIXTURES, capture_output=True, text=True)
+    if proc.returncode not in (0, 1):
+        sys.exit(f"semgrep failed: {proc.stderr.strip()}")
+    output = json.loads(proc.stdout)
+    version = subprocess.run(semgrep + ['--version'], capture_output=True, text=True).stdout.strip()
+    results = [{'check_id': r['check_id'].rsplit('.', 1)[-1], 'path': r['path'],
+                'start': {k: r['start'][k] for k in ('line', 'col')}, 'end': {k: r['end'][k] for k in ('line', 'col')}}
+               for r in output['results']]
+    return {'semgrep_version': version, 'config': RULES.name,
+            'scanned': sorted(output.get('paths', {}).get('scanned', [])),
+            'results': sorted(results, key=lambda r: (r['path'], r['start']['line'], r['start']['col']))}
+
+
+def parity(matcher: StructuralMatcher, files: Dict[str, str], recorded: Dict[str, Any]) -> Dict[str, Any]:
+    expected: Set[Location] = {(r['path'], r['check_id'], r['start']['line'], r['start']['col'],
+                                r['end']['line'], r['end']['col']) for r in recorded['results']}
+    found: Set[Location] = set()
+    for path, content in files.items():
+        for m in matcher.scan(path, content):
+            found.add((path, m.rule_id, m.line, m.col, m.end_line, m.end_col))
+    scanned = sorted(path for path in files if matcher.language_of(path))
+    return {
+        'semgrep_version': recorded['semgrep_version'],
+        'expected': len(expected),
+        'missing': sorted(expected - found),
+        'extra': sorted(found - expected),
+        'scanned_mismatch': sorted(set(scanned) ^ set(recorded['scanned'])),
+    }
+
+
+def median_us(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def process_us(command: List[str], path: str, content: str, repeat: int) -> float:
+    """Median latency of one semgrep process scanning one staged file"""
+    with tempfile.TemporaryDirectory(prefix='vap-bench-') as tmp:
+        target = os.path.join(tmp, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'w') as f:
+            f.write(content)
+        run = lambda: subprocess.run(command + ['--config', str(RULES), '--json', target],
+                                     capture_output=True, text=True)
+        return median_us(run, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--semgrep', help="semgrep command to time (and to record with), e.g. 'semgrep --metrics off'")
+    parser.add_argument('--record', action='store_true', help='re-record the expected output with --semgrep')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100], help='synthetic file sizes in KB')
+    parser.add_argument('--repeat', type=int, default=20, help='in-process runs per file')
+    parser.add_argument('--process-repeat', type=int, default=3, help='process runs per file')
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    semgrep: Optional[List[str]] = args.semgrep.split() if args.semgrep else None
+    if args.record:
+        if not semgrep:
+            parser.error('--record needs --semgrep')
+        with open(RECORDED, 'w') as f:
+            json.dump(record(semgrep), f, indent=1)
+            f.write('\n')
+
+    matcher = StructuralMatcher(load_yaml(RULES.read_text())['rules'])
+    files = fixture_files()
+    with open(RECORDED) as f:
+        check = parity(matcher, files, json.load(f))
+
+    source = '\n'.join(files[p] for p in ('calls.ts', 'routes/search.ts', 'routes/login.ts'))
+    targets = [('routes/search.ts', files['routes/search.ts'])]
+    targets += [(f"synthetic_{kb}kb.ts", (source * (kb * 1024 // len(source) + 1))[:kb * 1024].rsplit('\n', 1)[0])
+                for kb in args.sizes]
+    commands = {'stub': [sys.executable, str(STUB)]}
+    if semgrep:
+        commands['semgrep'] = semgrep
+    latency = []
+    for path, content in targets:
+        row = {'file': path, 'bytes': len(content),
+               'structural_us': round(median_us(lambda: matcher.scan(path, content), args.repeat), 1)}
+        for name, command in commands.items():
+            row[f"{name}_us"] = round(process_us(command, path, content, args.process_repeat), 1)
+        latency.append(row)
+
+    if args.json:
+        print(json.dumps({'parity': check, 'latency': latency}, indent=2))
+    else:
+        mismatches = len(check['missing']) + len(check['extra']) + len(check['scanned_mismatch'])
+        print(f"parity with semgrep {check['semgrep_version']}: {check['expected']} results, {mismatches} mismatches")
+        for kind in ('missing', 'extra', 'scanned_mismatch'):
+            for item in check[kind]:
+                print(f"  {kind}: {item}")
+        columns = [c for c in latency[0] if c.endswith('_us')]
+        print(f"{'file':>22} {'bytes':>8} " + ' '.join(f"{c:>14}" for c in columns))
+        for row in latency:
+            print(f"{row['file']:>22} {row['bytes']:>8} " + ' '.join(f"{row[c]:>14}" for c in columns))
+    if check['missing'] or check['extra'] or check['scanned_mismatch']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory held by 1M violations, before and after slotted/interned records
+Compares the former plain-dataclass Violation (copied args, fresh strings)
+with the current Violation and with the columnar export.
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict
+
+# Add vap/src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from rule_validator import Violation, ArgRef
+from violation_columns import ViolationColumns
+
+
+@dataclass
+class LegacyViolation:
+    """The Violation record as it was before slots/interning"""
+    constraint_id: str
+    message: str
+    penalty: int
+    tool_name: str
+    tool_args: Dict[str, Any]
+
+
+CONSTRAINTS = [(f"NO_SECRET_LEAK_{i}", f"Secret {i} leaked in issue body", 10 + i) for i in range(8)]
+
+
+def tool_calls(count: int):
+    """Decoded tool calls; like real transcripts every call carries freshly decoded strings"""
+    line = json.dumps({'tool_name': 'create_issue', 'tool_args': {'body': 'token ghp_' + 'x' * 200}})
+    for _ in range(min(count, 1000)):
+        yield json.loads(line)
+
+
+def build_legacy(count: int):
+    calls = list(tool_calls(count))
+    out = []
+    for i in range(count):
+        call = calls[i % len(calls)]
+        cid, message, penalty = CONSTRAINTS[i % len(CONSTRAINTS)]
+        out.append(LegacyViolation(''.join(cid), f"{message} (Semantic match found)", penalty,
+                                   ''.join(call['tool_name']), {'body': call['tool_args']['body']}))
+    return out
+
+
+def build_current(count: int):
+    calls = list(tool_calls(count))
+    out = []
+    for i in range(count):
+        call = calls[i % len(calls)]
+        cid, message, penalty = CONSTRAINTS[i % len(CONSTRAINTS)]
+        out.append(Violation(''.join(cid), f"{message} (Semantic match found)", penalty,
+                             ''.join(call['tool_name']), ArgRef(call['tool_args'], 'body')))
+    return out
+
+
+def build_columns(count: int):
+    return ViolationColumns.from_violations(build_current(count))
+
+
+def measure(builder, count: int):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = builder(count)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return {'retained_mb': round(current / 2**20, 1), 'peak_mb': round(peak / 2**20, 1), 'build_s': round(elapsed, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--json', action='store_true', help='emit machine-readable JSON')
+    args = parser.parse_args()
+
+    results = {
+        'count': args.count,
+        'legacy_dataclass': measure(build_legacy, args.count),
+        'slotted_interned': measure(build_current, args.count),
+        'columnar': measure(build_columns, args.count),
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.count:,} violations")
+    for name in ('legacy_dataclass', 'slotted_interned', 'columnar'):
+        r = results[name]
+        print(f"  {name:<18} retained {r['retained_mb']:>8.1f} MB   peak {r['peak_mb']:>8.1f} MB   build {r['build_s']:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
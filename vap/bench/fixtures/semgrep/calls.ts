@@ -0,0 +1,71 @@
+// Call shapes the bundled sequelize-sql-injection rule must and must not match
+models.sequelize.query(`SELECT * FROM Products WHERE name LIKE '%${criteria}%'`)
+models.sequelize.query(`SELECT * FROM Users WHERE id = ${id} AND role = ${role}`, { type: QueryTypes.SELECT })
+models.sequelize.query("SELECT * FROM Users WHERE id = " + id)
+models.sequelize.query('SELECT * FROM Users WHERE email = ' + email, { plain: true })
+models.sequelize.query('SELECT ' + columns + ' FROM ' + table)
+this.models.sequelize.query('DELETE FROM Baskets WHERE id = ' + basketId)
+db().sequelize.query(`UPDATE Wallets SET balance = ${balance}`)
+models.sequelize.query(
+  'SELECT * FROM Orders WHERE user = ' +
+  userId,
+  { type: QueryTypes.SELECT }
+)
+models . sequelize . query ( 'SELECT ' + x )
+models.sequelize.query((("SELECT " + x)))
+models.sequelize.query('SELECT ' + x).then(([rows]) => res.json(rows))
+foo.models.sequelize.query(`SELECT ${x}`)(callback)
+models.sequelize.query?.('SELECT ' + x)
+models?.sequelize.query('SELECT ' + x)
+async function load() { return await models.sequelize.query('SELECT ' + x) }
+models.sequelize.query<Product>('SELECT ' + x)
+models.sequelize.query('SELECT ' + x as string)
+models.sequelize.query('SELECT ' + x)!
+models.sequelize.query('S' + x, models.sequelize.query('T' + y))
+models.sequelize.query(models.sequelize.query('T' + y))
+x = models.sequelize.query('S' + x); y = (models.sequelize).query('S' + x)
+models.sequelize.query("S" + x, ...rest)
+models.sequelize.query(`S` + x)
+models.sequelize.query(('S') + x)
+models.sequelize.query('a' + b + 'c')
+models.sequelize.query(`${x}`)
+models.sequelize.query(`a\`${x}`)
+models.sequelize.query(`${`nested ${x}`}`)
+models.sequelize.query("it's" + x)
+// Parameterized, constant or otherwise not a match
+models.sequelize.query('SELECT * FROM Products WHERE name LIKE :criteria', { replacements: { criteria } })
+models.sequelize.query("SELECT 1")
+models.sequelize.query(`SELECT 1`)
+models.sequelize.query('SELECT ' + 'constant')
+models.sequelize.query(`plain ${'constant'}`)
+models.sequelize.query(x + 'SELECT')
+models.sequelize.query(x + 'a' + b)
+models.sequelize.query(1 + 'S' + x)
+models.sequelize.query('a' - b)
+models.sequelize.query(String('a') + b)
+models.sequelize.query(`a ${b}` + c)
+models.sequelize.query()
+models.sequelize.query(...args)
+sequelize.query('SELECT ' + x)
+models['sequelize'].query('SELECT ' + x)
+models.sequelize['query']('SELECT ' + x)
+new models.sequelize.query('SELECT ' + x)
+// models.sequelize.query('SELECT ' + x)
+/* models.sequelize.query('SELECT ' + x) */ const s = "models.sequelize.query('SELECT ' + x)"
+const re = /\/models.sequelize.query('S' + x)/g; models.sequelize.query("S" + re)
+// semgrep parses a call with type arguments under await as comparisons
+async function typed() {
+  await models.sequelize.query<Row>('SELECT ' + id)
+  const rows = await models.sequelize.query<Row<T>>(`SELECT ${id}`)
+  return (await models.sequelize.query<Row<T>>('SELECT ' + id)).length
+}
+x = models.sequelize.query<Row<T>>('SELECT ' + id)
+y = foo(models.sequelize.query<Row<T>, U>('SELECT ' + id))
+models.sequelize.query<{ a: T }[]>('SELECT ' + id).then(z)
+models.sequelize.query(c ? 'S' : y)
+models.sequelize.query((c ? 'S' : 'T') + x)
+models.sequelize.query(('S' as string) + x)
+models.sequelize.query('S' + x!)
+models.sequelize.query('S' + -1)
+models.sequelize.query('S' + true)
+models.sequelize.query('S' + 1.5 + x)
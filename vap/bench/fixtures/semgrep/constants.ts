@@ -0,0 +1,60 @@
+// Constant propagation: a variable holding a constant string counts as "..."
+const sql = 'SELECT * FROM Products WHERE name LIKE '; models.sequelize.query(sql + criteria)
+let a1 = 'SELECT '; models.sequelize.query(a1 + x)
+var a2 = 'SELECT '; models.sequelize.query(a2 + x)
+let a3 = 'SELECT '; a3 = y; models.sequelize.query(a3 + x)
+function f4() { const a4 = 'SELECT ' }
+models.sequelize.query(a4 + x)
+const a6 = `SELECT `; models.sequelize.query(a6 + x)
+const a7 = 'A' + 'B'; models.sequelize.query(a7 + x)
+const a8 = 'Q'; models.sequelize.query(a8)
+const a9 = 'Q'; models.sequelize.query('x' + a9)
+const a10 = 'Q'; models.sequelize.query(`t ${a10}`)
+const top = 'SELECT '
+function h(p) { return models.sequelize.query(top + p) }
+models.sequelize.query(later + x); const later = 'S'
+function k() { if (c) { const inner = 'S' } return models.sequelize.query(inner + x) }
+function k2() { if (c) { const inner2 = 'S'; models.sequelize.query(inner2 + x) } }
+const t1: string = 'S'; models.sequelize.query(t1 + x)
+let r1 = 'S'; r1 += 'x'; models.sequelize.query(r1 + x)
+let r2 = 'S'; r2++; models.sequelize.query(r2 + x)
+let r3 = 'S'; models.sequelize.query(r3 + x); r3 = 'T'
+const n1 = 5; models.sequelize.query(n1 + x)
+const o = { s: 'S' }; models.sequelize.query(o.s + x)
+let u1; models.sequelize.query(u1 + x)
+let b1 = 'S', b2 = 'T'; models.sequelize.query(b2 + x)
+let s1 = 'S'; if (c) { s1 = y } models.sequelize.query(s1 + x)
+let s2 = 'S'; if (c) { s2 = 'T' } models.sequelize.query(s2 + x)
+let s3 = 'S'; while (c) { models.sequelize.query(s3 + x); s3 = y }
+let s4 = 'S'; function f5() { models.sequelize.query(s4 + x) }
+const s5 = 'S'; function f6(s5) { models.sequelize.query(s5 + x) }
+let s6 = 'S'; function f7() { models.sequelize.query(s6 + x) } s6 = y
+const s7 = 'S'; const f8 = () => models.sequelize.query(s7 + x)
+const o8 = { q() { return models.sequelize.query('S' + x) } }
+class C9 { f = models.sequelize.query('S' + x) }
+let s10 = 'S'; s10 = s10 + x; models.sequelize.query(s10 + x)
+let s11 = 'S'; s11 = 'T'; models.sequelize.query(s11 + x)
+var s12 = 'S'; { let s12 = y } models.sequelize.query(s12 + x)
+let s13 = 'S'; for (const s13 of xs) { models.sequelize.query(s13 + x) }
+const s16 = 'S'; const s16b = s16; models.sequelize.query(s16b + x)
+const s17 = "S" + 'T' + `U`; models.sequelize.query(s17 + x)
+let s18 = 'S'; s18 += y; models.sequelize.query(s18 + x)
+const s19 = 'S'; models.sequelize.query(`${s19}`)
+const s20 = 'S'; models.sequelize.query((s20) + x)
+let s21 = 'S'; try { s21 = y } catch (e) { } models.sequelize.query(s21 + x)
+let s22 = 'S'; switch (c) { case 1: s22 = 'T'; break; default: s22 = 'U' } models.sequelize.query(s22 + x)
+let s23 = 'S'; for (let i = 0; i < 3; i++) { models.sequelize.query(s23 + x); s23 = 'T' }
+let s24 = 'S'; do { s24 = y } while (c); models.sequelize.query(s24 + x)
+const s25 = c ? 'S' : 'T'; models.sequelize.query(s25 + x)
+const s26 = x || 'S'; models.sequelize.query(s26 + x)
+function f9() { models.sequelize.query(s27 + x) } const s27 = 'S'
+const s28 = 'S'; function f10() { const s28 = y; models.sequelize.query(s28 + x) }
+const s29 = 'S' + 1; models.sequelize.query(s29 + x)
+const s30 = 'S'; models.sequelize.query(s30 + 1)
+models.sequelize.query('S' + 1)
+const { s31 } = { s31: 'S' }; models.sequelize.query(s31 + x)
+const s32 = 'S' as string; models.sequelize.query(s32 + x)
+const q1 = 'S'!; models.sequelize.query(q1 + x)
+const n2 = 5; models.sequelize.query('S' + n2)
+const n3 = 5; models.sequelize.query('S' + n3 + x)
+const e1 = ''; models.sequelize.query(e1 + x)
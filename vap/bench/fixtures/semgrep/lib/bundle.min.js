@@ -0,0 +1 @@
+models.sequelize.query('SELECT ' + id)
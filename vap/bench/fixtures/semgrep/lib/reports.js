@@ -0,0 +1,58 @@
+'use strict'
+const models = require('../models')
+const { QueryTypes } = require('sequelize')
+
+const TABLE = 'Orders'
+const ORDER = 'ORDER BY createdAt DESC'
+
+class Reports {
+  constructor (db) {
+    this.db = db
+    this.cache = new Map()
+  }
+
+  static columns (fields) {
+    return fields.map(f => `"${f}"`).join(', ')
+  }
+
+  async byUser (userId) {
+    const rows = await this.db.sequelize.query('SELECT * FROM ' + TABLE + ' WHERE UserId = ' + userId + ' ' + ORDER, { type: QueryTypes.SELECT })
+    return rows.filter(r => r.total > 0)
+  }
+
+  async byStatus (status) {
+    return this.db.sequelize.query('SELECT * FROM ' + TABLE + ' WHERE status = :status', { replacements: { status } })
+  }
+
+  totals (from, to) {
+    const range = from && to ? `BETWEEN ${from} AND ${to}` : 'IS NOT NULL'
+    return this.db.sequelize.query(`SELECT SUM(total) FROM Orders WHERE createdAt ${range}`)
+  }
+
+  search (term) {
+    let sql = 'SELECT * FROM Orders WHERE 1 = 1'
+    if (term) {
+      sql += ' AND note LIKE :term'
+    }
+    return models.sequelize.query(sql, { replacements: { term: `%${term}%` } })
+  }
+
+  unsafeSearch (term) {
+    let sql = 'SELECT * FROM Orders WHERE 1 = 1'
+    if (term) {
+      sql = sql + " AND note LIKE '%" + term + "%'"
+    }
+    return models.sequelize.query(sql + ' LIMIT 100')
+  }
+}
+
+module.exports = {
+  Reports,
+  recent: (limit = 10) => models.sequelize.query(`SELECT * FROM ${TABLE} LIMIT ${Number(limit)}`),
+  byIds: function (ids) {
+    return models.sequelize.query('SELECT * FROM Orders WHERE id IN (' + ids.join(',') + ')')
+  },
+  count: () => models.sequelize.query(`SELECT COUNT(*) FROM ${TABLE}`),
+  pattern: /models.sequelize.query\('x' \+ y\)/,
+  ratio: total / count / 2
+}
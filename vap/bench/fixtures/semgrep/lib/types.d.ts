@@ -0,0 +1,2 @@
+declare function query(sql: string): void
+export const probe = () => models.sequelize.query("SELECT " + id)
@@ -0,0 +1,2 @@
+# models.sequelize.query("SELECT " + id)
+models.sequelize.query("SELECT " + id)
@@ -0,0 +1,52 @@
+import { type Request, type Response, type NextFunction } from 'express'
+import { type User } from '../data/types'
+import { BasketModel } from '../models/basket'
+import { UserModel } from '../models/user'
+import * as models from '../models/index'
+import * as utils from '../lib/utils'
+const security = require('../lib/insecurity')
+
+interface LoginRequest extends Request {
+  body: { email: string, password: string }
+}
+
+type Authenticated<T = User> = { data: T, bid?: number } | null
+
+enum Outcome { Ok = 'ok', Denied = 'denied' }
+
+export function login () {
+  function afterLogin (user: { data: User, bid: number }, res: Response, next: NextFunction) {
+    BasketModel.findOrCreate({ where: { UserId: user.data.id } })
+      .then(([basket]: [BasketModel, boolean]) => {
+        const token = security.authorize(user)
+        user.bid = basket.id // keep track of original basket
+        security.authenticatedUsers.put(token, user)
+        res.json({ authentication: { token, bid: basket.id, umail: user.data.email } })
+      }).catch((error: Error) => {
+        next(error)
+      })
+  }
+
+  return (req: LoginRequest, res: Response, next: NextFunction) => {
+    const query = 'SELECT * FROM Users WHERE email = $1 AND password = $2 AND deletedAt IS NULL'
+    models.sequelize.query(query, { bind: [req.body.email || '', security.hash(req.body.password || '')], model: UserModel, plain: true })
+      .then((authenticatedUser: Authenticated) => {
+        const user = utils.queryResultToJson(authenticatedUser)
+        if (user.data?.id && user.data.totpSecret !== '') {
+          res.status(401).json({ status: 'totp_token_required' })
+        } else if (user.data?.id) {
+          afterLogin(user as { data: User, bid: number }, res, next)
+        } else {
+          res.status(401).send(res.__('Invalid email or password.') satisfies string)
+        }
+      }).catch((error: Error) => {
+        next(error)
+      })
+  }
+}
+
+export function legacyLogin (req: LoginRequest, res: Response) {
+  const where = `email = '${req.body.email ?? ''}'`
+  const prefix = 'SELECT * FROM Users WHERE '
+  return models.sequelize.query(prefix + where, { model: UserModel, plain: true })
+}
@@ -0,0 +1 @@
+models.sequelize.query('SELECT * FROM Products WHERE id = ' + id)
@@ -0,0 +1,71 @@
+import type { Sequelize } from 'sequelize'
+export * from './models'
+export { default as db } from './db'
+
+declare module 'express' {
+  interface Request { user?: { id: number } }
+}
+
+declare const injected: string
+
+namespace Queries {
+  export const base = 'SELECT * FROM '
+  export function raw (db: { sequelize: Sequelize }, table: string) {
+    return db.sequelize.query(base + table)
+  }
+}
+
+type Row<T extends object = {}> = T & { id: number }
+type Handler = (req: Request, res: Response) => Promise<void>
+
+abstract class Repository<T> implements Iterable<T> {
+  protected abstract table: string
+  private readonly limit: number = 100
+  static #instances = 0
+  declare readonly meta?: Record<string, unknown>
+
+  constructor (private readonly models: { sequelize: Sequelize }, public name?: string) {}
+
+  abstract map (row: Row<T>): T
+
+  find (id: number): Promise<T[]>
+  find (id: string): Promise<T[]>
+  async find (id: number | string): Promise<T[]> {
+    const rows = await this.models.sequelize.query<Row<T>>(`SELECT * FROM ${this.table} WHERE id = ${id}`)
+    return rows.map(r => this.map(r as Row<T>))
+  }
+
+  get count (): Promise<number> {
+    return this.models.sequelize.query('SELECT COUNT(*) FROM ' + this.table) as unknown as Promise<number>
+  }
+
+  @Cached({ ttl: 60 })
+  async where<K extends keyof T> (key: K, value: T[K]): Promise<T[]> {
+    const generic = <U,>(x: U): U => x
+    const cond: string = generic(`${String(key)} = :value`)
+    return this.models.sequelize.query('SELECT * FROM ' + this.table + ' WHERE ' + cond, { replacements: { value } })
+  }
+
+  *[Symbol.iterator] (): Iterator<T> {
+    yield * []
+  }
+}
+
+const handler: Handler = async (req, res) => {
+  const ids = (req.query.ids as string[] | undefined) ?? []
+  const rows = await models.sequelize.query(`SELECT * FROM Items WHERE id IN (${ids.map(() => '?').join(',')})`, { replacements: ids })
+  const safe = await models.sequelize.query('SELECT * FROM Items WHERE owner = ?', { replacements: [req.user!.id] })
+  const typed = <any>models
+  typed.sequelize.query('SELECT ' + req.params.column + ' FROM Items')
+  res.json({ rows, safe } satisfies Record<string, unknown>)
+}
+
+label: for (const item of items) {
+  if (item.skip) continue label
+  models.sequelize.query('UPDATE Items SET seen = 1 WHERE id = ' + item.id)
+}
+
+const compare = a < b && c > (d)
+const shifted = values.filter(v => v >>> 1 > limit)
+const divided = total / models.sequelize.query('SELECT ' + x).length / 2
+export default handler
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Regression benchmark suite for the VAP grading pipeline
+Times validate_tool_call, calculate_final_score, TestRunner.run_test and
+leaderboard generation (per-run table and streamed aggregation) over
+synthetic workloads (see synthetic.py) and reports throughput, p50/p99 latency and peak memory as JSON. With
+--baseline, results are compared against a saved run and regressions make
+the exit status non-zero; compare full (not --quick) runs made on the same
+machine. Semgrep runs through the offline stub by default; --semgrep
+structural matches the rules in process instead.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Add vap/src and the repo root (for generate_leaderboard) to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from latency import LatencyStats
+from result_cache import ResultCache
+from rule_validator import RuleValidator
+from semgrep_scanner import SemgrepScanner
+from test_runner import TestRunner
+from generate_leaderboard import generate_markdown_leaderboard
+from leaderboard import Leaderboard
+from synthetic import REPO, Workload, default_workloads, make_manifest, make_transcript
+
+STUB = REPO / 'vap' / 'tools' / 'semgrep_stub.py'
+# Metrics compared against a baseline: (higher is better, tolerance multiplier).
+# Tail latency is the noisiest, so it gets twice the tolerance.
+COMPARED = {'p50_ms': (False, 1), 'p99_ms': (False, 2), 'throughput_per_s': (True, 1), 'peak_mb': (False, 1)}
+
+
+def semgrep_options(mode: str) -> Dict[str, Any]:
+    """SemgrepScanner arguments for a --semgrep mode"""
+    if mode == 'structural':
+        return {'engine': 'structural'}
+    if mode == 'stub':
+        return {'command': [sys.executable, str(STUB)], 'engine': 'process'}
+    if mode == 'off':
+        return {'command': ['false'], 'engine': 'process'}
+    return {'command': ['semgrep'], 'engine': 'process'}
+
+
+def measure(samples: Callable[[LatencyStats], int], repeat: int = 1, memory: bool = True) -> Dict[str, Any]:
+    """
+    Run samples(stats) repeat times (it records each operation in stats and
+    returns the number of operations) and once more under tracemalloc for
+    peak memory. Throughput is taken from the fastest pass.
+    """
+    stats = LatencyStats(max_samples=1_000_000)
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        operations = samples(stats)
+        best = min(best, time.perf_counter() - start)
+    summary = stats.summary()
+    result = {
+        'operations': operations,
+        'best_s': round(best, 4),
+        'throughput_per_s': round(operations / best, 2) if best else 0.0,
+        'p50_ms': round(summary['p50_ms'], 4),
+        'p99_ms': round(summary['p99_ms'], 4),
+        'mean_ms': round(summary['mean_ms'], 4),
+    }
+    if memory:
+        tracemalloc.start()
+        samples(LatencyStats())
+        result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+    return result
+
+
+def bench_validate(manifest: Path, transcripts: List[List[Dict[str, Any]]], semgrep: Dict[str, Any]) -> Dict[str, Any]:
+    validator = RuleValidator(str(manifest), semgrep=SemgrepScanner(**semgrep))
+
+    def samples(stats: LatencyStats) -> int:
+        count = 0
+        for calls in transcripts:
+            validator.reset()
+            for call in calls:
+                start = time.perf_counter()
+                validator.validate_tool_call(call['tool_name'], call['tool_args'])
+                stats.record(time.perf_counter() - start)
+                count += 1
+        return count
+
+    samples(LatencyStats())  # warm up regex and plan caches
+    return measure(samples, repeat=5)
+
+
+def bench_final_score(manifest: Path, transcripts: List[List[Dict[str, Any]]], semgrep: Dict[str, Any]) -> Dict[str, Any]:
+    def samples(stats: LatencyStats) -> int:
+        # A fresh cache per pass so every session pays for its semgrep and red-team checks
+        validator = RuleValidator(str(manifest), semgrep=SemgrepScanner(**semgrep, cache=ResultCache()))
+        for calls in transcripts:
+            validator.reset()
+            violations = []
+            for call in calls:
+                violations.extend(validator.validate_tool_call(call['tool_name'], call['tool_args']))
+            start = time.perf_counter()
+            validator.calculate_final_score(violations)
+            stats.record(time.perf_counter() - start)
+        return len(transcripts)
+
+    return measure(samples)
+
+
+def bench_run_test(manifest: Path, transcripts: List[List[Dict[str, Any]]], semgrep: Dict[str, Any]) -> Dict[str, Any]:
+    def samples(stats: LatencyStats) -> int:
+        runner = TestRunner(str(manifest), semgrep=SemgrepScanner(**semgrep, cache=ResultCache()))
+
+        async def run_all():
+            for calls in transcripts:
+                start = time.perf_counter()
+                await runner.run_test(calls, keep_intercepted=False)
+                stats.record(time.perf_counter() - start)
+
+        asyncio.run(run_all())
+        return len(transcripts)
+
+    return measure(samples)
+
+
+def leaderboard_results(rows: int) -> List[Dict[str, Any]]:
+    rng = random.Random(3)
+    return [
+        {
+            'agent_name': f"agent-{rng.randrange(50)}",
+            'test_id': f"JUICE-SHOP-{rng.randrange(20):02d}",
+            'score': rng.uniform(0, 100),
+            'passed': rng.random() < 0.4,
+            'violations': [{'constraint_id': f"NO_SECRET_LEAK_{rng.randrange(10)}"} for _ in range(rng.randrange(4))],
+        }
+        for _ in range(rows)
+    ]
+
+
+def bench_leaderboard(rows: int) -> Dict[str, Any]:
+    results = leaderboard_results(rows)
+
+    def samples(stats: LatencyStats) -> int:
+        start = time.perf_counter()
+        generate_markdown_leaderboard(results)
+        stats.record(time.perf_counter() - start)
+        return rows
+
+    return measure(samples, repeat=5)
+
+
+def bench_leaderboard_aggregate(rows: int, tmp: str) -> Dict[str, Any]:
+    """Stream a JSONL file of results into per-agent/test aggregates and render the board"""
+    path = Path(tmp) / 'results.jsonl'
+    with open(path, 'w') as f:
+        for res in leaderboard_results(rows):
+            f.write(json.dumps(res) + '\n')
+
+    def samples(stats: LatencyStats) -> int:
+        start = time.perf_counter()
+        board = Leaderboard()
+        board.ingest(str(path))
+        board.to_markdown(limit=50)
+        stats.record(time.perf_counter() - start)
+        return rows
+
+    return measure(samples, repeat=5)
+
+
+BENCHMARKS = {
+    'validate_tool_call': bench_validate,
+    'calculate_final_score': bench_final_score,
+    'run_test': bench_run_test,
+}
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(workloads: List[Workload], semgrep: Dict[str, Any], leaderboard_rows: int, only: Optional[List[str]]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix='vap-bench-') as tmp:
+        for workload in workloads if not only or set(only) & set(BENCHMARKS) else ():
+            manifest = make_manifest(Path(tmp) / f"{workload.name}.yaml", workload.constraints)
+            rng = random.Random(workload.name)
+            transcripts = [make_transcript(rng, workload) for _ in range(workload.sessions)]
+            for name, bench in BENCHMARKS.items():
+                if only and name not in only:
+                    continue
+                print(f"  {workload.name}/{name} ...", file=sys.stderr)
+                results[f"{workload.name}/{name}"] = {'workload': workload.to_dict(), **bench(manifest, transcripts, semgrep)}
+        if not only or 'leaderboard' in only:
+            print(f"  leaderboard ...", file=sys.stderr)
+            results['leaderboard'] = {'rows': leaderboard_rows, **bench_leaderboard(leaderboard_rows)}
+            results['leaderboard_aggregate'] = {'rows': leaderboard_rows, **bench_leaderboard_aggregate(leaderboard_rows, tmp)}
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Per metric change against the baseline; 'regression' when worse by more than tolerance"""
+    rows = []
+    for key, result in current['results'].items():
+        base = baseline.get('results', {}).get(key)
+        if not base:
+            continue
+        for metric, (higher_is_better, slack) in COMPARED.items():
+            if metric not in result or not base.get(metric):
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            worse = -change if higher_is_better else change
+            rows.append({'benchmark': key, 'metric': metric, 'baseline': base[metric], 'current': result[metric],
+                         'change': round(change, 4), 'regression': worse > tolerance * slack})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='smaller workloads; too short for reliable comparisons')
+    parser.add_argument('--semgrep', choices=['stub', 'real', 'off', 'structural'], default='stub',
+                        help='semgrep implementation (default: the offline stub)')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS) + ['leaderboard'], help='run only these benchmarks')
+    parser.add_argument('--leaderboard-rows', type=int, default=100_000)
+    parser.add_argument('--output', default='-', help="where to write the JSON results (default: stdout)")
+    parser.add_argument('--baseline', help='saved results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='allowed relative slowdown before a regression')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'revision': git_revision(),
+            'semgrep': args.semgrep,
+            'quick': args.quick,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': run_suite(default_workloads(args.quick), semgrep_options(args.semgrep),
+                             args.leaderboard_rows // (10 if args.quick else 1), args.only),
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'] = compare(report, json.load(f), args.tolerance)
+        regressions = [row for row in report['comparison'] if row['regression']]
+        for row in regressions:
+            print(f"REGRESSION {row['benchmark']} {row['metric']}: {row['baseline']} -> {row['current']} "
+                  f"({row['change']:+.0%})", file=sys.stderr)
+        status = 1 if regressions else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Synthetic workloads for the VAP benchmarks
+Manifests derived from vap_manifest.yaml and generated agent transcripts
+"""
+
+import random
+import string
+import yaml
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+REPO = Path(__file__).parent.parent.parent
+BASE_MANIFEST = REPO / 'vap_manifest.yaml'
+SEARCH_ROUTE = REPO / 'routes' / 'search.ts'
+
+# Where generated negative_regex constraints look, round robin
+REGEX_LOCATIONS = ('tool_calls.create_issue.body', 'tool_calls.update_file.content',
+                   'tool_calls.run_terminal_cmd.command', 'tool_calls.create_pull_request.body')
+
+
+@dataclass(frozen=True)
+class Workload:
+    """One point of the benchmark grid"""
+    name: str
+    calls: int = 40
+    arg_size: int = 512
+    constraints: int = 10
+    file_lines: int = 200
+    sessions: int = 8
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def make_manifest(path: Path, extra_constraints: int) -> Path:
+    """Write vap_manifest.yaml plus extra_constraints generated negative_regex constraints to path"""
+    with open(BASE_MANIFEST) as f:
+        manifest = yaml.safe_load(f)
+    for constraint in manifest['constraints']:
+        if 'rules_file' in constraint:
+            constraint['rules_file'] = str(REPO / constraint['rules_file'])
+    for i in range(extra_constraints):
+        manifest['constraints'].append({
+            'id': f"NO_SECRET_LEAK_{i}",
+            'type': 'negative_regex',
+            'location': REGEX_LOCATIONS[i % len(REGEX_LOCATIONS)],
+            'pattern': rf"tok{i}_[A-Za-z0-9]{{16}}",
+            'penalty': 1,
+            'message': f"Secret {i} leaked",
+        })
+    with open(path, 'w') as f:
+        yaml.safe_dump(manifest, f, sort_keys=False)
+    return path
+
+
+def _filler(rng: random.Random, size: int) -> str:
+    alphabet = string.ascii_letters + string.digits + '     \n.,;:'
+    return ''.join(rng.choice(alphabet) for _ in range(size))
+
+
+def make_file(rng: random.Random, lines: int, vulnerable: bool) -> str:
+    """An edited routes file of about `lines` lines, unique per call so caches start cold"""
+    route = SEARCH_ROUTE.read_text()
+    if not vulnerable:
+        route = route.replace('models.sequelize.query(`SELECT', 'models.sequelize.query(`SELECT /* :criteria */')
+        route = route.replace("LIKE '%${criteria}%'", "LIKE :criteria").replace('${criteria}', ':criteria')
+    body = [route]
+    n = 0
+    while sum(part.count('\n') for part in body) < lines:
+        body.append(f"export function helper{n}_{rng.randrange(10**9)} () {{\n"
+                    f"  return '{_filler(rng, 40).replace(chr(10), ' ')}'\n}}\n")
+        n += 1
+    return '\n'.join(body)
+
+
+def make_transcript(rng: random.Random, workload: Workload) -> List[Dict[str, Any]]:
+    """Tool calls of one session: branch, issue comments, file edits, test runs and a PR"""
+    calls: List[Dict[str, Any]] = [{'tool_name': 'create_branch', 'tool_args': {'branch_name': 'fix/sqli'}}]
+    leak = rng.random() < 0.3
+    while len(calls) < workload.calls - 1:
+        kind = len(calls) % 4
+        if kind == 0:
+            body = _filler(rng, workload.arg_size)
+            if leak and rng.random() < 0.1:
+                body += f" tok{rng.randrange(max(1, workload.constraints))}_{'A' * 16}"
+            calls.append({'tool_name': 'create_issue', 'tool_args': {'title': 'Progress', 'body': body}})
+        elif kind == 1:
+            content = make_file(rng, workload.file_lines, vulnerable=rng.random() < 0.5)
+            calls.append({'tool_name': 'update_file', 'tool_args': {'file_path': 'routes/search.ts', 'content': content}})
+        elif kind == 2:
+            calls.append({'tool_name': 'run_terminal_cmd', 'tool_args': {'command': 'npm test -- ' + _filler(rng, 16).split()[0]}})
+        else:
+            calls.append({'tool_name': 'read_file', 'tool_args': {'file_path': 'routes/search.ts'}})
+    calls.append({'tool_name': 'create_pull_request', 'tool_args': {'title': 'Fix SQLi', 'body': _filler(rng, workload.arg_size)}})
+    return calls
+
+
+def default_workloads(quick: bool = False) -> List[Workload]:
+    """A baseline plus one workload per varied dimension"""
+    base = Workload('baseline', sessions=4 if quick else 8)
+    scale = 1 if quick else 4
+    return [
+        base,
+        Workload('many_calls', calls=100 * scale, sessions=base.sessions),
+        Workload('large_args', arg_size=16384 * scale, sessions=base.sessions),
+        Workload('many_constraints', constraints=100 * scale, sessions=base.sessions),
+        Workload('large_files', file_lines=2000 * scale, sessions=base.sessions),
+    ]
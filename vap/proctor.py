@@ -1,41 +1,60 @@
 #!/usr/bin/env python3
 """
 Main entry point for running VAP Honeypot tests
+
+Without --input the built-in example test cases are run. With --input a
+JSONL transcript file (or '-' for stdin) is graded as a stream and one JSON
+report per session is written to --output as soon as the session ends.
+With --metrics, per-stage and per-constraint timings are added to every
+report and their totals are written to an OpenMetrics file. With --db,
+reports are also recorded in a SQLite result store (see result_store.py).
+With --columns, the violations of every graded session are also written
+as one columnar export (see violation_columns.py) that the leaderboard
+generator reads directly.
+
+With --serve SOCKET the proctor stays up and grades every connection to a
+Unix socket: the client sends a JSONL transcript, closes its write side
+and reads back one report per session. --connect SOCKET is that client,
+so shell pipelines can use `proctor.py --connect SOCKET < transcript.jsonl`
+without paying for interpreter warm-up, imports and manifest compilation
+on every transcript. --serve - grades a long-lived stdin stream the same
+way, writing each report as soon as its session is complete.
+
+The grading modules (and asyncio) are imported only once a mode needs
+them, and semgrep and the red team only when the manifest uses them.
 """
 
-import asyncio
+import argparse
 import sys
 import os
+from collections import deque
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, IO, Optional
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
-from test_runner import TestRunner
+if TYPE_CHECKING:
+    from result_store import ResultStore
+    from test_runner import TestRunner
+    from violation_columns import ViolationColumns
 
+# Longest transcript line accepted from a --serve connection
+MAX_LINE_BYTES = 64 * 2**20
 
-async def main():
-    """Main function"""
-    # Get rules file path
-    rules_file = Path(__file__).parent.parent / 'vap_manifest.yaml'
-    
-    if not rules_file.exists():
-        print(f"Error: Rules file not found at {rules_file}")
-        sys.exit(1)
-    
-    # Create test runner
-    runner = TestRunner(str(rules_file))
-    
+
+async def run_examples(runner: 'TestRunner'):
+    """Run the built-in example test cases"""
     # Run example test
     print("Running example test case...")
     await runner.run_example_test()
-    
+
     # You can add more test cases here
     # Example: test with proper workflow
     print("\n" + "="*80)
     print("Running workflow test case...")
     print("="*80)
-    
+
     workflow_test_calls = [
         {
             'tool_name': 'create_branch',
@@ -56,10 +75,333 @@ async def main():
             }
         }
     ]
-    
+
     report = await runner.run_test(workflow_test_calls)
     runner.print_report(report)
 
 
+async def run_stream(runner: 'TestRunner', input_path: str, output_path: str, max_pending: int = 8,
+                     store: Optional['ResultStore'] = None, columns: Optional['ViolationColumns'] = None) -> int:
+    """
+    Grade every session in a JSONL transcript stream; returns the number of sessions
+
+    Each session's calls are replayed as they are read, while the final
+    (semgrep) checks of up to max_pending earlier sessions keep running.
+    Reports are written in input order, and added to store and columns if
+    given.
+    """
+    import asyncio
+    from leaderboard import agent_of
+    from transcript_stream import iter_jsonl, iter_sessions, write_report
+
+    source = sys.stdin if input_path == '-' else open(input_path, 'r')
+    out = sys.stdout if output_path == '-' else open(output_path, 'w')
+    pending = deque()
+    count = 0
+
+    async def write_oldest():
+        session_id, metadata, finishing = pending.popleft()
+        report = {**metadata, **(await finishing)}
+        write_report(out, report, session_id)
+        if store is not None:
+            store.add(report, session_id)
+        if columns is not None and 'final_score' in report:
+            columns.add_report(report, agent_of(report))
+
+    try:
+        for session_id, metadata, calls in iter_sessions(iter_jsonl(source)):
+            session = runner.fork()
+            cache_before = session.validator.cache.stats()
+            intercepted = await session.replay(calls, keep_intercepted=False)
+            pending.append((session_id, metadata, asyncio.create_task(session.finish(intercepted, cache_before))))
+            count += 1
+            if len(pending) >= max_pending:
+                await write_oldest()
+        while pending:
+            await write_oldest()
+    finally:
+        for _, _, finishing in pending:
+            finishing.cancel()
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    return count
+
+
+async def grade_live(runner: 'TestRunner', lines: AsyncIterator[str], out: IO[str], max_pending: int = 8,
+                     drain: Optional[Callable[[], Awaitable[None]]] = None, store: Optional['ResultStore'] = None) -> int:
+    """
+    Grade sessions from a live line stream; returns the number of sessions
+
+    Unlike run_stream, a report is written as soon as its session and all
+    earlier ones are graded, without waiting for more input. At most
+    max_pending sessions are graded or waiting to be written at a time.
+    """
+    import asyncio
+    from transcript_stream import aiter_sessions, write_report
+
+    pending: 'asyncio.Queue' = asyncio.Queue()
+    slots = asyncio.Semaphore(max_pending)
+
+    async def emit():
+        try:
+            while True:
+                item = await pending.get()
+                if item is None:
+                    return
+                session_id, metadata, finishing = item
+                report = {**metadata, **(await finishing)}
+                write_report(out, report, session_id)
+                if store is not None:
+                    store.add(report, session_id)
+                if drain is not None:
+                    await drain()
+                slots.release()
+        except BaseException:
+            for _ in range(max_pending):
+                slots.release()  # let the reader notice instead of waiting for a slot
+            raise
+
+    emitter = asyncio.create_task(emit())
+    count = 0
+    try:
+        async for session_id, metadata, calls in aiter_sessions(lines):
+            await slots.acquire()
+            if emitter.done():
+                break
+            session = runner.fork()
+            cache_before = session.validator.cache.stats()
+            intercepted = await session.replay(calls, keep_intercepted=False)
+            pending.put_nowait((session_id, metadata, asyncio.create_task(session.finish(intercepted, cache_before))))
+            count += 1
+    finally:
+        pending.put_nowait(None)
+        try:
+            await emitter
+        finally:
+            while not pending.empty():
+                item = pending.get_nowait()
+                if item is not None:
+                    item[2].cancel()
+    return count
+
+
+async def _stdin_lines() -> AsyncIterator[str]:
+    """Lines of stdin, read in a thread so grading continues while input is idle"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            return
+        yield line
+
+
+class _SocketOut:
+    """Text adapter for an asyncio StreamWriter, as expected by write_report"""
+
+    def __init__(self, writer: Any):
+        self.writer = writer
+
+    def write(self, text: str):
+        self.writer.write(text.encode())
+
+    def flush(self):
+        pass
+
+
+async def serve(runner: 'TestRunner', address: str, max_pending: int = 8,
+                after_connection: Optional[Callable[[], None]] = None, store: Optional['ResultStore'] = None):
+    """Grade connections to a Unix socket (or stdin for '-') until interrupted"""
+    import asyncio
+    import signal
+    import stat
+    from transcript_stream import write_report
+
+    if address == '-':
+        count = await grade_live(runner, _stdin_lines(), sys.stdout, max_pending, store=store)
+        print(f"Graded {count} session(s)", file=sys.stderr)
+        return
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        out = _SocketOut(writer)
+
+        async def lines() -> AsyncIterator[str]:
+            async for line in reader:
+                yield line.decode('utf-8', errors='replace')
+
+        try:
+            await grade_live(runner, lines(), out, max_pending, writer.drain, store)
+        except (ValueError, asyncio.LimitOverrunError) as e:
+            write_report(out, {'error': str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            if after_connection is not None:
+                after_connection()
+
+    if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+        os.unlink(address)  # left over from a server that did not shut down cleanly
+    server = await asyncio.start_unix_server(handle, address, limit=MAX_LINE_BYTES)
+    loop = asyncio.get_running_loop()
+    serving = asyncio.current_task()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, serving.cancel)
+    print(f"Serving on {address}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        if os.path.exists(address):
+            os.unlink(address)
+
+
+def connect(address: str, source: IO[bytes], out: IO[bytes]) -> int:
+    """Send a transcript to a --serve proctor and copy its reports to out; returns the exit status"""
+    import socket
+    import threading
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(address)
+        except OSError as e:
+            print(f"Error: cannot connect to {address}: {e}", file=sys.stderr)
+            return 1
+
+        def send():
+            # In a thread, so reports are read while a long transcript is still being sent
+            try:
+                for chunk in iter(lambda: source.read(65536), b''):
+                    sock.sendall(chunk)
+                sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+        sender = threading.Thread(target=send, daemon=True)
+        sender.start()
+        for chunk in iter(lambda: sock.recv(65536), b''):
+            out.write(chunk)
+            out.flush()
+        sender.join()
+    return 0
+
+
+async def grade(args: argparse.Namespace):
+    """Build the runner and run the selected grading mode"""
+    from test_runner import TestRunner
+    from mcp_interceptor import RetentionPolicy
+    from instrumentation import Instrumentation, DISABLED
+    from manifest_loader import ManifestCache, MANIFESTS
+
+    # Get rules file path
+    rules_file = Path(args.manifest)
+
+    if not rules_file.exists():
+        print(f"Error: Rules file not found at {rules_file}", file=sys.stderr)
+        sys.exit(1)
+
+    # Create test runner
+    mode = args.retention or ('bounded' if args.input or args.serve else 'full')
+    retention = RetentionPolicy(mode, max_calls=args.max_calls, max_violations=args.max_calls)
+    instrumentation = Instrumentation() if args.metrics else DISABLED
+    manifests = ManifestCache(cache_dir=args.manifest_cache) if args.manifest_cache else MANIFESTS
+    semgrep = None
+    if manifests.load(str(rules_file)).plan.of_type('semgrep_scan'):
+        from semgrep_scanner import SemgrepScanner
+        semgrep = SemgrepScanner(max_workers=args.semgrep_workers, instrumentation=instrumentation,
+                                 engine=args.semgrep_engine)
+    verifier = None
+    if args.verify_runtime:
+        from runtime_verifier import RuntimeVerifier
+        rules = manifests.load(str(rules_file)).rules
+        verifier = RuntimeVerifier.from_manifest(rules, str(rules_file.parent / rules.get('repo_root', '.')),
+                                                 workers=args.verify_workers, timeout=args.verify_timeout,
+                                                 instrumentation=instrumentation)
+        await verifier.start()
+    runner = TestRunner(str(rules_file), semgrep=semgrep, retention=retention, instrumentation=instrumentation,
+                        manifests=manifests, verifier=verifier)
+
+    store = None
+    if args.db:
+        from result_store import ResultStore
+        store = ResultStore(args.db)
+    columns = None
+    if args.columns:
+        from violation_columns import ViolationColumns
+        columns = ViolationColumns()
+
+    def after_connection():
+        if args.metrics:
+            instrumentation.write_openmetrics(args.metrics)
+        if store is not None:
+            store.flush()
+
+    try:
+        if args.serve:
+            await serve(runner, args.serve, args.max_pending, after_connection=after_connection, store=store)
+        elif args.input:
+            count = await run_stream(runner, args.input, args.output, args.max_pending, store, columns)
+            print(f"Graded {count} session(s)", file=sys.stderr)
+            if columns is not None:
+                columns.save(args.columns)
+        else:
+            await run_examples(runner)
+    finally:
+        after_connection()
+        if store is not None:
+            store.close()
+        if verifier is not None:
+            verifier.close()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Run VAP Honeypot tests')
+    parser.add_argument('--manifest', default=str(Path(__file__).parent.parent / 'vap_manifest.yaml'),
+                        help='rules manifest (default: vap_manifest.yaml at the repo root)')
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument('--input', help="JSONL transcript file to grade, or '-' for stdin")
+    modes.add_argument('--serve', metavar='SOCKET', help="keep running and grade transcripts sent to this Unix socket, or '-' for stdin")
+    modes.add_argument('--connect', metavar='SOCKET', help='send stdin to a --serve proctor and print its reports')
+    parser.add_argument('--output', default='-', help="where to write JSONL reports with --input or --connect (default: stdout)")
+    parser.add_argument('--retention', choices=['full', 'bounded'],
+                        help="per-call detail kept in reports (default: bounded with --input, full otherwise)")
+    parser.add_argument('--max-calls', type=int, default=100, help='calls kept in bounded retention mode')
+    parser.add_argument('--semgrep-workers', type=int, help='concurrent semgrep processes (default: up to 4)')
+    parser.add_argument('--semgrep-engine', choices=['auto', 'process', 'structural'], default='auto',
+                        help='match simple semgrep rules in process (auto, the default), always run semgrep, '
+                             'or refuse rules that need it')
+    parser.add_argument('--max-pending', type=int, default=8,
+                        help='sessions whose final checks may run concurrently with --input or --serve')
+    parser.add_argument('--verify-runtime', action='store_true',
+                        help="run the tests relevant to each session's edits in warm sandboxes of the repository "
+                             "(manifest 'runtime_verification'; needs node_modules installed)")
+    parser.add_argument('--verify-workers', type=int, help='concurrent sandboxes for --verify-runtime')
+    parser.add_argument('--verify-timeout', type=float, help='seconds allowed per session for --verify-runtime')
+    parser.add_argument('--metrics', help='record stage and constraint timings and write them to this OpenMetrics file')
+    parser.add_argument('--manifest-cache', help='directory keeping parsed manifests between runs')
+    parser.add_argument('--db', help='also record every report in this SQLite result store with --input or --serve')
+    parser.add_argument('--columns', metavar='FILE.columns.json',
+                        help="with --input, also write every session's violations as one columnar export")
+    args = parser.parse_args()
+    if args.columns and not args.input:
+        parser.error('--columns needs --input')
+
+    if args.connect:
+        out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+        try:
+            sys.exit(connect(args.connect, sys.stdin.buffer, out))
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+
+    import asyncio
+    asyncio.run(grade(args))
+
+
 if __name__ == '__main__':
-    asyncio.run(main())
+    main()
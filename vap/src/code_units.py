@@ -0,0 +1,183 @@
+"""
+Code Units for VAP
+Splits source files into top-level units (functions, classes, statements)
+so analysis results can be cached and reused per unit
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from js_syntax import OPENERS, tokenize
+
+
+@dataclass(frozen=True)
+class CodeUnit:
+    """A run of whole lines; start_line is 1-based"""
+    start_line: int
+    text: str
+
+
+def split_units(content: str) -> List[CodeUnit]:
+    """
+    Split content into top-level units
+
+    A new unit starts at a non-indented line when the brackets opened so far
+    are balanced, so a function stays whole together with its body. Brackets
+    are counted on js_syntax tokens, and a line that begins inside a string,
+    template literal, regex or comment never starts a unit. Joining the unit
+    texts gives back content exactly.
+    """
+    units: List[CodeUnit] = []
+    current: List[str] = []
+    start = 1
+    boundaries = _boundaries(content)
+    for number, line in enumerate(content.splitlines(keepends=True), 1):
+        if number in boundaries and current:
+            units.append(CodeUnit(start, ''.join(current)))
+            current, start = [], number
+        current.append(line)
+    if current:
+        units.append(CodeUnit(start, ''.join(current)))
+    return units
+
+
+_COMMENT = re.compile(r'//[^\n]*|/\*[\s\S]*?(?:\*/|\Z)')
+
+
+def _boundaries(content: str) -> Set[int]:
+    """Numbers of the lines a unit may start at: outside brackets, literals and comments"""
+    tokens = tokenize(content)
+    boundaries: Set[int] = set()
+    i, depth, offset = 0, 0, 0
+    gap, comments = None, []
+    for number, line in enumerate(content.splitlines(keepends=True), 1):
+        while i < len(tokens) and tokens[i].start < offset:
+            tok = tokens[i]
+            if tok.kind == 'punct':
+                if tok.value in OPENERS:
+                    depth += 1
+                elif tok.value in (')', ']', '}'):
+                    depth -= 1
+            i += 1
+        if depth <= 0 and line[:1] not in ('', ' ', '\t', '\n', '\r', '}', ')', ']') and \
+                not (i and tokens[i - 1].end > offset):
+            # Between tokens there is only whitespace and comments; skip lines inside a comment
+            span = (tokens[i - 1].end if i else 0, tokens[i].start if i < len(tokens) else len(content))
+            if span != gap:
+                gap, comments = span, [(m.start(), m.end()) for m in _COMMENT.finditer(content, *span)]
+            if not any(s < offset < e for s, e in comments):
+                boundaries.add(number)
+        offset += len(line)
+    return boundaries
+
+
+# Imports and module-level variables that other units may refer to
+_DECLARATION = re.compile(r"(?:export\s+)?(?:import\b|const\b|let\b|var\b|['\"]use strict)")
+_FUNCTION_VALUE = re.compile(r'\bfunction\b|=>')
+
+
+def is_declaration(unit: CodeUnit) -> bool:
+    """True for an import or a module-level variable that is not function-valued"""
+    return bool(_DECLARATION.match(unit.text)) and not _FUNCTION_VALUE.search(unit.text)
+
+
+def scan_parts(content: str) -> List[Tuple[str, int, int]]:
+    """
+    Split content into separately scanned parts: (text, line offset, first line)
+
+    Declarations are scanned on their own. Every other unit is scanned
+    after all of the file's declarations, so a unit that reads a
+    module-level constant or import is analysed with it in scope. A hit at
+    line n of a part belongs to the file at n + line offset, and only hits
+    at or after first line belong to the part at all.
+    """
+    units = split_units(content)
+    declarations = [u for u in units if is_declaration(u)]
+    prelude = ''.join(u.text if u.text.endswith('\n') else u.text + '\n' for u in declarations)
+    skipped = prelude.count('\n')
+    parts = []
+    for unit in units:
+        if not prelude or is_declaration(unit):
+            parts.append((unit.text, unit.start_line - 1, 1))
+        else:
+            parts.append((prelude + unit.text, unit.start_line - 1 - skipped, skipped + 1))
+    return parts
+
+
+def changed_units(original: Optional[str], content: str) -> List[CodeUnit]:
+    """Units of content that do not occur unchanged in original (all of them for a new file)"""
+    if original is None:
+        return split_units(content)
+    before = {u.text for u in split_units(original)}
+    return [u for u in split_units(content) if u.text not in before]
+
+
+def safe_relative_path(path: str) -> str:
+    """Normalize an agent-supplied path so it stays inside the staging directory"""
+    parts = [p for p in os.path.normpath(path.replace('\\', '/')).split('/') if p not in ('', '.', '..')]
+    return os.path.join(*parts) if parts else 'unnamed'
+
+
+class _OriginalFiles:
+    """LRU of original file contents keyed by (path, mtime, size), bounded by total characters"""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.chars = 0
+        self._files: 'OrderedDict[Tuple[str, float, int], str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, path: str) -> str:
+        stat = os.stat(path)
+        key = (path, stat.st_mtime, stat.st_size)
+        with self._lock:
+            content = self._files.get(key)
+            if content is not None:
+                self._files.move_to_end(key)
+                return content
+        with open(path, 'r', errors='replace') as f:
+            content = f.read()
+        if len(content) > self.max_chars:
+            return content
+        with self._lock:
+            if key not in self._files:
+                self._files[key] = content
+                self.chars += len(content)
+            while self.chars > self.max_chars:
+                _, evicted = self._files.popitem(last=False)
+                self.chars -= len(evicted)
+        return content
+
+
+# Originals re-read on every edit_deltas call are kept, up to 32M characters in all
+ORIGINALS = _OriginalFiles(32 * 1024 * 1024)
+
+
+def read_original(repo_root: str, path: str) -> Optional[str]:
+    """
+    Content of path in the original repository checkout, or None if it
+    does not exist there. The agent-supplied path is normalized first, and
+    a path that resolves outside repo_root (e.g. through a symlink) is
+    treated as not existing.
+    """
+    root = os.path.realpath(repo_root)
+    full = os.path.realpath(os.path.join(root, safe_relative_path(path)))
+    if os.path.commonpath([root, full]) != root or not os.path.isfile(full):
+        return None
+    return ORIGINALS.read(full)
+
+
+def edit_delta(original: Optional[str], content: str) -> Dict[str, int]:
+    """How much of an edited file differs from the original, in units and lines"""
+    units = split_units(content)
+    changed = changed_units(original, content)
+    return {
+        'units': len(units),
+        'changed_units': len(changed),
+        'changed_lines': sum(u.text.count('\n') or 1 for u in changed),
+        'new_file': original is None,
+    }
@@ -0,0 +1,134 @@
+"""
+Constraint Plan for VAP Honeypot
+Compiles manifest constraints into an immutable, indexed evaluation plan
+"""
+
+import re
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Pattern, Tuple, Mapping
+from multi_pattern import MultiPatternMatcher
+
+
+@dataclass(frozen=True)
+class CompiledConstraint:
+    """A manifest constraint with its location parsed and pattern compiled"""
+    index: int
+    id: str
+    type: str
+    message: str
+    penalty: int
+    target_tool: Optional[str] = None
+    target_field: Optional[str] = None
+    regex: Optional[Pattern] = None
+    raw: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+
+
+def parse_location(location: str) -> Tuple[Optional[str], Optional[str]]:
+    """Split a 'tool_calls.<tool>.<field>' location into (tool, field)"""
+    if not location.startswith('tool_calls.'):
+        return None, None
+    parts = location.split('.')
+    target_tool = parts[1] if len(parts) > 1 and parts[1] else None
+    target_field = parts[2] if len(parts) > 2 and parts[2] else None
+    return target_tool, target_field
+
+
+def compile_constraint(index: int, constraint: Dict[str, Any]) -> CompiledConstraint:
+    """Compile a single manifest constraint"""
+    ctype = constraint.get('type')
+    target_tool, target_field, regex = None, None, None
+    if ctype == 'negative_regex':
+        target_tool, target_field = parse_location(constraint.get('location', ''))
+        pattern = constraint.get('pattern')
+        if pattern is None:
+            raise ValueError(f"Constraint {constraint.get('id')} has no 'pattern'")
+        try:
+            regex = re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Constraint {constraint.get('id')} has an invalid pattern: {e}") from e
+    return CompiledConstraint(
+        index=index,
+        id=constraint['id'],
+        type=ctype,
+        message=constraint.get('message', ''),
+        penalty=constraint.get('penalty', 0),
+        target_tool=target_tool,
+        target_field=target_field,
+        regex=regex,
+        raw=MappingProxyType(dict(constraint)),
+    )
+
+
+class ConstraintPlan:
+    """
+    Immutable evaluation plan built once from the manifest constraints.
+
+    Per-call constraints are indexed by their target tool so that a tool call
+    only visits the constraints whose tool is a substring of its name. The
+    resolution for each distinct tool name is memoized, together with one
+    MultiPatternMatcher per targeted field so each argument is scanned once.
+    """
+
+    MAX_RESOLVED_TOOLS = 4096
+
+    def __init__(self, constraints: List[Dict[str, Any]]):
+        """Compile all constraints and build the per-tool index"""
+        self.constraints: Tuple[CompiledConstraint, ...] = tuple(
+            compile_constraint(i, c) for i, c in enumerate(constraints)
+        )
+
+        by_type: Dict[str, List[CompiledConstraint]] = {}
+        for c in self.constraints:
+            by_type.setdefault(c.type, []).append(c)
+        self.by_type: Mapping[str, Tuple[CompiledConstraint, ...]] = MappingProxyType(
+            {t: tuple(cs) for t, cs in by_type.items()}
+        )
+
+        tool_index: Dict[str, List[CompiledConstraint]] = {}
+        for c in self.of_type('negative_regex'):
+            if c.target_tool and c.target_field:
+                tool_index.setdefault(c.target_tool, []).append(c)
+        self.tool_index: Mapping[str, Tuple[CompiledConstraint, ...]] = MappingProxyType(
+            {t: tuple(cs) for t, cs in tool_index.items()}
+        )
+        self._resolved: Dict[str, Tuple[CompiledConstraint, ...]] = {}
+        self._field_matchers: Dict[str, Tuple[Tuple[str, MultiPatternMatcher], ...]] = {}
+        self._matcher_cache: Dict[Tuple[int, ...], MultiPatternMatcher] = {}
+
+    def of_type(self, ctype: str) -> Tuple[CompiledConstraint, ...]:
+        """Return all constraints of the given type, in manifest order"""
+        return self.by_type.get(ctype, ())
+
+    def for_tool(self, tool_name: str) -> Tuple[CompiledConstraint, ...]:
+        """Return the per-call constraints that can apply to tool_name, in manifest order"""
+        resolved = self._resolved.get(tool_name)
+        if resolved is None:
+            matches = [c for target, cs in self.tool_index.items() if target in tool_name for c in cs]
+            resolved = tuple(sorted(matches, key=lambda c: c.index))
+            if len(self._resolved) >= self.MAX_RESOLVED_TOOLS:
+                self._resolved.pop(next(iter(self._resolved)))
+            self._resolved[tool_name] = resolved
+        return resolved
+
+    def matchers_for_tool(self, tool_name: str) -> Tuple[Tuple[str, MultiPatternMatcher], ...]:
+        """Return (field, matcher) pairs covering every per-call constraint that applies to tool_name"""
+        matchers = self._field_matchers.get(tool_name)
+        if matchers is None:
+            by_field: Dict[str, List[CompiledConstraint]] = {}
+            for c in self.for_tool(tool_name):
+                by_field.setdefault(c.target_field, []).append(c)
+            matchers = tuple((f, self._matcher(cs)) for f, cs in by_field.items())
+            if len(self._field_matchers) >= self.MAX_RESOLVED_TOOLS:
+                self._field_matchers.pop(next(iter(self._field_matchers)))
+            self._field_matchers[tool_name] = matchers
+        return matchers
+
+    def _matcher(self, constraints: List[CompiledConstraint]) -> MultiPatternMatcher:
+        """Return a shared matcher for this exact set of constraints"""
+        key = tuple(c.index for c in constraints)
+        matcher = self._matcher_cache.get(key)
+        if matcher is None:
+            matcher = MultiPatternMatcher([(c, c.regex) for c in constraints])
+            self._matcher_cache[key] = matcher
+        return matcher
@@ -0,0 +1,211 @@
+"""
+Event Bus for VAP
+Fans validated tool calls out to subscribers, off the tool-call path
+"""
+
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from rule_validator import Violation
+
+BACKPRESSURE_MODES = ('drop', 'block', 'sample')
+
+
+@dataclass(frozen=True)
+class ToolCallEvent:
+    """One validated tool call, as published to subscribers"""
+    seq: int
+    tool_name: str
+    tool_args: Dict[str, Any]
+    violations: Tuple[Violation, ...]
+    timestamp: float
+
+
+# Called with a batch of events; may be a coroutine function
+Handler = Callable[[List[ToolCallEvent]], Any]
+
+
+class Subscription:
+    """
+    One subscriber's bounded queue and delivery task
+
+    The handler gets a list of up to batch_size events, handed over once the
+    batch is full or flush_interval seconds after its first event. Coroutine
+    handlers are awaited on the event loop; plain functions run in a worker
+    thread, so a blocking writer does not stall the loop either.
+    When the queue is full, 'drop' discards the new event, 'block' makes the
+    publisher wait for room, and 'sample' admits one in sample_every new
+    events in place of the oldest queued one (the rest are dropped).
+    """
+
+    def __init__(self, handler: Handler, name: Optional[str] = None, max_queue: int = 1024, batch_size: int = 1,
+                 flush_interval: float = 0.05, backpressure: str = 'drop', sample_every: int = 10):
+        if backpressure not in BACKPRESSURE_MODES:
+            raise ValueError(f"Unknown backpressure mode: {backpressure!r}")
+        if max_queue < 1 or batch_size < 1 or sample_every < 1:
+            raise ValueError("max_queue, batch_size and sample_every must be at least 1")
+        self.handler = handler
+        self.name = name or getattr(handler, '__name__', type(handler).__name__)
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure = backpressure
+        self.sample_every = sample_every
+        self._is_coroutine = inspect.iscoroutinefunction(handler) or \
+            inspect.iscoroutinefunction(getattr(handler, '__call__', None))
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error: Optional[BaseException] = None
+        self._overflow = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind(self, loop: asyncio.AbstractEventLoop):
+        """Start the delivery task on loop, carrying over events queued under a previous loop"""
+        pending = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+        self._queue = asyncio.Queue(self.max_queue)
+        for event in pending:
+            self._queue.put_nowait(event)
+        self._loop = loop
+        self._task = loop.create_task(self._deliver())
+
+    def offer(self, event: ToolCallEvent) -> bool:
+        """Queue event without waiting; False when the publisher has to block for room"""
+        self.published += 1
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if self.backpressure == 'block':
+            return False
+        self.dropped += 1
+        if self.backpressure == 'sample':
+            self._overflow += 1
+            if self._overflow % self.sample_every == 0:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._queue.put_nowait(event)
+        return True
+
+    async def _deliver(self):
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                if self._is_coroutine:
+                    await self.handler(batch)
+                else:
+                    await asyncio.to_thread(self.handler, batch)
+                self.delivered += len(batch)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+                if self.errors == 1:
+                    print(f"Error in subscriber {self.name}: {e}")
+            finally:
+                self.batches += 1
+                for _ in batch:
+                    queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'backpressure': self.backpressure,
+            'published': self.published,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'errors': self.errors,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+class EventBus:
+    """
+    Publishes tool-call events to any number of subscriptions
+
+    Publishing only queues the event, so a slow subscriber adds no latency to
+    the call unless it asked for 'block' backpressure and its queue is full.
+    Delivery tasks start on the first event published in a running loop.
+    """
+
+    def __init__(self):
+        self.subscriptions: List[Subscription] = []
+        self._seq = 0
+
+    def subscribe(self, handler: Handler, **options) -> Subscription:
+        """Add a subscriber; options are those of Subscription"""
+        subscription = Subscription(handler, **options)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber, discarding its undelivered events"""
+        self.subscriptions.remove(subscription)
+        if subscription._task is not None:
+            subscription._task.cancel()
+
+    async def publish(self, tool_name: str, tool_args: Dict[str, Any], violations: List[Violation]):
+        """Queue a validated call for every subscriber"""
+        if not self.subscriptions:
+            return
+        self._seq += 1
+        event = ToolCallEvent(self._seq, tool_name, tool_args, tuple(violations), time.time())
+        loop = asyncio.get_running_loop()
+        for subscription in tuple(self.subscriptions):
+            if subscription._loop is not loop:
+                subscription._bind(loop)
+            if not subscription.offer(event):
+                await subscription._queue.put(event)
+
+    def pending(self) -> int:
+        """Events queued and not yet handed to their subscribers"""
+        return sum(s._queue.qsize() for s in self.subscriptions if s._queue is not None)
+
+    async def flush(self):
+        """
+        Wait until every queued event has been handed to its subscriber
+        (partial batches wait out flush_interval); events left queued under
+        a loop that has since stopped are delivered on this one
+        """
+        loop = asyncio.get_running_loop()
+        for subscription in self.subscriptions:
+            if subscription._loop is not loop and subscription._queue is not None and not subscription._queue.empty():
+                subscription._bind(loop)
+        await asyncio.gather(*(s._queue.join() for s in self.subscriptions if s._loop is loop))
+
+    async def close(self):
+        """Flush, then stop the delivery tasks"""
+        await self.flush()
+        for subscription in self.subscriptions:
+            if subscription._task is not None:
+                subscription._task.cancel()
+                subscription._task = None
+                subscription._loop = None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [s.stats() for s in self.subscriptions]
@@ -0,0 +1,177 @@
+"""
+Honeytoken Detector for VAP
+Finds planted secrets, plain or encoded, anywhere in a tool call's arguments
+"""
+
+import base64
+from bisect import bisect_left
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+from urllib.parse import quote, quote_plus
+from constraint_plan import CompiledConstraint
+
+# Shorter tokens (and the encoded forms of them) would match ordinary text
+MIN_TOKEN_LENGTH = 8
+ENCODINGS = ('plain', 'base64', 'url', 'reversed')
+# Joins the strings of one call so they are scanned in one pass; no token may contain it
+SEPARATOR = '\0'
+
+
+def _base64_forms(token: str) -> List[str]:
+    """
+    The token's base64 text as it appears inside a longer base64 string,
+    for each of the three byte alignments it can start at (characters that
+    also depend on neighbouring bytes are left out), in both alphabets
+    """
+    raw = token.encode('utf-8')
+    forms = []
+    for shift, first in ((0, 0), (1, 2), (2, 3)):
+        encoded = base64.b64encode(b'\0' * shift + raw).decode('ascii')
+        forms.append(encoded[first:(shift + len(raw)) * 8 // 6])
+    return forms + [f.replace('+', '-').replace('/', '_') for f in forms]
+
+
+def encoded_forms(token: str, encodings: Iterable[str]) -> Dict[str, str]:
+    """Every distinct string the token can appear as, mapped to the encoding that produced it"""
+    forms: Dict[str, str] = {}
+    for encoding in encodings:
+        if encoding == 'plain':
+            variants = [token]
+        elif encoding == 'base64':
+            variants = _base64_forms(token)
+        elif encoding == 'url':
+            variants = [quote(token, safe=''), quote_plus(token, safe=''), quote(token)]
+        elif encoding == 'reversed':
+            variants = [token[::-1]]
+        else:
+            raise ValueError(f"Unknown honeytoken encoding {encoding!r}; expected one of {', '.join(ENCODINGS)}")
+        for variant in variants:
+            forms.setdefault(variant, encoding)
+    return forms
+
+
+# q-gram length and probe stride of TokenIndex, for keys of at least this many characters
+GRAM = 8
+STRIDE = 8
+
+
+class TokenIndex:
+    """
+    Finds every occurrence of many literal strings in one pass
+
+    Every key of length L >= q + s - 1 contains, wherever it occurs, a
+    text position that is a multiple of the stride s at an offset below s
+    into the key. Indexing the q characters at offsets 0..s-1 of every key
+    therefore lets scan() probe only every s-th position of the text with
+    one dict lookup, and confirm the few candidates with str.startswith.
+    The work per character is the same for ten keys or ten thousand; q
+    and s shrink for short keys.
+    """
+
+    def __init__(self, keys: Iterable[Tuple[str, Any]]):
+        """Build the index from (string, value) pairs; a string may carry several values"""
+        keys = list(keys)
+        if not keys or not all(key for key, _ in keys):
+            raise ValueError("TokenIndex needs at least one key and no empty keys")
+        shortest = min(len(key) for key, _ in keys)
+        self.gram = min(GRAM, max(4, shortest - STRIDE + 1), shortest)
+        self.stride = min(STRIDE, shortest - self.gram + 1)
+        self._grams: Dict[str, List[Tuple[int, str, Any]]] = {}
+        for key, value in keys:
+            for offset in range(self.stride):
+                self._grams.setdefault(key[offset:offset + self.gram], []).append((offset, key, value))
+
+    def __len__(self) -> int:
+        """Number of indexed q-grams"""
+        return len(self._grams)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """Yield (start, end, value) for every occurrence, by increasing probe position"""
+        grams, gram = self._grams, self.gram
+        probes = [at for at in range(0, len(text) - gram + 1, self.stride) if text[at:at + gram] in grams]
+        for at in probes:
+            for offset, key, value in grams[text[at:at + gram]]:
+                start = at - offset
+                if start >= 0 and text.startswith(key, start):
+                    yield start, start + len(key), value
+
+
+def iter_strings(value: Any, top: Optional[str] = None) -> Iterator[Tuple[Optional[str], str]]:
+    """Yield (top-level argument, string) for every string key and value nested in value"""
+    stack = [(top, value)]
+    while stack:
+        field, item = stack.pop()
+        if isinstance(item, str):
+            yield field, item
+        elif isinstance(item, Mapping):
+            for key, sub in item.items():
+                sub_field = key if field is None and isinstance(key, str) else field
+                if isinstance(key, str):
+                    yield sub_field, key
+                stack.append((sub_field, sub))
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend((field, sub) for sub in item)
+
+
+class HoneytokenDetector:
+    """
+    One index over the planted secrets of every honeytoken constraint
+
+    A honeytoken constraint lists its secrets under 'tokens' and/or in a
+    'tokens_file' (one per line, relative to the manifest), and the forms
+    to look for under 'encodings' (default: all of ENCODINGS). scan()
+    joins every string in a call's arguments, at any depth and including
+    dict keys, and probes them once through a TokenIndex over every
+    encoded form of every token.
+    """
+
+    def __init__(self, constraints: Sequence[CompiledConstraint], base_dir: str = '.'):
+        """Load the tokens of every constraint and build the automaton"""
+        self.constraints = tuple(constraints)
+        keys = []
+        self.tokens = 0
+        for c in self.constraints:
+            encodings = c.raw.get('encodings', ENCODINGS)
+            for token in self._tokens(c, base_dir):
+                if len(token) < MIN_TOKEN_LENGTH:
+                    raise ValueError(f"Constraint {c.id}: honeytoken {token[:3]!r}... is shorter than {MIN_TOKEN_LENGTH} characters")
+                if SEPARATOR in token:
+                    raise ValueError(f"Constraint {c.id}: honeytokens cannot contain NUL")
+                self.tokens += 1
+                keys.extend((form, (c, encoding)) for form, encoding in encoded_forms(token, encodings).items())
+        self.index = TokenIndex(keys)
+
+    @staticmethod
+    def _tokens(constraint: CompiledConstraint, base_dir: str) -> List[str]:
+        tokens = list(constraint.raw.get('tokens') or [])
+        path = constraint.raw.get('tokens_file')
+        if path:
+            if not os.path.isabs(path) and not os.path.exists(path):
+                path = os.path.join(base_dir, path)
+            with open(path, 'r', encoding='utf-8') as f:
+                tokens.extend(line.strip() for line in f if line.strip())
+        if not tokens:
+            raise ValueError(f"Constraint {constraint.id} has no 'tokens' or 'tokens_file'")
+        return tokens
+
+    def scan(self, tool_args: Mapping[str, Any]) -> List[Tuple[CompiledConstraint, Optional[str], str]]:
+        """(constraint, top-level argument, encoding) of the leftmost hit of each constraint, in manifest order"""
+        fields: List[Optional[str]] = []
+        ends: List[int] = []
+        parts: List[str] = []
+        length = 0
+        for field, text in iter_strings(tool_args):
+            parts.append(text)
+            length += len(text)
+            fields.append(field)
+            ends.append(length)
+            length += len(SEPARATOR)
+        if not parts:
+            return []
+        found: Dict[str, Tuple[int, CompiledConstraint, Optional[str], str]] = {}
+        for start, end, (constraint, encoding) in self.index.iter_matches(SEPARATOR.join(parts)):
+            part = bisect_left(ends, end)  # matches never span the separator
+            seen = found.get(constraint.id)
+            if seen is None or start < seen[0]:
+                found[constraint.id] = (start, constraint, fields[part], encoding)
+        return [(c, field, encoding) for _, c, field, encoding in sorted(found.values(), key=lambda h: h[1].index)]
@@ -0,0 +1,185 @@
+"""
+Instrumentation for VAP
+Per-stage and per-constraint wall/CPU timing with OpenMetrics export
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class StageStats:
+    """Accumulated timings of one stage or constraint"""
+    __slots__ = ('count', 'wall', 'cpu', 'max_wall', 'violations')
+
+    def __init__(self):
+        self.count = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.max_wall = 0.0
+        self.violations = 0
+
+    def add(self, wall: float, cpu: float, count: int = 1, violations: int = 0):
+        self.count += count
+        self.wall += wall
+        self.cpu += cpu
+        self.violations += violations
+        if wall > self.max_wall:
+            self.max_wall = wall
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'count': self.count, 'wall_s': self.wall, 'cpu_s': self.cpu,
+                'max_wall_s': self.max_wall, 'violations': self.violations}
+
+
+class _NullStage:
+    """Context manager used when instrumentation is disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """One timed execution of a stage; elapsed and cpu_elapsed are set on exit"""
+    __slots__ = ('instrumentation', 'name', 'elapsed', 'cpu_elapsed')
+
+    def __init__(self, instrumentation: 'Instrumentation', name: str):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.elapsed = time.perf_counter()
+        self.cpu_elapsed = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.elapsed
+        self.cpu_elapsed = time.process_time() - self.cpu_elapsed
+        self.instrumentation.record(self.name, self.elapsed, self.cpu_elapsed)
+        return False
+
+
+class Instrumentation:
+    """
+    Collects per-stage and per-constraint timings
+
+    When disabled, stage() returns a shared no-op context manager and the
+    record methods return immediately, so instrumented code pays one
+    attribute check per call. A child (see child()) records into itself
+    and into its parent, which gives per-session numbers next to the
+    process-wide totals.
+    """
+
+    def __init__(self, enabled: bool = True, parent: Optional['Instrumentation'] = None):
+        self.enabled = enabled
+        self.parent = parent
+        self.stages: Dict[str, StageStats] = {}
+        self.constraints: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+
+    def child(self) -> 'Instrumentation':
+        """A fresh collector that also feeds this one (or this collector itself when disabled)"""
+        return Instrumentation(True, self) if self.enabled else self
+
+    def stage(self, name: str):
+        """Context manager timing one execution of stage name"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name: str, wall: float, cpu: float, count: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats()
+            stats.add(wall, cpu, count)
+        if self.parent is not None:
+            self.parent.record(name, wall, cpu, count)
+
+    def record_constraint(self, constraint_id: str, wall: float, cpu: float, violations: int = 0):
+        """One evaluation of a constraint; wall/cpu is the time of the check it took part in"""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.constraints.get(constraint_id)
+            if stats is None:
+                stats = self.constraints[constraint_id] = StageStats()
+            stats.add(wall, cpu, 1, violations)
+        if self.parent is not None:
+            self.parent.record_constraint(constraint_id, wall, cpu, violations)
+
+    def merge(self, snapshot: Dict[str, Any]):
+        """Add a snapshot taken elsewhere (e.g. in a worker process)"""
+        if not self.enabled or not snapshot:
+            return
+        for name, s in snapshot.get('stages', {}).items():
+            self.record(name, s['wall_s'], s['cpu_s'], s['count'])
+        for cid, s in snapshot.get('constraints', {}).items():
+            with self._lock:
+                stats = self.constraints.setdefault(cid, StageStats())
+                stats.add(s['wall_s'], s['cpu_s'], s['count'], s['violations'])
+        if self.parent is not None:
+            self.parent.merge({'constraints': snapshot.get('constraints', {})})
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'stages': {name: s.to_dict() for name, s in sorted(self.stages.items())},
+                'constraints': {cid: s.to_dict() for cid, s in sorted(self.constraints.items())},
+            }
+
+    def to_openmetrics(self, prefix: str = 'vap_grader') -> str:
+        """Render the totals as OpenMetrics text (counters, one sample per stage/constraint)"""
+        snapshot = self.snapshot()
+        lines = []
+        families = (
+            ('stage', 'stages', (('wall_seconds', 'wall_s', 'Wall-clock time spent in the grading stage'),
+                                 ('cpu_seconds', 'cpu_s', 'CPU time spent in the grading stage'),
+                                 ('executions', 'count', 'Executions of the grading stage'))),
+            ('constraint', 'constraints', (('wall_seconds', 'wall_s', 'Wall-clock time of checks covering the constraint'),
+                                           ('cpu_seconds', 'cpu_s', 'CPU time of checks covering the constraint'),
+                                           ('evaluations', 'count', 'Evaluations of the constraint'),
+                                           ('violations', 'violations', 'Violations of the constraint'))),
+        )
+        for label, section, metrics in families:
+            for suffix, field, help_text in metrics:
+                name = f"{prefix}_{label}_{suffix}"
+                lines.append(f"# TYPE {name} counter")
+                lines.append(f"# HELP {name} {help_text}.")
+                for key, stats in snapshot[section].items():
+                    lines.append(f'{name}_total{{{label}="{_escape(key)}"}} {stats[field]}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write_openmetrics(self, path: str, prefix: str = 'vap_grader'):
+        """Atomically (re)write an OpenMetrics file, e.g. for a node_exporter textfile collector"""
+        import tempfile
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(prefix='.vap-metrics-', dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.to_openmetrics(prefix))
+        os.replace(tmp, path)
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.constraints.clear()
+
+
+def _escape(value: str) -> str:
+    return re.sub(r'(["\\])', r'\\\1', value).replace('\n', r'\n')
+
+
+# Shared disabled instance: the default everywhere instrumentation is optional
+DISABLED = Instrumentation(enabled=False)
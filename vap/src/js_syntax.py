@@ -0,0 +1,1391 @@
+"""
+JS/TS Syntax for VAP
+Tolerant tokenizer and parser for the TypeScript and JavaScript agents write,
+building just enough of a syntax tree for structural pattern matching
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+KEYWORDS_BEFORE_EXPRESSION = frozenset({
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw', 'case', 'do', 'else',
+    'yield', 'await', 'extends',
+})
+# Names that never start an expression
+RESERVED = frozenset({
+    'break', 'case', 'catch', 'continue', 'debugger', 'default', 'do', 'else', 'export', 'extends', 'finally',
+    'for', 'if', 'return', 'switch', 'throw', 'try', 'var', 'const', 'while', 'with', 'in', 'instanceof',
+})
+BINARY_PRECEDENCE = {
+    '??': 1, '||': 2, '&&': 3, '|': 4, '^': 5, '&': 6,
+    '==': 7, '!=': 7, '===': 7, '!==': 7,
+    '<': 8, '>': 8, '<=': 8, '>=': 8, 'instanceof': 8, 'in': 8,
+    '<<': 9, '>>': 9, '>>>': 9, '+': 10, '-': 10, '*': 11, '/': 11, '%': 11, '**': 12,
+}
+# 'x as T' and 'x satisfies T' bind like relational operators
+CAST_PRECEDENCE = 8
+ASSIGN_OPS = frozenset({'=', '+=', '-=', '*=', '/=', '%=', '**=', '<<=', '>>=', '>>>=', '&=', '|=', '^=',
+                        '&&=', '||=', '??='})
+UNARY_OPS = frozenset({'!', '-', '+', '~', '++', '--'})
+UNARY_KEYWORDS = frozenset({'typeof', 'void', 'delete', 'await'})
+CLASS_MODIFIERS = frozenset({'public', 'private', 'protected', 'static', 'readonly', 'abstract', 'override',
+                             'declare', 'async', 'get', 'set', 'accessor'})
+TYPE_PREFIXES = frozenset({'keyof', 'typeof', 'readonly', 'unique', 'infer', 'new', 'asserts', 'abstract'})
+
+_PUNCTUATORS = sorted("""
+>>>= ... === !== **= <<= >>= >>> ??= &&= ||= => == != <= >= && || ?? ?. ++ -- += -= *= /= %= &= |= ^= << >> **
+{ } ( ) [ ] ; , < > + - * / % & | ^ ! ~ ? : = . @
+""".split(), key=len, reverse=True)
+_TOKEN = re.compile(r"""
+    (?P<space>[ \t\f\v\r\u00a0\ufeff]+)
+  | (?P<newline>[\n\u2028\u2029])
+  | (?P<comment>//[^\n]*|/\*[\s\S]*?(?:\*/|\Z))
+  | (?P<name>\#?[A-Za-z_$\u0080-\uffff][\w$\u0080-\uffff]*)
+  | (?P<num>(?:0[xXoObB][\da-fA-F_]+|(?:\d[\d_]*(?:\.[\d_]*)?|\.\d[\d_]*)(?:[eE][+-]?\d+)?)n?)
+  | (?P<str>'(?:[^'\\\n]|\\[\s\S])*'|"(?:[^"\\\n]|\\[\s\S])*")
+  | (?P<punct>""" + '|'.join(re.escape(p) if p != '?.' else r'\?\.(?!\d)' for p in _PUNCTUATORS) + r"""
+      |[\s\S])
+""", re.X)
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0'}
+_ESCAPE = re.compile(r"\\(u\{[0-9a-fA-F]+\}|u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|\r\n|[\s\S])")
+OPENERS = {'(': ')', '[': ']', '{': '}'}
+
+
+class ParseError(ValueError):
+    """Source (or a pattern) the parser cannot make sense of"""
+
+
+class Token:
+    """A lexical token; start and end are offsets into the source, nl is set after a line break"""
+    __slots__ = ('kind', 'value', 'start', 'end', 'nl', 'parts')
+
+    def __init__(self, kind: str, value, start: int, end: int, nl: bool, parts=None):
+        self.kind = kind
+        self.value = value
+        self.start = start
+        self.end = end
+        self.nl = nl
+        self.parts = parts
+
+    def __repr__(self):
+        return f"Token({self.kind}, {self.value!r}, {self.start})"
+
+
+class Node:
+    """
+    A syntax tree node
+
+    kind is one of the expression kinds (name, num, str, template, regex,
+    member, index, call, new, tagged, binary, unary, update, assign, cond,
+    seq, array, object, prop, spread, func, class, field, cast for the
+    TypeScript 'as', 'satisfies' and '<T>' forms, nonnull for '!') or
+    statement kinds
+    (block, var, decl, destructure, if, loop, switch, case, try, stmt,
+    opaque). value is kind-specific (a name, operator, literal or tuple of
+    bound names); const is filled in by constant propagation.
+    """
+    __slots__ = ('kind', 'value', 'kids', 'start', 'end', 'const')
+
+    def __init__(self, kind: str, value=None, kids: Tuple[Optional['Node'], ...] = (), start: int = 0, end: int = 0):
+        self.kind = kind
+        self.value = value
+        self.kids = kids
+        self.start = start
+        self.end = end
+        self.const = None
+
+    def __repr__(self):
+        return f"Node({self.kind}, {self.value!r}, {list(self.kids)!r})"
+
+
+def iter_nodes(root: Node):
+    """Every node under root (root included), parents before children"""
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(kid for kid in reversed(node.kids) if kid is not None)
+
+
+def decode_string(body: str) -> str:
+    """Value of a string literal body (without quotes)"""
+    if '\\' not in body:
+        return body
+
+    def unescape(m):
+        s = m.group(1)
+        if s[0] == 'u':
+            return chr(int(s[2:-1] if s[1] == '{' else s[1:], 16))
+        if s[0] == 'x':
+            return chr(int(s[1:], 16))
+        if s in ('\n', '\r\n', '\r', '\u2028', '\u2029'):
+            return ''
+        return _ESCAPES.get(s, s)
+    return _ESCAPE.sub(unescape, body)
+
+
+def _regex_allowed(prev: Optional[Token]) -> bool:
+    if prev is None:
+        return True
+    if prev.kind in ('num', 'str', 'template', 'regex'):
+        return False
+    if prev.kind == 'name':
+        return prev.value in KEYWORDS_BEFORE_EXPRESSION
+    return prev.value not in (')', ']', '}', '++', '--')
+
+
+def _scan_regex(src: str, pos: int) -> Optional[int]:
+    """End of the regex literal whose opening '/' is at pos, or None"""
+    i, n, in_class = pos + 1, len(src), False
+    while i < n:
+        ch = src[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '\n':
+            return None
+        if in_class:
+            in_class = ch != ']'
+        elif ch == '[':
+            in_class = True
+        elif ch == '/':
+            i += 1
+            while i < n and (src[i].isalnum() or src[i] == '_'):
+                i += 1
+            return i
+        i += 1
+    return None
+
+
+def _scan_template(src: str, pos: int) -> Tuple[Token, int]:
+    """The template literal whose backquote is at pos, and the offset after it"""
+    quasis, parts = [], []
+    i, n, start = pos + 1, len(src), pos + 1
+    while i < n:
+        ch = src[i]
+        if ch == '\\':
+            i += 2
+        elif ch == '`':
+            quasis.append(src[start:i])
+            return Token('template', tuple(quasis), pos, i + 1, False, parts), i + 1
+        elif ch == '$' and src.startswith('{', i + 1):
+            quasis.append(src[start:i])
+            tokens, i = _tokenize(src, i + 2, True)
+            parts.append(tokens)
+            start = i
+        else:
+            i += 1
+    quasis.append(src[start:n])
+    return Token('template', tuple(quasis), pos, n, False, parts), n
+
+
+def _tokenize(src: str, pos: int, substitution: bool) -> Tuple[List[Token], int]:
+    tokens: List[Token] = []
+    prev: Optional[Token] = None
+    nl = False
+    depth = 0
+    n = len(src)
+    match = _TOKEN.match
+    while pos < n:
+        ch = src[pos]
+        if ch == '`':
+            token, end = _scan_template(src, pos)
+        elif ch == '/' and _regex_allowed(prev) and not src.startswith(('//', '/*'), pos):
+            end = _scan_regex(src, pos)
+            if end is None:
+                token, end = Token('punct', '/', pos, pos + 1, nl), pos + 1
+            else:
+                token = Token('regex', src[pos:end], pos, end, nl)
+        else:
+            m = match(src, pos)
+            kind, end = m.lastgroup, m.end()
+            if kind == 'space':
+                pos = end
+                continue
+            if kind == 'newline' or kind == 'comment':
+                nl = nl or kind == 'newline' or '\n' in m.group()
+                pos = end
+                continue
+            value = m.group()
+            if kind == 'str':
+                value = decode_string(value[1:-1])
+            elif kind == 'punct':
+                if value == '{':
+                    depth += 1
+                elif value == '}':
+                    if substitution and depth == 0:
+                        return tokens, end
+                    depth -= 1
+            token = Token(kind, value, pos, end, nl)
+        token.nl = nl
+        tokens.append(token)
+        prev, nl, pos = token, False, end
+    return tokens, pos
+
+
+def tokenize(src: str) -> List[Token]:
+    """Tokens of src, without whitespace and comments"""
+    return _tokenize(src, 0, False)[0]
+
+
+def _pair_brackets(tokens: Sequence[Token]) -> Dict[int, int]:
+    """Index of the closing bracket for every opening bracket that has one"""
+    pairs: Dict[int, int] = {}
+    stack: List[int] = []
+    for i, tok in enumerate(tokens):
+        if tok.kind != 'punct':
+            continue
+        v = tok.value
+        if v in OPENERS:
+            stack.append(i)
+        elif v in (')', ']', '}'):
+            # Unwind to the matching opener, leaving stray brackets unpaired
+            for depth in range(len(stack) - 1, -1, -1):
+                if OPENERS[tokens[stack[depth]].value] == v:
+                    pairs[stack[depth]] = i
+                    del stack[depth:]
+                    break
+    return pairs
+
+
+class Parser:
+    """
+    Recursive-descent parser over one token list
+
+    Statements that do not parse are skipped up to the next statement
+    boundary, and the bracketed groups inside them are still parsed, so
+    a construct the parser does not know hides nothing nested in it. In
+    pattern mode '...' is an ellipsis and string literals of '...' match
+    any string.
+    """
+
+    def __init__(self, tokens: List[Token], pattern: bool = False):
+        self.tokens = tokens
+        self.pattern = pattern
+        self.pairs = _pair_brackets(tokens)
+        self.i = 0
+        self.end = len(tokens)
+        last = tokens[-1].end if tokens else 0
+        self.eof = Token('eof', None, last, last, True)
+
+    # -- token access --------------------------------------------------------
+
+    @property
+    def tok(self) -> Token:
+        return self.tokens[self.i] if self.i < self.end else self.eof
+
+    def peek(self, ahead: int = 1) -> Token:
+        j = self.i + ahead
+        return self.tokens[j] if j < self.end else self.eof
+
+    def at(self, value: str, kind: str = 'punct') -> bool:
+        tok = self.tok
+        return tok.kind == kind and tok.value == value
+
+    def expect(self, value: str):
+        if not self.at(value):
+            raise ParseError(f"expected {value!r} at offset {self.tok.start}")
+        self.i += 1
+
+    def closing(self, i: int) -> int:
+        """Index of the bracket closing the one at i (the end of the range if unclosed)"""
+        j = self.pairs.get(i)
+        if j is None or j >= self.end:
+            raise ParseError(f"unbalanced {self.tokens[i].value!r} at offset {self.tokens[i].start}")
+        return j
+
+    def within(self, close: int, parse):
+        """Run parse over the tokens before index close, which it must consume entirely"""
+        saved = self.end
+        self.end = close
+        try:
+            result = parse()
+            if self.i != close:
+                raise ParseError(f"unexpected {self.tok.value!r} at offset {self.tok.start}")
+        finally:
+            self.end = saved
+        self.i = close + 1
+        return result
+
+    def previous_end(self) -> int:
+        return self.tokens[self.i - 1].end
+
+    # -- statements ----------------------------------------------------------
+
+    def statements(self) -> List[Node]:
+        """Statements up to the end of the current range"""
+        out = []
+        while self.i < self.end:
+            start = self.i
+            try:
+                stmt = self.statement()
+            except ParseError:
+                self.i = start
+                stmt = self.recover()
+            if self.i == start:
+                self.i += 1
+            if stmt is not None:
+                out.append(stmt)
+        return out
+
+    def recover(self) -> Node:
+        """Skip a statement that does not parse, keeping whatever its brackets contain"""
+        start = self.tok.start
+        kids = []
+        first = True
+        while self.i < self.end:
+            tok = self.tok
+            if not first and tok.nl:
+                break
+            first = False
+            if tok.kind == 'punct' and tok.value == ';':
+                self.i += 1
+                break
+            if tok.kind == 'punct' and tok.value in OPENERS and self.i in self.pairs and self.pairs[self.i] < self.end:
+                close = self.pairs[self.i]
+                saved, self.end = self.end, close
+                self.i += 1
+                kids.extend(self.statements())
+                self.end, self.i = saved, close + 1
+            elif tok.kind == 'template':
+                kids.append(self.template(tok))
+                self.i += 1
+            else:
+                self.i += 1
+        return Node('opaque', None, tuple(kids), start, self.previous_end())
+
+    def block(self) -> Node:
+        start = self.tok.start
+        close = self.closing(self.i)
+        self.i += 1
+        saved, self.end = self.end, close
+        try:
+            body = self.statements()
+        finally:
+            self.end = saved
+        self.i = close + 1
+        return Node('block', None, tuple(body), start, self.previous_end())
+
+    def end_statement(self):
+        tok = self.tok
+        if tok.kind == 'punct' and tok.value == ';':
+            self.i += 1
+        elif not (tok.kind == 'eof' or tok.nl or (tok.kind == 'punct' and tok.value == '}')):
+            raise ParseError(f"unexpected {tok.value!r} at offset {tok.start}")
+
+    def skip_statement(self):
+        """Skip a declaration that holds no code (ambient, interface, re-export...)"""
+        first = True
+        while self.i < self.end:
+            tok = self.tok
+            if not first and tok.nl:
+                return
+            first = False
+            if tok.kind == 'punct':
+                if tok.value == ';':
+                    self.i += 1
+                    return
+                if tok.value in OPENERS:
+                    self.i = self.closing(self.i) + 1
+                    if tok.value == '{':
+                        return
+                    continue
+            self.i += 1
+
+    def statement(self) -> Optional[Node]:
+        tok = self.tok
+        if tok.kind == 'punct':
+            if tok.value == ';':
+                self.i += 1
+                return None
+            if tok.value == '{':
+                return self.block()
+            if tok.value == '@':
+                self.decorators()
+                return self.statement()
+        elif tok.kind == 'name':
+            handler = getattr(self, '_stmt_' + tok.value, None) if tok.value.isidentifier() else None
+            if handler is not None:
+                result = handler()
+                if result is not NotImplemented:
+                    return result
+            nxt = self.peek()
+            if nxt.kind == 'punct' and nxt.value == ':' and tok.value not in RESERVED:
+                self.i += 2  # label
+                return self.statement()
+        start = tok.start
+        expr = self.expression()
+        self.end_statement()
+        return Node('stmt', None, (expr,), start, expr.end)
+
+    def _stmt_var(self):
+        return self.variables()
+
+    def _stmt_const(self):
+        if self.peek().kind == 'name' and self.peek().value == 'enum':
+            self.skip_statement()
+            return None
+        return self.variables()
+
+    def _stmt_let(self):
+        nxt = self.peek()
+        if nxt.kind == 'name' or (nxt.kind == 'punct' and nxt.value in ('[', '{')):
+            return self.variables()
+        return NotImplemented
+
+    def variables(self, in_for: bool = False) -> Node:
+        start = self.tok.start
+        kind = self.tok.value
+        self.i += 1
+        decls = []
+        while True:
+            decl_start = self.tok.start
+            simple = self.tok.kind == 'name' and self.tok.value not in RESERVED
+            names, defaults = self.binding()
+            if self.at('!'):
+                self.i += 1
+            if self.at(':'):
+                self.i += 1
+                self.skip_type()
+            init = None
+            if self.at('='):
+                self.i += 1
+                init = self.assign(no_in=in_for)
+            if simple:
+                decls.append(Node('decl', names[0], (init,) if init else (), decl_start, self.previous_end()))
+            else:
+                decls.append(Node('destructure', tuple(names), tuple(defaults) + ((init,) if init else ()),
+                                  decl_start, self.previous_end()))
+            if not self.at(','):
+                break
+            self.i += 1
+        if not in_for:
+            self.end_statement()
+        return Node('var', kind, tuple(decls), start, self.previous_end())
+
+    def binding(self) -> Tuple[List[str], List[Node]]:
+        """Names bound by a binding pattern, and the default values inside it"""
+        tok = self.tok
+        if tok.kind == 'name':
+            self.i += 1
+            return [tok.value], []
+        if tok.kind != 'punct' or tok.value not in ('[', '{'):
+            raise ParseError(f"expected a binding at offset {tok.start}")
+        names: List[str] = []
+        defaults: List[Node] = []
+        close = self.closing(self.i)
+        self.i += 1
+        saved, self.end = self.end, close
+        try:
+            while self.i < close:
+                if self.at(','):
+                    self.i += 1
+                    continue
+                if self.at('...'):
+                    self.i += 1
+                    n, d = self.binding()
+                elif tok.value == '[':
+                    n, d = self.binding()
+                else:
+                    key = self.tok
+                    if key.kind == 'punct' and key.value == '[':
+                        self.i = self.closing(self.i) + 1
+                    else:
+                        self.i += 1
+                    if self.at(':'):
+                        self.i += 1
+                        n, d = self.binding()
+                    elif key.kind == 'name':
+                        n, d = [key.value], []
+                    else:
+                        raise ParseError(f"expected a binding at offset {key.start}")
+                names.extend(n)
+                defaults.extend(d)
+                if self.at('='):
+                    self.i += 1
+                    defaults.append(self.assign())
+                if self.i < close:
+                    self.expect(',')
+        finally:
+            self.end = saved
+        self.i = close + 1
+        return names, defaults
+
+    def _stmt_function(self):
+        start = self.tok.start
+        self.i += 1
+        if self.at('*'):
+            self.i += 1
+        name = None
+        if self.tok.kind == 'name':
+            name = self.tok.value
+            self.i += 1
+        func = self.function_rest(start)
+        return Node('var', 'function', (Node('decl', name, (func,), start, func.end),), start, func.end) \
+            if name else func
+
+    def _stmt_async(self):
+        nxt = self.peek()
+        if nxt.kind == 'name' and nxt.value == 'function' and not nxt.nl:
+            self.i += 1
+            return self._stmt_function()
+        return NotImplemented
+
+    def _stmt_class(self):
+        start = self.tok.start
+        name = self.peek().value if self.peek().kind == 'name' and self.peek().value not in ('extends', 'implements') else None
+        cls = self.class_rest()
+        return Node('var', 'class', (Node('decl', name, (cls,), start, cls.end),), start, cls.end) if name else cls
+
+    def _stmt_abstract(self):
+        if self.peek().kind == 'name' and self.peek().value == 'class':
+            self.i += 1
+            return self._stmt_class()
+        return NotImplemented
+
+    def _stmt_if(self):
+        start = self.tok.start
+        self.i += 1
+        test = self.parenthesized()
+        cons = self.statement()
+        alt = None
+        if self.at('else', 'name'):
+            self.i += 1
+            alt = self.statement()
+        return Node('if', None, (test, cons, alt), start, self.previous_end())
+
+    def _stmt_while(self):
+        start = self.tok.start
+        self.i += 1
+        test = self.parenthesized()
+        body = self.statement()
+        return Node('loop', 'while', (None, test, None, body), start, self.previous_end())
+
+    def _stmt_do(self):
+        start = self.tok.start
+        self.i += 1
+        body = self.statement()
+        if not self.at('while', 'name'):
+            raise ParseError(f"expected 'while' at offset {self.tok.start}")
+        self.i += 1
+        test = self.parenthesized()
+        if self.at(';'):
+            self.i += 1
+        return Node('loop', 'do', (None, test, None, body), start, self.previous_end())
+
+    def _stmt_for(self):
+        start = self.tok.start
+        self.i += 1
+        if self.at('await', 'name'):
+            self.i += 1
+        if not self.at('('):
+            raise ParseError(f"expected '(' at offset {self.tok.start}")
+        close = self.closing(self.i)
+        self.i += 1
+        init, test, update = self.within(close, self._for_head)
+        body = self.statement()
+        return Node('loop', 'for', (init, test, update, body), start, self.previous_end())
+
+    def _for_head(self):
+        init = test = update = None
+        if not self.at(';'):
+            tok = self.tok
+            declares = tok.kind == 'name' and tok.value in ('var', 'let', 'const') and (
+                self.peek().kind == 'name' or self.peek().value in ('[', '{'))
+            init = self.variables(in_for=True) if declares else self.expression(no_in=True)
+            if self.tok.kind == 'name' and self.tok.value in ('of', 'in'):
+                # for (x of xs): whatever the head binds changes on every iteration
+                self.i += 1
+                if declares:
+                    bound = tuple(n for d in init.kids for n in ((d.value,) if d.kind == 'decl' else d.value))
+                    target = Node('destructure', bound, (), init.start, init.end)
+                else:
+                    target = Node('assign', '=', (init, Node('opaque', None, (), init.end, init.end)),
+                                  init.start, init.end)
+                return target, self.expression(), None
+        self.expect(';')
+        if not self.at(';'):
+            test = self.expression()
+        self.expect(';')
+        if self.i < self.end:
+            update = self.expression()
+        return init, test, update
+
+    def _stmt_switch(self):
+        start = self.tok.start
+        self.i += 1
+        disc = self.parenthesized()
+        if not self.at('{'):
+            raise ParseError(f"expected '{{' at offset {self.tok.start}")
+        close = self.closing(self.i)
+        self.i += 1
+        cases = []
+        saved, self.end = self.end, close
+        try:
+            while self.i < close:
+                case_start = self.tok.start
+                if self.at('case', 'name'):
+                    self.i += 1
+                    test = self.expression()
+                elif self.at('default', 'name'):
+                    self.i += 1
+                    test = None
+                else:
+                    raise ParseError(f"expected 'case' at offset {self.tok.start}")
+                self.expect(':')
+                body = []
+                while self.i < close and not (self.tok.kind == 'name' and self.tok.value in ('case', 'default')
+                                               and self.peek().value != '.'):
+                    stmt_start = self.i
+                    try:
+                        stmt = self.statement()
+                    except ParseError:
+                        self.i = stmt_start
+                        stmt = self.recover()
+                    if self.i == stmt_start:
+                        self.i += 1
+                    if stmt is not None:
+                        body.append(stmt)
+                cases.append(Node('case', None, (test,) + tuple(body), case_start, self.previous_end()))
+        finally:
+            self.end = saved
+        self.i = close + 1
+        return Node('switch', None, (disc,) + tuple(cases), start, self.previous_end())
+
+    def _stmt_try(self):
+        start = self.tok.start
+        self.i += 1
+        block = self.block()
+        param = handler = final = None
+        if self.at('catch', 'name'):
+            self.i += 1
+            names: List[str] = []
+            if self.at('('):
+                close = self.closing(self.i)
+                self.i += 1
+                saved, self.end = self.end, close
+                try:
+                    names, _ = self.binding()
+                    if self.at(':'):
+                        self.i += 1
+                        self.skip_type()
+                finally:
+                    self.end = saved
+                self.i = close + 1
+            param = Node('destructure', tuple(names), (), start, start)
+            handler = self.block()
+        if self.at('finally', 'name'):
+            self.i += 1
+            final = self.block()
+        return Node('try', None, (block, param, handler, final), start, self.previous_end())
+
+    def _stmt_return(self):
+        start = self.tok.start
+        self.i += 1
+        tok = self.tok
+        if tok.kind == 'eof' or tok.nl or (tok.kind == 'punct' and tok.value in (';', '}')):
+            self.end_statement()
+            return None
+        expr = self.expression()
+        self.end_statement()
+        return Node('stmt', 'return', (expr,), start, expr.end)
+
+    _stmt_throw = _stmt_return
+
+    def _stmt_break(self):
+        self.i += 1
+        if self.tok.kind == 'name' and not self.tok.nl:
+            self.i += 1
+        self.end_statement()
+        return None
+
+    _stmt_continue = _stmt_break
+
+    def _stmt_debugger(self):
+        self.i += 1
+        self.end_statement()
+        return None
+
+    def _stmt_import(self):
+        nxt = self.peek()
+        if nxt.kind == 'punct' and nxt.value in ('(', '.'):
+            return NotImplemented
+        self.skip_statement()
+        return None
+
+    def _stmt_export(self):
+        self.i += 1
+        tok = self.tok
+        if tok.kind == 'name' and tok.value == 'default':
+            self.i += 1
+            return self.statement()
+        if tok.kind == 'punct' and tok.value == '=':
+            self.i += 1
+            return self.statement()
+        if (tok.kind == 'punct' and tok.value in ('*', '{')) or (tok.kind == 'name' and tok.value == 'type'
+                                                                   and self.peek().value == '{'):
+            self.skip_statement()
+            return None
+        return self.statement()
+
+    def _stmt_declare(self):
+        if self.peek().kind == 'name' and not self.peek().nl:
+            self.skip_statement()
+            return None
+        return NotImplemented
+
+    def _stmt_interface(self):
+        if self.peek().kind == 'name' and not self.peek().nl:
+            self.skip_statement()
+            return None
+        return NotImplemented
+
+    def _stmt_enum(self):
+        return self._stmt_interface()
+
+    def _stmt_type(self):
+        nxt = self.peek()
+        after = self.peek(2)
+        if nxt.kind == 'name' and not nxt.nl and after.kind == 'punct' and after.value in ('=', '<'):
+            self.i += 2
+            if self.at('<'):
+                self.skip_angle()
+            self.expect('=')
+            self.skip_type()
+            self.end_statement()
+            return None
+        return NotImplemented
+
+    def _stmt_namespace(self):
+        nxt = self.peek()
+        if nxt.kind in ('name', 'str') and not nxt.nl:
+            self.i += 2
+            while self.at('.'):
+                self.i += 2
+            if self.at('{'):
+                return self.block()
+            self.end_statement()
+            return None
+        return NotImplemented
+
+    _stmt_module = _stmt_namespace
+
+    def decorators(self):
+        while self.at('@'):
+            self.i += 1
+            self.call_expression()
+
+    # -- types ---------------------------------------------------------------
+
+    def skip_angle(self):
+        """Skip a balanced <...> group (type parameters or arguments)"""
+        depth = 0
+        while self.i < self.end:
+            tok = self.tok
+            if tok.kind == 'punct':
+                v = tok.value
+                if v in OPENERS:
+                    self.i = self.closing(self.i) + 1
+                    continue
+                if v == '<':
+                    depth += 1
+                elif v in ('>', '>>', '>>>'):
+                    depth -= len(v)
+                    if depth <= 0:
+                        self.i += 1
+                        if depth < 0:
+                            raise ParseError(f"unbalanced '>' at offset {tok.start}")
+                        return
+                elif v in (';', '}', ')', ']', '=', '&&', '||', '+', '!', '=='):
+                    raise ParseError(f"unexpected {v!r} in type arguments at offset {tok.start}")
+            self.i += 1
+        raise ParseError("unterminated type arguments")
+
+    def skip_type(self, stops: Tuple[str, ...] = ()):
+        """Skip a type annotation, stopping before the first token that cannot continue it"""
+        complete = False
+        while self.i < self.end:
+            tok = self.tok
+            kind, v = tok.kind, tok.value
+            if complete:
+                if tok.nl and not (kind == 'punct' and v in ('|', '&', '.')):
+                    return
+                if kind == 'punct':
+                    if v in ('.', '|', '&'):
+                        complete = False
+                    elif v == '[':
+                        self.i = self.closing(self.i) + 1
+                        continue
+                    elif v == '<':
+                        self.skip_angle()
+                        continue
+                    elif v == '=>' and '=>' not in stops:
+                        complete = False
+                    else:
+                        return
+                elif kind == 'name' and v in ('extends', 'is'):
+                    complete = False
+                else:
+                    return
+                self.i += 1
+                continue
+            if kind == 'punct':
+                if v in OPENERS:
+                    self.i = self.closing(self.i) + 1
+                    complete = True
+                    continue
+                if v == '<':
+                    self.skip_angle()
+                    continue
+                if v not in ('|', '&', '-', '...', '?'):
+                    return
+                self.i += 1
+                continue
+            if kind == 'eof':
+                return
+            self.i += 1
+            complete = not (kind == 'name' and v in TYPE_PREFIXES)
+            if kind == 'name' and v == 'asserts' and self.tok.kind == 'name' and not self.tok.nl:
+                complete = False
+
+    def try_type_arguments(self) -> bool:
+        """Skip '<...>' when it is the type arguments of a call, leaving the position unchanged otherwise"""
+        start = self.i
+        try:
+            self.skip_angle()
+        except ParseError:
+            self.i = start
+            return False
+        tok = self.tok
+        if (tok.kind == 'punct' and tok.value == '(') or tok.kind == 'template':
+            return True
+        self.i = start
+        return False
+
+    # -- expressions ---------------------------------------------------------
+
+    def parenthesized(self) -> Node:
+        if not self.at('('):
+            raise ParseError(f"expected '(' at offset {self.tok.start}")
+        close = self.closing(self.i)
+        self.i += 1
+        return self.within(close, self.expression)
+
+    def expression(self, no_in: bool = False) -> Node:
+        first = self.assign(no_in)
+        if not self.at(','):
+            return first
+        items = [first]
+        while self.at(','):
+            self.i += 1
+            items.append(self.assign(no_in))
+        return Node('seq', None, tuple(items), first.start, items[-1].end)
+
+    def assign(self, no_in: bool = False) -> Node:
+        arrow = self.arrow()
+        if arrow is not None:
+            return arrow
+        tok = self.tok
+        if tok.kind == 'name' and tok.value == 'yield':
+            self.i += 1
+            nxt = self.tok
+            if nxt.kind == 'eof' or nxt.nl or (nxt.kind == 'punct' and nxt.value in (')', ']', '}', ',', ';', ':')):
+                return Node('name', 'yield', (), tok.start, tok.end)
+            if self.at('*'):
+                self.i += 1
+            arg = self.assign(no_in)
+            return Node('unary', 'yield', (arg,), tok.start, arg.end)
+        left = self.conditional(no_in)
+        tok = self.tok
+        if tok.kind == 'punct' and tok.value in ASSIGN_OPS:
+            self.i += 1
+            right = self.assign(no_in)
+            return Node('assign', tok.value, (left, right), left.start, right.end)
+        return left
+
+    def conditional(self, no_in: bool = False) -> Node:
+        test = self.binary(0, no_in)
+        if not self.at('?'):
+            return test
+        self.i += 1
+        cons = self.assign()
+        self.expect(':')
+        alt = self.assign(no_in)
+        return Node('cond', None, (test, cons, alt), test.start, alt.end)
+
+    def binary(self, min_prec: int, no_in: bool = False) -> Node:
+        left = self.unary()
+        while True:
+            tok = self.tok
+            op = tok.value
+            if op == '!' and tok.kind == 'punct' and not tok.nl:
+                # Like semgrep's TypeScript grammar, a trailing '!' applies to the whole operation before it
+                if min_prec > 0:
+                    break
+                self.i += 1
+                left = Node('nonnull', None, (left,), left.start, tok.end)
+                continue
+            if tok.kind == 'name':
+                if op in ('as', 'satisfies') and not tok.nl:
+                    if CAST_PRECEDENCE < min_prec:
+                        break
+                    self.i += 1
+                    if self.at('const', 'name'):
+                        self.i += 1
+                    else:
+                        self.skip_type()
+                    left = Node('cast', op, (left,), left.start, self.previous_end())
+                    continue
+                if op not in ('in', 'instanceof') or (op == 'in' and no_in):
+                    break
+            elif tok.kind != 'punct':
+                break
+            prec = BINARY_PRECEDENCE.get(op)
+            if prec is None or prec < min_prec:
+                break
+            self.i += 1
+            right = self.binary(prec if op == '**' else prec + 1, no_in)
+            left = Node('binary', op, (left, right), left.start, right.end)
+        return left
+
+    def unary(self, type_arguments: bool = True) -> Node:
+        tok = self.tok
+        if tok.kind == 'punct' and tok.value in UNARY_OPS:
+            self.i += 1
+            arg = self.unary(type_arguments)
+            kind = 'update' if tok.value in ('++', '--') else 'unary'
+            return Node(kind, tok.value, (arg,), tok.start, arg.end)
+        if tok.kind == 'name' and tok.value in UNARY_KEYWORDS:
+            nxt = self.peek()
+            if not (nxt.kind == 'punct' and nxt.value in (')', ']', '}', ',', ';', ':', '=', '.', '?.', '=>')) \
+                    and nxt.kind != 'eof':
+                self.i += 1
+                # semgrep reads 'await f<T>(x)' as comparisons, not a call; so does this parser
+                arg = self.unary(type_arguments and tok.value != 'await')
+                return Node('unary', tok.value, (arg,), tok.start, arg.end)
+        if tok.kind == 'punct' and tok.value == '<' and not self.pattern:
+            # <T>expr type assertion
+            self.skip_angle()
+            arg = self.unary(type_arguments)
+            return Node('cast', '<>', (arg,), tok.start, arg.end)
+        node = self.call_expression(type_arguments=type_arguments)
+        tok = self.tok
+        if tok.kind == 'punct' and tok.value in ('++', '--') and not tok.nl:
+            self.i += 1
+            return Node('update', tok.value, (node,), node.start, tok.end)
+        return node
+
+    def call_expression(self, allow_calls: bool = True, type_arguments: bool = True) -> Node:
+        node = self.primary()
+        while True:
+            tok = self.tok
+            v = tok.value
+            if tok.kind == 'punct':
+                if v == '.' or v == '?.':
+                    self.i += 1
+                    if v == '?.' and self.at('('):
+                        if not allow_calls:
+                            break
+                        node = self.call(node)
+                        continue
+                    if v == '?.' and self.at('['):
+                        node = self.index(node)
+                        continue
+                    name = self.tok
+                    if name.kind != 'name':
+                        raise ParseError(f"expected a property name at offset {name.start}")
+                    self.i += 1
+                    node = Node('member', name.value, (node,), node.start, name.end)
+                elif v == '[':
+                    node = self.index(node)
+                elif v == '(':
+                    if not allow_calls:
+                        break
+                    node = self.call(node)
+                elif v == '!' and not tok.nl and (self.peek().kind == 'template' or (
+                        self.peek().kind == 'punct' and self.peek().value in ('.', '?.', '[', '('))):
+                    self.i += 1
+                    node = Node('nonnull', None, (node,), node.start, tok.end)
+                elif v == '<' and type_arguments and not self.pattern and self.try_type_arguments():
+                    continue
+                else:
+                    break
+            elif tok.kind == 'template':
+                self.i += 1
+                template = self.template(tok)
+                node = Node('tagged', None, (node, template), node.start, tok.end)
+            else:
+                break
+        return node
+
+    def index(self, obj: Node) -> Node:
+        close = self.closing(self.i)
+        self.i += 1
+        prop = self.within(close, self.expression)
+        return Node('index', None, (obj, prop), obj.start, self.previous_end())
+
+    def call(self, callee: Node) -> Node:
+        args = self.arguments()
+        return Node('call', None, (callee,) + args, callee.start, self.previous_end())
+
+    def arguments(self) -> Tuple[Node, ...]:
+        close = self.closing(self.i)
+        self.i += 1
+        return self.within(close, self._elements)
+
+    def _elements(self) -> Tuple[Node, ...]:
+        items = []
+        while self.i < self.end:
+            if self.at(','):
+                self.i += 1
+                continue
+            items.append(self.element())
+            if self.i < self.end:
+                self.expect(',')
+        return tuple(items)
+
+    def element(self) -> Node:
+        tok = self.tok
+        if tok.kind == 'punct' and tok.value == '...':
+            if self.pattern:
+                self.i += 1
+                return Node('ellipsis', None, (), tok.start, tok.end)
+            self.i += 1
+            arg = self.assign()
+            return Node('spread', None, (arg,), tok.start, arg.end)
+        return self.assign()
+
+    def template(self, tok: Token) -> Node:
+        subs = []
+        for tokens in tok.parts:
+            sub = Parser(tokens, self.pattern)
+            subs.append(sub.within(len(tokens), sub.expression) if tokens else
+                        Node('opaque', None, (), tok.start, tok.start))
+        return Node('template', tok.value, tuple(subs), tok.start, tok.end)
+
+    def primary(self) -> Node:
+        tok = self.tok
+        kind, v = tok.kind, tok.value
+        if kind == 'name':
+            if v == 'function':
+                self.i += 1
+                if self.at('*'):
+                    self.i += 1
+                if self.tok.kind == 'name':
+                    self.i += 1
+                return self.function_rest(tok.start)
+            if v == 'class':
+                return self.class_rest()
+            if v == 'new':
+                return self.new()
+            if v in RESERVED:
+                raise ParseError(f"unexpected {v!r} at offset {tok.start}")
+            if v == 'async':
+                nxt = self.peek()
+                if nxt.kind == 'name' and nxt.value == 'function' and not nxt.nl:
+                    self.i += 1
+                    return self.primary()
+            self.i += 1
+            if self.pattern and _METAVARIABLE.match(v):
+                return Node('metavar', v, (), tok.start, tok.end)
+            return Node('name', v, (), tok.start, tok.end)
+        if kind == 'str':
+            self.i += 1
+            if self.pattern and v == '...':
+                return Node('anystr', None, (), tok.start, tok.end)
+            return Node('str', v, (), tok.start, tok.end)
+        if kind == 'num':
+            self.i += 1
+            return Node('num', v, (), tok.start, tok.end)
+        if kind == 'template':
+            self.i += 1
+            return self.template(tok)
+        if kind == 'regex':
+            self.i += 1
+            return Node('regex', v, (), tok.start, tok.end)
+        if kind == 'punct':
+            if v == '(':
+                close = self.closing(self.i)
+                self.i += 1
+                inner = self.within(close, self.expression)
+                # Parentheses only widen the range of what they enclose
+                node = Node(inner.kind, inner.value, inner.kids, tok.start, self.previous_end())
+                node.const = inner.const
+                return node
+            if v == '[':
+                start = tok.start
+                items = self.arguments()
+                return Node('array', None, items, start, self.previous_end())
+            if v == '{':
+                return self.object()
+            if v == '...' and self.pattern:
+                self.i += 1
+                return Node('ellipsis', None, (), tok.start, tok.end)
+            if v == '#':
+                self.i += 1
+                return self.primary()
+        raise ParseError(f"unexpected {v!r} at offset {tok.start}")
+
+    def new(self) -> Node:
+        tok = self.tok
+        self.i += 1
+        if self.at('.'):
+            self.i += 2  # new.target
+            return Node('name', 'new.target', (), tok.start, self.previous_end())
+        callee = self.call_expression(allow_calls=False)
+        args: Tuple[Node, ...] = ()
+        if self.at('<'):
+            self.try_type_arguments()
+        if self.at('('):
+            args = self.arguments()
+        return Node('new', None, (callee,) + args, tok.start, self.previous_end())
+
+    def object(self) -> Node:
+        start = self.tok.start
+        close = self.closing(self.i)
+        self.i += 1
+        props = self.within(close, self._properties)
+        return Node('object', None, props, start, self.previous_end())
+
+    def _properties(self) -> Tuple[Node, ...]:
+        props = []
+        while self.i < self.end:
+            if self.at(','):
+                self.i += 1
+                continue
+            tok = self.tok
+            if tok.kind == 'punct' and tok.value == '...':
+                props.append(self.element())
+            else:
+                props.append(self.property())
+            if self.i < self.end:
+                self.expect(',')
+        return tuple(props)
+
+    def property(self) -> Node:
+        start = self.tok.start
+        while self.tok.kind == 'name' and self.tok.value in ('async', 'get', 'set') and not (
+                self.peek().kind == 'punct' and self.peek().value in (',', ':', '(', '=', '<')) and self.peek().kind != 'eof':
+            self.i += 1
+        if self.at('*'):
+            self.i += 1
+        key = self.tok
+        computed = None
+        if key.kind == 'punct' and key.value == '[':
+            close = self.closing(self.i)
+            self.i += 1
+            computed = self.within(close, self.assign)
+        elif key.kind in ('name', 'str', 'num'):
+            self.i += 1
+        else:
+            raise ParseError(f"unexpected {key.value!r} in object literal at offset {key.start}")
+        name = key.value if computed is None else None
+        if self.at('(') or self.at('<'):
+            value = self.function_rest(start)
+        elif self.at(':'):
+            self.i += 1
+            value = self.assign()
+        elif key.kind == 'name' and computed is None:
+            value = Node('name', key.value, (), key.start, key.end)
+            if self.at('='):
+                self.i += 1
+                default = self.assign()
+                value = Node('assign', '=', (value, default), key.start, default.end)
+        else:
+            raise ParseError(f"expected ':' at offset {self.tok.start}")
+        kids = (computed, value) if computed is not None else (value,)
+        return Node('prop', name, kids, start, value.end)
+
+    def arrow(self) -> Optional[Node]:
+        """An arrow function starting here, or None (without moving)"""
+        start = self.i
+        tok = self.tok
+        if tok.kind == 'name' and tok.value == 'async' and not self.peek().nl and (
+                self.peek().kind == 'name' or self.peek().value in ('(', '<')):
+            self.i += 1
+            tok = self.tok
+        if tok.kind == 'name' and tok.value not in RESERVED:
+            nxt = self.peek()
+            if nxt.kind == 'punct' and nxt.value == '=>' and not nxt.nl:
+                self.i += 2
+                return self.function_body(self.tokens[start].start, (tok.value,), ())
+            self.i = start
+            return None
+        if tok.kind == 'punct' and tok.value == '<' and not self.pattern:
+            try:
+                self.skip_angle()
+            except ParseError:
+                self.i = start
+                return None
+            tok = self.tok
+        if not (tok.kind == 'punct' and tok.value == '('):
+            self.i = start
+            return None
+        close = self.pairs.get(self.i)
+        if close is None or close >= self.end:
+            self.i = start
+            return None
+        after = self.tokens[close + 1] if close + 1 < self.end else self.eof
+        if after.kind == 'punct' and after.value == ':':
+            saved = self.i
+            self.i = close + 2
+            try:
+                self.skip_type(stops=('=>',))
+            except ParseError:
+                self.i = start
+                return None
+            is_arrow = self.at('=>')
+            self.i = saved
+        else:
+            is_arrow = after.kind == 'punct' and after.value == '=>'
+        if not is_arrow:
+            self.i = start
+            return None
+        names, defaults = self.parameters()
+        if self.at(':'):
+            self.i += 1
+            self.skip_type(stops=('=>',))
+        self.expect('=>')
+        return self.function_body(self.tokens[start].start, names, defaults)
+
+    def parameters(self) -> Tuple[Tuple[str, ...], Tuple[Node, ...]]:
+        """Names and default values of a parenthesized parameter list"""
+        close = self.closing(self.i)
+        self.i += 1
+        names: List[str] = []
+        defaults: List[Node] = []
+        saved, self.end = self.end, close
+        try:
+            while self.i < close:
+                if self.at(','):
+                    self.i += 1
+                    continue
+                self.decorators()
+                while self.tok.kind == 'name' and self.tok.value in CLASS_MODIFIERS and (
+                        self.peek().kind == 'name' or self.peek().value in ('[', '{')):
+                    self.i += 1
+                if self.at('...'):
+                    self.i += 1
+                n, d = self.binding()
+                names.extend(n)
+                defaults.extend(d)
+                if self.at('?'):
+                    self.i += 1
+                if self.at(':'):
+                    self.i += 1
+                    self.skip_type()
+                if self.at('='):
+                    self.i += 1
+                    defaults.append(self.assign())
+                if self.i < close:
+                    self.expect(',')
+        finally:
+            self.end = saved
+        self.i = close + 1
+        return tuple(names), tuple(defaults)
+
+    def function_rest(self, start: int) -> Node:
+        """Type parameters, parameters, return type and body of a function"""
+        if self.at('<'):
+            self.skip_angle()
+        if not self.at('('):
+            raise ParseError(f"expected '(' at offset {self.tok.start}")
+        names, defaults = self.parameters()
+        if self.at(':'):
+            self.i += 1
+            self.skip_type(stops=('{',))
+        if not self.at('{'):
+            # An overload or abstract method has no body
+            self.end_statement()
+            return Node('func', names, defaults + (Node('block', None, (), start, start),), start, self.previous_end())
+        body = self.block()
+        return Node('func', names, defaults + (body,), start, body.end)
+
+    def function_body(self, start: int, names: Tuple[str, ...], defaults: Tuple[Node, ...]) -> Node:
+        body = self.block() if self.at('{') else self.assign()
+        return Node('func', names, defaults + (body,), start, body.end)
+
+    def class_rest(self) -> Node:
+        start = self.tok.start
+        self.i += 1
+        while self.i < self.end and not self.at('{'):
+            if self.tok.kind == 'punct' and self.tok.value in ('(', '['):
+                self.i = self.closing(self.i) + 1
+            else:
+                self.i += 1
+        close = self.closing(self.i)
+        self.i += 1
+        members = self.within(close, self._members)
+        return Node('class', None, members, start, self.previous_end())
+
+    def _members(self) -> Tuple[Node, ...]:
+        members = []
+        while self.i < self.end:
+            start = self.i
+            try:
+                member = self.member()
+            except ParseError:
+                self.i = start
+                member = self.recover()
+            if self.i == start:
+                self.i += 1
+            if member is not None:
+                members.append(member)
+        return tuple(members)
+
+    def member(self) -> Optional[Node]:
+        if self.at(';'):
+            self.i += 1
+            return None
+        self.decorators()
+        start = self.tok.start
+        while self.tok.kind == 'name' and self.tok.value in CLASS_MODIFIERS and not self.peek().nl and not (
+                self.peek().kind == 'punct' and self.peek().value in ('(', '=', ';', ':', '?', '!', '<', '}')):
+            self.i += 1
+        if self.at('static', 'name') and self.peek().value == '{':
+            self.i += 1
+            return self.block()
+        if self.at('*'):
+            self.i += 1
+        key = self.tok
+        if key.kind == 'punct' and key.value == '[':
+            self.i = self.closing(self.i) + 1
+        elif key.kind in ('name', 'str', 'num'):
+            self.i += 1
+        elif key.kind == 'punct' and key.value == '#':
+            self.i += 2
+        else:
+            raise ParseError(f"unexpected {key.value!r} in class body at offset {key.start}")
+        if self.at('?') or self.at('!'):
+            self.i += 1
+        if self.at('(') or self.at('<'):
+            return self.function_rest(start)
+        if self.at(':'):
+            self.i += 1
+            self.skip_type(stops=('=',))
+        value = None
+        if self.at('='):
+            self.i += 1
+            value = self.assign()
+        self.end_statement()
+        return Node('field', key.value, (value,) if value else (), start, self.previous_end())
+
+
+_METAVARIABLE = re.compile(r'\$[A-Z_][A-Z_0-9]*$')
+
+
+def parse_module(src: str) -> Node:
+    """Syntax tree of a whole file"""
+    parser = Parser(tokenize(src))
+    return Node('block', None, tuple(parser.statements()), 0, len(src))
+
+
+def parse_pattern(text: str) -> Node:
+    """Syntax tree of a semgrep-style expression pattern; raises ParseError if it is not one expression"""
+    tokens = tokenize(text)
+    if tokens and tokens[-1].kind == 'punct' and tokens[-1].value == ';':
+        tokens.pop()
+    if not tokens:
+        raise ParseError("empty pattern")
+    parser = Parser(tokens, pattern=True)
+    return parser.within(len(tokens), parser.expression)
@@ -0,0 +1,42 @@
+"""
+Latency Statistics for VAP
+Bounded sample reservoir with percentile summaries
+"""
+
+import math
+from collections import deque
+from typing import Any, Deque, Dict
+
+
+class LatencyStats:
+    """Keeps the most recent max_samples durations (seconds) and summarizes them in ms"""
+
+    def __init__(self, max_samples: int = 10000):
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile of the retained samples, in seconds"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        rank = max(1, math.ceil(p / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean_ms': (self.total / self.count * 1000) if self.count else 0.0,
+            'p50_ms': self.percentile(50) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max * 1000,
+        }
@@ -0,0 +1,301 @@
+"""
+Leaderboard for VAP
+Streams TestRunner reports into persistent per-agent, per-test aggregates
+and renders them as Markdown, CSV or JSON
+"""
+
+import csv
+import json
+import math
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from result_store import ResultStore
+    from violation_columns import ViolationColumns
+
+# Scores are histogrammed in buckets of this width, so p50 is exact to it
+SCORE_RESOLUTION = 0.1
+# Violation ids listed per leaderboard row
+TOP_VIOLATIONS = 3
+# Columnar exports (proctor.py --columns); like .json files they are written once
+COLUMNS_SUFFIX = '.columns.json'
+
+
+def violation_ids(res: Dict[str, Any]) -> List[str]:
+    """Constraint ids of a result's 'violations' list"""
+    return [v['constraint_id'] for v in res.get('violations', [])]
+
+
+def agent_of(res: Dict[str, Any]) -> str:
+    """Agent a result belongs to: 'agent_name', else transcript metadata 'agent' or 'agent_id'"""
+    return str(res.get('agent_name') or res.get('agent') or res.get('agent_id') or 'unknown')
+
+
+def has_score(res: Dict[str, Any]) -> bool:
+    """Whether a result carries a score (errors and aborted runs do not)"""
+    return 'score' in res or 'final_score' in res
+
+
+def score_of(res: Dict[str, Any]) -> float:
+    """A result's score: 'score' in leaderboard rows, 'final_score' in TestRunner reports"""
+    return float(res['score'] if 'score' in res else res['final_score'])
+
+
+@dataclass
+class Aggregate:
+    """Running statistics of one agent on one test (or, merged, on all tests)"""
+    runs: int = 0
+    passes: int = 0
+    score_sum: float = 0.0
+    best: float = -math.inf
+    # score bucket -> runs; at most 100 / SCORE_RESOLUTION + 1 entries
+    histogram: Counter = field(default_factory=Counter)
+    # constraint id -> runs that violated it (bounded by the constraints in the manifests)
+    violations: Counter = field(default_factory=Counter)
+
+    def add(self, score: float, passed: bool, ids: Iterable[str]):
+        self.runs += 1
+        self.passes += bool(passed)
+        self.score_sum += score
+        if score > self.best:
+            self.best = score
+        self.histogram[round(score / SCORE_RESOLUTION)] += 1
+        self.violations.update(set(ids))
+
+    def merge(self, other: 'Aggregate'):
+        self.runs += other.runs
+        self.passes += other.passes
+        self.score_sum += other.score_sum
+        self.best = max(self.best, other.best)
+        self.histogram.update(other.histogram)
+        self.violations.update(other.violations)
+
+    @property
+    def mean(self) -> float:
+        return self.score_sum / self.runs if self.runs else 0.0
+
+    @property
+    def pass_rate(self) -> float:
+        return self.passes / self.runs if self.runs else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile of the scores, to SCORE_RESOLUTION"""
+        if not self.runs:
+            return 0.0
+        rank = max(1, math.ceil(p / 100 * self.runs))
+        seen = 0
+        for bucket in sorted(self.histogram):
+            seen += self.histogram[bucket]
+            if seen >= rank:
+                return bucket * SCORE_RESOLUTION
+        return self.best
+
+    def top_violations(self, n: int = TOP_VIOLATIONS) -> List[Tuple[str, int]]:
+        """Most frequently violated constraint ids, ties broken by id"""
+        return sorted(self.violations.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'runs': self.runs, 'passes': self.passes, 'score_sum': self.score_sum,
+                'best': self.best if self.runs else None,
+                'histogram': {str(k): v for k, v in self.histogram.items()},
+                'violations': dict(self.violations)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Aggregate':
+        return cls(data['runs'], data['passes'], data['score_sum'],
+                   -math.inf if data['best'] is None else data['best'],
+                   Counter({int(k): v for k, v in data['histogram'].items()}), Counter(data['violations']))
+
+
+def iter_reports(path: str, offset: int = 0) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """
+    Yield (report, offset after it) from a .jsonl file, or from a .json file
+    holding one report or a list of them. JSONL is read from offset, and a
+    last line without its newline (still being written) is left for later.
+    """
+    if path.endswith('.json'):
+        with open(path, 'rb') as f:
+            data = json.load(f)
+            end = f.tell()
+        reports = data if isinstance(data, list) else [data]
+        for i, report in enumerate(reports, 1):
+            yield report, end if i == len(reports) else offset
+        return
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                return
+            offset += len(line)
+            if line.strip():
+                yield json.loads(line), offset
+
+
+class Leaderboard:
+    """
+    Per (agent, test id) aggregates, updated one report at a time
+
+    Memory grows with the number of agent/test pairs only, never with the
+    number of reports. save() and load() persist the aggregates together
+    with how far each input file (or ResultStore) has been read, so
+    ingesting a directory, an append-only JSONL file or a store again only
+    reads what is new. .json files and columnar exports are expected to be
+    written once; a replaced one is read again in full.
+    """
+
+    FORMAT = 1
+
+    def __init__(self):
+        self.aggregates: Dict[Tuple[str, str], Aggregate] = {}
+        # input file -> [device, inode, bytes consumed]; for a ResultStore, the last run id instead
+        self.sources: Dict[str, List[int]] = {}
+        self.skipped = 0
+
+    def add(self, res: Dict[str, Any]):
+        """Fold one result into the board; results without a score (e.g. errors) are counted as skipped"""
+        if not has_score(res):
+            self.skipped += 1
+            return
+        key = (agent_of(res), str(res.get('test_id', 'UNKNOWN')))
+        aggregate = self.aggregates.get(key)
+        if aggregate is None:
+            aggregate = self.aggregates[key] = Aggregate()
+        aggregate.add(score_of(res), res.get('passed', False), violation_ids(res))
+
+    def add_all(self, results: Iterable[Dict[str, Any]]):
+        for res in results:
+            self.add(res)
+
+    def add_columns(self, columns: 'ViolationColumns') -> int:
+        """Fold a columnar export (proctor.py --columns) in, one result per session; returns the sessions added"""
+        ids = columns.constraint_ids_by_session()
+        for session, meta in enumerate(columns.sessions):
+            self.add({**meta, 'violations': [{'constraint_id': cid} for cid in ids.get(session, ())]})
+        return len(columns.sessions)
+
+    def ingest(self, path: str) -> int:
+        """Add the reports of a file or directory not seen before; returns the number of reports read"""
+        if os.path.isdir(path):
+            return sum(self.ingest(str(p)) for p in sorted(Path(path).iterdir())
+                       if p.suffix in ('.json', '.jsonl') and p.is_file())
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        device, inode, consumed = self.sources.get(path, (st.st_dev, st.st_ino, 0))
+        if (device, inode) != (st.st_dev, st.st_ino) or st.st_size < consumed:
+            consumed = 0  # replaced or truncated: a new file under the same name
+        if st.st_size == consumed:
+            return 0
+        if path.endswith(COLUMNS_SUFFIX):
+            from violation_columns import ViolationColumns
+            with open(path) as f:
+                count = self.add_columns(ViolationColumns.from_dict(json.load(f)))
+            self.sources[path] = [st.st_dev, st.st_ino, st.st_size]
+            return count
+        count = 0
+        for report, consumed in iter_reports(path, consumed):
+            self.add(report)
+            count += 1
+        self.sources[path] = [st.st_dev, st.st_ino, consumed]
+        return count
+
+    def ingest_store(self, store: 'ResultStore') -> int:
+        """Add the runs of a ResultStore not seen before; returns the number of runs read"""
+        path = os.path.abspath(store.path)
+        device, inode = store.identity()
+        seen_device, seen_inode, last_id = self.sources.get(path, (device, inode, 0))
+        if (seen_device, seen_inode) != (device, inode):
+            last_id = 0  # a new database under the same name
+        count = 0
+        for last_id, res in store.results(after_id=last_id):
+            self.add(res)
+            count += 1
+        self.sources[path] = [device, inode, last_id]
+        return count
+
+    def agents(self) -> Dict[str, Aggregate]:
+        """Every agent's aggregate over all its tests"""
+        totals: Dict[str, Aggregate] = {}
+        for (agent, _), aggregate in self.aggregates.items():
+            totals.setdefault(agent, Aggregate()).merge(aggregate)
+        return totals
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """One flat row per agent and test, best mean score first"""
+        ranked = sorted(self.aggregates.items(), key=lambda kv: (-kv[1].mean, kv[0]))
+        return [_row({'agent': agent, 'test_id': test_id}, aggregate) for (agent, test_id), aggregate in ranked]
+
+    def agent_rows(self) -> List[Dict[str, Any]]:
+        ranked = sorted(self.agents().items(), key=lambda kv: (-kv[1].mean, kv[0]))
+        return [_row({'agent': agent}, aggregate) for agent, aggregate in ranked]
+
+    def to_markdown(self, limit: Optional[int] = None) -> str:
+        """The board as Markdown: agents overall, then the first limit agent/test rows"""
+        lines = ["# 🏆 VAP Benchmark Leaderboard", "",
+                 "| Rank | Agent ID | Runs | Mean | Best | P50 | Pass Rate |",
+                 "| :--- | :--- | ---: | ---: | ---: | ---: | ---: |"]
+        for rank, row in enumerate(self.agent_rows(), 1):
+            lines.append(f"| {rank} | {row['agent']} | {row['runs']} | {row['mean']:.1f} | {row['best']:.1f} | "
+                         f"{row['p50']:.1f} | {row['pass_rate']:.0%} |")
+        rows = self.rows()
+        lines += ["", "## Results by Test", "",
+                  "| Agent ID | Test ID | Runs | Mean | Best | P50 | Pass Rate | Key Violations |",
+                  "| :--- | :--- | ---: | ---: | ---: | ---: | ---: | :--- |"]
+        for row in rows[:limit]:
+            lines.append(f"| {row['agent']} | {row['test_id']} | {row['runs']} | {row['mean']:.1f} | {row['best']:.1f} | "
+                         f"{row['p50']:.1f} | {row['pass_rate']:.0%} | {row['top_violations'] or 'None'} |")
+        if limit is not None and len(rows) > limit:
+            lines += ["", f"_{len(rows) - limit} more rows in the CSV/JSON export._"]
+        return '\n'.join(lines) + '\n'
+
+    def write_csv(self, out: IO[str]):
+        writer = csv.DictWriter(out, fieldnames=['agent', 'test_id', 'runs', 'mean', 'best', 'p50', 'pass_rate', 'top_violations'])
+        writer.writeheader()
+        writer.writerows(self.rows())
+
+    def write_json(self, out: IO[str]):
+        json.dump({'agents': self.agent_rows(), 'results': self.rows()}, out, indent=2)
+        out.write('\n')
+
+    def save(self, path: str):
+        """Atomically write the aggregates and input offsets"""
+        import tempfile
+        state = {
+            'format': self.FORMAT,
+            'aggregates': [[agent, test_id, aggregate.to_dict()] for (agent, test_id), aggregate in self.aggregates.items()],
+            'sources': self.sources,
+        }
+        fd, tmp = tempfile.mkstemp(prefix='.leaderboard-', dir=os.path.dirname(os.path.abspath(path)))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'Leaderboard':
+        """A board from save(); an empty board if path does not exist"""
+        board = cls()
+        if not os.path.exists(path):
+            return board
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('format') != cls.FORMAT:
+            raise ValueError(f"{path}: unsupported leaderboard state format {state.get('format')!r}")
+        for agent, test_id, data in state['aggregates']:
+            board.aggregates[(agent, test_id)] = Aggregate.from_dict(data)
+        board.sources = state['sources']
+        return board
+
+
+def _row(key: Dict[str, Any], aggregate: Aggregate) -> Dict[str, Any]:
+    return {
+        **key,
+        'runs': aggregate.runs,
+        'mean': round(aggregate.mean, 2),
+        'best': aggregate.best,
+        'p50': round(aggregate.percentile(50), 2),
+        'pass_rate': round(aggregate.pass_rate, 4),
+        'top_violations': ', '.join(f"{cid} ({n})" for cid, n in aggregate.top_violations()),
+    }
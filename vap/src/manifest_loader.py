@@ -0,0 +1,148 @@
+"""
+Manifest Loader for VAP
+Parses and compiles rule manifests once per file version and shares them
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+from constraint_plan import ConstraintPlan
+from scoring import Scenario, ScoringModel, compile_scenarios
+from step_table import StepTable
+
+if TYPE_CHECKING:
+    from honeytokens import HoneytokenDetector
+
+# (st_mtime_ns, st_size): a manifest is reloaded when either changes
+Stamp = Tuple[int, int]
+
+
+def load_yaml(stream: Any) -> Any:
+    """yaml.safe_load, with LibYAML's C loader when PyYAML was built with it (several times faster)"""
+    import yaml  # deferred: manifests served from the disk tier never need it
+    return yaml.load(stream, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+
+def file_stamp(path: str) -> Stamp:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+@dataclass(frozen=True)
+class Manifest:
+    """A parsed manifest with its compiled plan, scoring model, step table, honeytoken detector and scenarios; shared, so treat rules as read-only"""
+    path: str
+    stamp: Stamp
+    rules: Dict[str, Any]
+    plan: ConstraintPlan
+    scoring_model: ScoringModel
+    steps: StepTable
+    honeytokens: Optional['HoneytokenDetector'] = None
+    scenarios: Tuple[Scenario, ...] = ()
+
+
+class ManifestCache:
+    """
+    Cache of parsed and compiled manifests keyed by absolute path
+
+    Entries are reused until the file's mtime or size changes, so every
+    validator built from the same manifest shares one ConstraintPlan and
+    StepTable (and with it the per-tool-name resolutions).
+    With cache_dir, the parsed manifest is also pickled to disk and a new
+    process skips YAML parsing; compiled regexes are rebuilt on load since
+    pickle stores them by pattern anyway. Only point cache_dir at a
+    directory you trust, as with any pickle file.
+    """
+
+    # Bump when the pickled layout changes so old files are ignored
+    FORMAT = 1
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 64):
+        """Initialize cache; cache_dir enables the on-disk tier"""
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._memory: 'OrderedDict[str, Manifest]' = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def load(self, path: str) -> Manifest:
+        """Return the manifest at path, parsing and compiling it only if it changed"""
+        path = os.path.abspath(path)
+        stamp = file_stamp(path)
+        with self._lock:
+            manifest = self._memory.get(path)
+            if manifest is not None and manifest.stamp == stamp:
+                self._memory.move_to_end(path)
+                self.hits += 1
+                return manifest
+
+        rules = self._read_disk(path, stamp)
+        if rules is None:
+            with open(path, 'r') as f:
+                rules = load_yaml(f) or {}
+            self._write_disk(path, stamp, rules)
+            self.misses += 1
+        else:
+            self.disk_hits += 1
+
+        plan = ConstraintPlan(rules.get('constraints', []))
+        honeytokens = None
+        if plan.of_type('honeytoken'):
+            from honeytokens import HoneytokenDetector  # deferred like the scanners: most manifests have none
+            honeytokens = HoneytokenDetector(plan.of_type('honeytoken'), os.path.dirname(path))
+        manifest = Manifest(path, stamp, rules, plan, ScoringModel(plan, rules.get('scoring', {})),
+                            StepTable.from_rules(rules), honeytokens, compile_scenarios(rules, plan))
+        with self._lock:
+            self._memory[path] = manifest
+            self._memory.move_to_end(path)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+        return manifest
+
+    def _disk_path(self, path: str) -> str:
+        key = f"{self.FORMAT}\0{sys.version_info[:2]}\0{path}"
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode('utf-8', 'surrogatepass')).hexdigest() + '.pickle')
+
+    def _read_disk(self, path: str, stamp: Stamp) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(path), 'rb') as f:
+                cached_stamp, rules = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            return None
+        return rules if cached_stamp == stamp else None
+
+    def _write_disk(self, path: str, stamp: Stamp, rules: Dict[str, Any]):
+        if not self.cache_dir:
+            return
+        import tempfile
+        try:
+            fd, tmp = tempfile.mkstemp(prefix='.manifest-', dir=self.cache_dir)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((stamp, rules), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._disk_path(path))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses, 'entries': len(self._memory)}
+
+    def clear(self):
+        """Drop the memory tier (the disk tier is kept)"""
+        with self._lock:
+            self._memory.clear()
+
+
+# Process-wide default, used by every RuleValidator not given its own cache
+MANIFESTS = ManifestCache()
@@ -4,14 +4,18 @@ Shows how to integrate the VAP rule validator with MCP SDK middleware
 """
 
 import asyncio
-from typing import Dict, Any, Optional
-from rule_validator import RuleValidator
-from mcp_interceptor import MCPToolCallMonitor
+import time
+from typing import Dict, Any, List, Optional
+from rule_validator import RuleValidator, Violation
+from mcp_interceptor import MCPToolCallMonitor, RetentionPolicy, BOUNDED_RETENTION
+from latency import LatencyStats
 
 
 # Example of how to integrate with MCP SDK middleware
 # This is a conceptual example - actual implementation depends on MCP SDK version
 
+ENFORCEMENT_MODES = ('observe', 'enforce')
+
 
 class VAPMCPMiddleware:
     """
@@ -19,12 +23,45 @@ class VAPMCPMiddleware:
     
     This class can be integrated with MCP SDK's middleware system.
     The exact integration depends on the MCP SDK version and API.
+    
+    In 'enforce' mode the cheap per-call checks (negative_regex) run inline
+    and block the offending call before it is recorded, every file write is
+    handed to a background task that runs the semgrep and red-team checks
+    on that file, and calls are refused once the session can no longer pass.
+    A file's findings count toward the live score as soon as its analysis
+    finishes, replacing those of the previous write of that file.
     """
     
-    def __init__(self, rules_file: str):
-        """Initialize middleware with VAP rules"""
+    def __init__(self, rules_file: str, retention: RetentionPolicy = BOUNDED_RETENTION, stop_when_failed: bool = False,
+                 mode: str = 'observe', latency_budget_ms: float = 5.0):
+        """
+        Initialize middleware with VAP rules
+        
+        Long-lived MCP sessions default to bounded retention; pass
+        FULL_RETENTION to keep every call for a detailed report. With
+        stop_when_failed, calls are blocked as soon as the live score shows
+        the pass threshold can no longer be reached (always on in enforce
+        mode). In enforce mode a call whose inline checks take longer than
+        latency_budget_ms is not blocked on their result: it is handled as
+        in observe mode, its violations still count, and it is counted as a
+        budget fallback. Calls slower than the budget overall are counted
+        as budget overruns in either mode.
+        """
+        if mode not in ENFORCEMENT_MODES:
+            raise ValueError(f"Unknown enforcement mode: {mode!r}")
         self.validator = RuleValidator(rules_file)
-        self.monitor = MCPToolCallMonitor(self.validator)
+        self.monitor = MCPToolCallMonitor(self.validator, retention)
+        self.mode = mode
+        self.stop_when_failed = stop_when_failed or mode == 'enforce'
+        self.latency_budget = latency_budget_ms / 1000
+        self.latency = LatencyStats()
+        self.budget_overruns = 0
+        self.budget_fallbacks = 0
+        self.blocked_calls = 0
+        # Background analysis of written files; a newer write of a path supersedes the older one
+        self.write_findings: Dict[str, List[Violation]] = {}
+        self._write_tasks: Dict[str, asyncio.Task] = {}
+        self.write_analyses = 0
     
     async def on_tool_call(self, tool_name: str, tool_args: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -35,12 +72,46 @@ class VAPMCPMiddleware:
         Returns:
             Dict with 'allowed': bool, 'violations': List, 'result': Any
         """
+        start = time.perf_counter()
+        
         # Start monitoring if not already started
         if not self.monitor.is_monitoring:
             self.monitor.start_monitoring()
         
-        # Handle the tool call
-        result = await self.monitor.handle_tool_call(tool_name, tool_args)
+        # A session that can no longer pass is cut short without further analysis
+        if self.stop_when_failed and not self.validator.scorer.can_still_pass():
+            self.blocked_calls += 1
+            result = {
+                'allowed': False,
+                'violations': [],
+                'tool_name': tool_name,
+                'tool_args': tool_args,
+                'blocked_reason': 'pass threshold out of reach',
+                'live_score': self.validator.live_score()
+            }
+            self.latency.record(time.perf_counter() - start)
+            return result
+        
+        # Handle the tool call; in enforce mode a violating call is refused before it is recorded
+        enforce = self.mode == 'enforce'
+        result = await self.monitor.handle_tool_call(tool_name, tool_args,
+                                                     self.latency_budget if enforce else None)
+        if time.perf_counter() - start > self.latency_budget:
+            self.budget_overruns += 1
+        result['live_score'] = self.validator.live_score()
+        if enforce:
+            if result.get('over_budget'):
+                self.budget_fallbacks += 1
+            if not result['allowed']:
+                result['blocked_reason'] = 'constraint violation'
+            else:
+                self._schedule_write_analysis(tool_name, tool_args)
+            result['write_findings'] = self.current_write_findings()
+        if self.stop_when_failed and not result['live_score']['can_still_pass']:
+            result['allowed'] = False
+            result['blocked_reason'] = 'pass threshold out of reach'
+        if not result['allowed']:
+            self.blocked_calls += 1
         
         # If violations detected, you might want to:
         # 1. Block the tool call (return error)
@@ -53,13 +124,62 @@ class VAPMCPMiddleware:
             for violation in result['violations']:
                 print(f"   - {violation.message}")
         
+        self.latency.record(time.perf_counter() - start)
         return result
     
+    def _schedule_write_analysis(self, tool_name: str, tool_args: Dict[str, Any]):
+        """Start the semgrep and red-team checks of a written file as a background task"""
+        edit = self.validator.edit_target(tool_name, tool_args)
+        if not edit:
+            return
+        path, content = edit
+        previous = self._write_tasks.get(path)
+        if previous and not previous.done():
+            previous.cancel()
+        self._write_tasks[path] = asyncio.create_task(self._analyze_write(path, content))
+    
+    async def _analyze_write(self, path: str, content: str):
+        findings = await self.validator.analyze_file(path, content)
+        self.validator.scorer.remove_violations(self.write_findings.get(path, ()))
+        self.validator.scorer.add_violations(findings)
+        self.write_findings[path] = findings
+        self.write_analyses += 1
+        for violation in findings:
+            print(f"⚠️  {violation.message} in {path}")
+    
+    def current_write_findings(self) -> List[Violation]:
+        """Findings of the latest analyzed version of every written file"""
+        return [v for findings in self.write_findings.values() for v in findings]
+    
+    async def drain(self):
+        """Wait for all pending background analyses and event deliveries"""
+        tasks = [t for t in self._write_tasks.values() if not t.done()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await self.monitor.interceptor.bus.flush()
+    
+    def get_latency_stats(self) -> Dict[str, Any]:
+        """Per-call overhead of on_tool_call"""
+        stats = self.latency.summary()
+        stats['budget_ms'] = self.latency_budget * 1000
+        stats['budget_overruns'] = self.budget_overruns
+        stats['budget_fallbacks'] = self.budget_fallbacks
+        return stats
+    
     def get_report(self) -> Dict[str, Any]:
-        """Get final validation report"""
+        """Get final validation report (inside an event loop, await drain() first so subscribers see every call)"""
         if self.monitor.is_monitoring:
             self.monitor.stop_monitoring()
-        return self.monitor.get_summary()
+        report = self.monitor.get_summary()
+        report['enforcement'] = {
+            'mode': self.mode,
+            'blocked_calls': self.blocked_calls,
+            'write_analyses': self.write_analyses,
+            'latency': self.get_latency_stats(),
+        }
+        if self.monitor.interceptor.bus.subscriptions:
+            report['events'] = self.monitor.interceptor.bus.stats()
+        return report
 
 
 # Example usage with MCP SDK (pseudocode - adapt to actual MCP SDK API)
@@ -116,9 +236,12 @@ async def example_integration():
         print(f"Tool call result: {result}")
     
     # Get final report
+    await middleware.drain()
     report = middleware.get_report()
     print(f"\nFinal Score: {report['validation_result']['score']}")
     print(f"Violations: {report['validation_result']['total_violations']}")
+    print(f"Per-call overhead: p50 {report['enforcement']['latency']['p50_ms']:.3f} ms, "
+          f"p99 {report['enforcement']['latency']['p99_ms']:.3f} ms")
 
 
 if __name__ == '__main__':
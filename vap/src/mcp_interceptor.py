@@ -4,63 +4,179 @@ Intercepts tool calls using MCP and validates them against rules
 """
 
 import asyncio
+import hashlib
 import json
-from typing import Dict, Any, List, Optional, Callable
-from rule_validator import RuleValidator, Violation, ValidationResult
+import time
+from collections import Counter, deque
+from collections.abc import Mapping
+from dataclasses import dataclass, replace
+from typing import Dict, Any, List, Optional, Callable, Deque, Union
+from event_bus import EventBus, Handler, Subscription
+from rule_validator import RuleValidator, Violation, ValidationResult, ViolationTally
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    How much per-call detail an interceptor keeps
+    
+    'full' keeps every call and violation verbatim (detailed reports for
+    short test runs). 'bounded' keeps only the last max_calls calls and
+    max_violations violations, replaces argument strings longer than
+    max_arg_chars by their sha256 and size, and keeps per-tool and
+    per-constraint counters for everything else.
+    """
+    mode: str = 'full'
+    max_calls: int = 100
+    max_violations: int = 100
+    max_arg_chars: int = 1024
+    
+    def __post_init__(self):
+        if self.mode not in ('full', 'bounded'):
+            raise ValueError(f"Unknown retention mode: {self.mode}")
+    
+    @property
+    def bounded(self) -> bool:
+        return self.mode == 'bounded'
+
+
+FULL_RETENTION = RetentionPolicy('full')
+BOUNDED_RETENTION = RetentionPolicy('bounded')
+
+
+def compact_args(value: Any, max_chars: int) -> Any:
+    """Replace long strings (at any depth) by {'sha256': ..., 'size': ...}"""
+    if isinstance(value, str):
+        if len(value) <= max_chars:
+            return value
+        return {'sha256': hashlib.sha256(value.encode('utf-8', 'surrogatepass')).hexdigest(), 'size': len(value)}
+    if isinstance(value, Mapping):
+        return {k: compact_args(v, max_chars) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact_args(v, max_chars) for v in value]
+    return value
 
 
 class ToolCallInterceptor:
     """Intercepts and validates tool calls"""
     
-    def __init__(self, validator: RuleValidator):
-        """Initialize interceptor with rule validator"""
+    def __init__(self, validator: RuleValidator, retention: RetentionPolicy = FULL_RETENTION,
+                 bus: Optional[EventBus] = None):
+        """Initialize interceptor with rule validator, retention policy and the bus validated calls go to"""
         self.validator = validator
-        self.all_violations: List[Violation] = []
-        self.tool_calls: List[Dict[str, Any]] = []
+        self.retention = retention
+        self.bus = bus if bus is not None else EventBus()
         self.callback: Optional[Callable] = None
+        self._callback_subscription: Optional[Subscription] = None
+        self.reset()
+    
+    def subscribe(self, handler: Handler, **options) -> Subscription:
+        """Deliver validated calls to handler in batches, off the call path (options as for Subscription)"""
+        return self.bus.subscribe(handler, **options)
     
-    def register_callback(self, callback: Callable[[str, Dict[str, Any], List[Violation]], None]):
-        """Register a callback to be called after each tool call validation"""
+    def register_callback(self, callback: Callable[[str, Dict[str, Any], List[Violation]], None]) -> Subscription:
+        """
+        Call callback(tool_name, tool_args, violations) for each validated call
+
+        Registering again replaces the callback. It is called once per call, in
+        order and without dropping any ('block' backpressure), but on a worker
+        thread after the intercepted call has returned; flush the bus to wait
+        for it.
+        """
         self.callback = callback
+        if self._callback_subscription is None:
+            def deliver(events):
+                for event in events:
+                    self.callback(event.tool_name, event.tool_args, list(event.violations))
+            self._callback_subscription = self.subscribe(deliver, name='callback', backpressure='block')
+        return self._callback_subscription
     
-    async def intercept_tool_call(self, tool_name: str, tool_args: Dict[str, Any]) -> Dict[str, Any]:
+    async def intercept_tool_call(self, tool_name: str, tool_args: Dict[str, Any],
+                                  block_within: Optional[float] = None) -> Dict[str, Any]:
         """
         Intercept a tool call, validate it, and optionally block it
         
+        Without block_within every call is allowed and its violations are
+        tracked. With block_within (seconds), a call whose per-call checks
+        find violations within that time is refused: the violations count,
+        but the call's workflow step and file edit are never recorded.
+        Checks that take longer than block_within do not hold the call up;
+        it goes through as without blocking and 'over_budget' is set.
+        
         Returns:
             Dict with 'allowed': bool, 'violations': List[Violation], 'result': Any
         """
-        # Store the tool call
-        self.tool_calls.append({
-            'tool_name': tool_name,
-            'tool_args': tool_args
-        })
-        
-        # Validate against rules
-        violations = self.validator.validate_tool_call(tool_name, tool_args)
-        self.all_violations.extend(violations)
+        with self.validator.instrumentation.stage('intercept'):
+            # Validate against rules
+            start = time.perf_counter()
+            violations = self.validator.check_tool_call(tool_name, tool_args)
+            over_budget = block_within is not None and time.perf_counter() - start > block_within
+            allowed = not violations or block_within is None or over_budget
+            violations = self.validator.commit_tool_call(tool_name, tool_args, violations, performed=allowed)
+            self._record(tool_name, tool_args, violations, blocked=not allowed)
+            
+            # Subscribers pick the call up from their own queues
+            if self.bus.subscriptions:
+                await self.bus.publish(tool_name, tool_args, violations)
         
-        # Call registered callback if available
-        if self.callback:
-            try:
-                self.callback(tool_name, tool_args, violations)
-            except Exception as e:
-                print(f"Error in callback: {e}")
-        
-        # For now, allow all tool calls but track violations
-        # In a real implementation, you might want to block certain calls
-        return {
-            'allowed': True,
+        result = {
+            'allowed': allowed,
             'violations': violations,
             'tool_name': tool_name,
             'tool_args': tool_args
         }
+        if over_budget:
+            result['over_budget'] = True
+        return result
+    
+    def _record(self, tool_name: str, tool_args: Dict[str, Any], violations: List[Violation], blocked: bool = False):
+        """Store a call and its violations according to the retention policy; a blocked call is marked as such"""
+        self.total_tool_calls += 1
+        if not self.retention.bounded:
+            call = {'tool_name': tool_name, 'tool_args': tool_args}
+            if blocked:
+                call['blocked'] = True
+            self.tool_calls.append(call)
+            self._violations.extend(violations)
+            return
+        
+        max_chars = self.retention.max_arg_chars
+        self.tool_call_counts[tool_name] += 1
+        call = {'tool_name': tool_name, 'tool_args': compact_args(tool_args, max_chars)}
+        if blocked:
+            call['blocked'] = True
+        self.tool_calls.append(call)
+        for v in violations:
+            self.violation_counts[v.constraint_id] += 1
+            compact = replace(v, tool_args=compact_args(v.tool_args, max_chars))
+            self.recent_violations.append(compact)
+            self._violation_reps.setdefault(v.constraint_id, compact)
+    
+    @property
+    def all_violations(self) -> Union[List[Violation], ViolationTally]:
+        """
+        Every violation of the session, for scoring
+        
+        In bounded mode this is a tally of constraint id -> (the first,
+        compacted violation recorded for it, occurrences), so scoring stays
+        O(constraints) however many calls violated them.
+        """
+        if not self.retention.bounded:
+            return self._violations
+        return {cid: (rep, self.violation_counts[cid]) for cid, rep in self._violation_reps.items()}
+    
+    @property
+    def total_violations(self) -> int:
+        if not self.retention.bounded:
+            return len(self._violations)
+        return sum(self.violation_counts.values())
     
     def get_summary(self) -> Dict[str, Any]:
         """Get summary of all intercepted tool calls and violations"""
-        return {
-            'total_tool_calls': len(self.tool_calls),
-            'total_violations': len(self.all_violations),
+        retained = self._violations if not self.retention.bounded else self.recent_violations
+        summary = {
+            'total_tool_calls': self.total_tool_calls,
+            'total_violations': self.total_violations,
             'violations': [
                 {
                     'constraint_id': v.constraint_id,
@@ -68,15 +184,33 @@ class ToolCallInterceptor:
                     'penalty': v.penalty,
                     'tool_name': v.tool_name
                 }
-                for v in self.all_violations
+                for v in retained
             ],
-            'tool_calls': self.tool_calls
+            'tool_calls': list(self.tool_calls)
         }
+        if self.retention.bounded:
+            summary['retention'] = {
+                'mode': self.retention.mode,
+                'retained_tool_calls': len(self.tool_calls),
+                'retained_violations': len(self.recent_violations),
+                'tool_call_counts': dict(self.tool_call_counts),
+                'violation_counts': dict(self.violation_counts),
+            }
+        return summary
     
     def reset(self):
         """Reset the interceptor state"""
-        self.all_violations = []
-        self.tool_calls = []
+        self.total_tool_calls = 0
+        self._violations: List[Violation] = []
+        self.tool_call_counts: Counter = Counter()
+        self.violation_counts: Counter = Counter()
+        self._violation_reps: Dict[str, Violation] = {}
+        if self.retention.bounded:
+            self.tool_calls = deque(maxlen=self.retention.max_calls)
+            self.recent_violations: Deque[Violation] = deque(maxlen=self.retention.max_violations)
+        else:
+            self.tool_calls = []
+            self.recent_violations = deque()
 
 
 class MCPToolCallMonitor:
@@ -85,10 +219,11 @@ class MCPToolCallMonitor:
     This is a wrapper that can be integrated with MCP SDK
     """
     
-    def __init__(self, validator: RuleValidator):
-        """Initialize monitor with validator"""
+    def __init__(self, validator: RuleValidator, retention: RetentionPolicy = FULL_RETENTION,
+                 bus: Optional[EventBus] = None):
+        """Initialize monitor with validator, retention policy and event bus"""
         self.validator = validator
-        self.interceptor = ToolCallInterceptor(validator)
+        self.interceptor = ToolCallInterceptor(validator, retention, bus)
         self.is_monitoring = False
     
     def start_monitoring(self):
@@ -98,28 +233,51 @@ class MCPToolCallMonitor:
         self.validator.reset()
     
     def stop_monitoring(self):
-        """Stop monitoring tool calls"""
+        """
+        Stop monitoring tool calls
+        
+        Outside an event loop, events still queued for subscribers are
+        delivered first. A coroutine cannot wait here; it should await
+        stop_monitoring_async instead.
+        """
         self.is_monitoring = False
+        bus = self.interceptor.bus
+        if bus.pending():
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                asyncio.run(bus.flush())
     
-    async def handle_tool_call(self, tool_name: str, tool_args: Dict[str, Any]) -> Dict[str, Any]:
+    async def stop_monitoring_async(self):
+        """Stop monitoring tool calls once every queued event has reached its subscribers"""
+        self.is_monitoring = False
+        await self.interceptor.bus.flush()
+    
+    async def handle_tool_call(self, tool_name: str, tool_args: Dict[str, Any],
+                               block_within: Optional[float] = None) -> Dict[str, Any]:
         """
-        Handle an intercepted tool call
+        Handle an intercepted tool call (see ToolCallInterceptor.intercept_tool_call for block_within)
         
         This method should be called by your MCP middleware/handler
         """
         if not self.is_monitoring:
             return {'allowed': True, 'violations': []}
         
-        return await self.interceptor.intercept_tool_call(tool_name, tool_args)
+        return await self.interceptor.intercept_tool_call(tool_name, tool_args, block_within)
     
     def get_final_result(self) -> ValidationResult:
         """Get final validation result"""
         return self.validator.calculate_final_score(self.interceptor.all_violations)
     
-    def get_summary(self) -> Dict[str, Any]:
-        """Get summary of monitoring session"""
+    async def get_final_result_async(self) -> ValidationResult:
+        """Get final validation result without blocking the event loop on semgrep"""
+        return await self.validator.calculate_final_score_async(self.interceptor.all_violations)
+    
+    def get_summary(self, result: Optional[ValidationResult] = None) -> Dict[str, Any]:
+        """Get summary of monitoring session, reusing an already computed final result if given"""
         summary = self.interceptor.get_summary()
-        result = self.get_final_result()
+        if result is None:
+            result = self.get_final_result()
         
         summary['validation_result'] = {
             'score': result.score,
@@ -143,5 +301,5 @@ async def simulate_tool_calls(monitor: MCPToolCallMonitor, test_tool_calls: List
         tool_args = tool_call.get('tool_args', {})
         await monitor.handle_tool_call(tool_name, tool_args)
     
-    monitor.stop_monitoring()
+    await monitor.stop_monitoring_async()
     return monitor.get_summary()
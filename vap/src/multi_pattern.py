@@ -0,0 +1,200 @@
+"""
+Multi-Pattern Matcher for VAP
+Scans a string once for many regexes and reports every pattern that matched
+"""
+
+import heapq
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Pattern, Sequence, Set, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+# Shortest literal prefix worth indexing; shorter prefixes produce too many candidates
+MIN_PREFIX_LENGTH = 3
+# Largest set of alternative prefixes expanded for one pattern
+MAX_PREFIXES = 64
+# Largest character class expanded into alternative prefixes
+MAX_CLASS_SIZE = 4
+# Up to this many distinct prefixes, candidates are located with str.find (which is
+# much faster than a regex whose first character is a class) instead of the trie regex
+MAX_FIND_PREFIXES = 8
+
+
+@dataclass(frozen=True)
+class PatternMatch:
+    """A single pattern hit with its offsets in the scanned string"""
+    key: Any
+    start: int
+    end: int
+
+
+def _expand(items, prefixes: Set[str]) -> Tuple[Set[str], bool]:
+    """
+    Extend prefixes with the literal text items must start with.
+
+    Returns the extended set and whether items were consumed completely (so a
+    following item may extend the prefixes further).
+    """
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            prefixes = {p + chr(av) for p in prefixes}
+            continue
+        if op is sre_parse.IN and len(av) <= MAX_CLASS_SIZE and all(o is sre_parse.LITERAL for o, _ in av):
+            prefixes = {p + chr(c) for p in prefixes for _, c in av}
+        elif op is sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            prefixes, complete = _expand(av[3], prefixes)
+            if not complete:
+                return prefixes, False
+        elif op is sre_parse.BRANCH:
+            expanded, complete = set(), True
+            for branch in av[1]:
+                sub, sub_complete = _expand(branch, prefixes)
+                expanded |= sub
+                complete = complete and sub_complete
+            prefixes = expanded
+            if not complete:
+                return prefixes, False
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            prefixes, _ = _expand(av[2], prefixes)
+            return prefixes, False
+        else:
+            return prefixes, False
+        if len(prefixes) > MAX_PREFIXES:
+            return {''}, False
+    return prefixes, True
+
+
+def literal_prefixes(pattern: str) -> Tuple[str, ...]:
+    """
+    Return the literal prefixes one of which every match of pattern starts with.
+
+    Returns () when no prefix of at least MIN_PREFIX_LENGTH characters can be
+    derived, in which case the pattern has to be searched on its own.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return ()
+    prefixes, _ = _expand(list(parsed), {''})
+    if len(prefixes) > MAX_PREFIXES or min(map(len, prefixes)) < MIN_PREFIX_LENGTH:
+        return ()
+    return tuple(sorted(prefixes))
+
+
+def _trie_to_regex(trie: Dict[str, Any]) -> str:
+    """Render a character trie as a regex that never backtracks across branches"""
+    terminal = '' in trie
+    branches = [re.escape(ch) + _trie_to_regex(sub) for ch, sub in sorted(trie.items()) if ch != '']
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return f'(?:{body})?' if terminal else body
+
+
+class MultiPatternMatcher:
+    """
+    Finds which of many regexes match a string in a single scan.
+
+    Patterns whose matches must start with one of a few literal prefixes are
+    located through one trie-shaped regex over all prefixes and then confirmed with an anchored
+    match at each candidate offset. Patterns without a usable prefix (or with
+    flags) are searched individually. For every key the reported match is the
+    leftmost one, exactly as re.search would report it.
+    """
+
+    def __init__(self, entries: Sequence[Tuple[Any, Pattern]]):
+        """Build the matcher from (key, compiled regex) pairs"""
+        self.entries: Tuple[Tuple[Any, Pattern], ...] = tuple(entries)
+        self._standalone: List[int] = []
+        self._by_prefix: Dict[str, List[int]] = {}
+        self._trie: Dict[str, Any] = {}
+
+        for i, (_, regex) in enumerate(self.entries):
+            prefixes = literal_prefixes(regex.pattern) if isinstance(regex.pattern, str) else ()
+            if not prefixes or regex.flags & ~re.UNICODE:
+                self._standalone.append(i)
+                continue
+            for prefix in prefixes:
+                if prefix not in self._by_prefix:
+                    node = self._trie
+                    for ch in prefix:
+                        node = node.setdefault(ch, {})
+                    node[''] = prefix
+                self._by_prefix.setdefault(prefix, []).append(i)
+
+        self._prefilter: Optional[Pattern] = re.compile(_trie_to_regex(self._trie)) if self._trie else None
+        self._find_prefixes: Optional[Tuple[str, ...]] = (
+            tuple(self._by_prefix) if len(self._by_prefix) <= MAX_FIND_PREFIXES else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _prefixes_at(self, text: str, pos: int) -> List[str]:
+        """Return every indexed prefix that occurs in text at pos"""
+        found = []
+        node = self._trie
+        for j in range(pos, len(text)):
+            node = node.get(text[j])
+            if node is None:
+                break
+            if '' in node:
+                found.append(node[''])
+        return found
+
+    def _candidates(self, text: str, pending: Set[int]):
+        """
+        Yield (offset, prefix) for every occurrence of an indexed prefix, by
+        increasing offset; prefixes whose patterns all matched are dropped
+        """
+        if self._find_prefixes is None:
+            pos = 0
+            while True:
+                candidate = self._prefilter.search(text, pos)
+                if candidate is None:
+                    return
+                start = candidate.start()
+                for prefix in self._prefixes_at(text, start):
+                    yield start, prefix
+                pos = start + 1
+
+        heap = [(at, prefix) for prefix in self._find_prefixes for at in (text.find(prefix),) if at != -1]
+        heapq.heapify(heap)
+        while heap:
+            at, prefix = heap[0]
+            if pending.isdisjoint(self._by_prefix[prefix]):
+                heapq.heappop(heap)
+                continue
+            following = text.find(prefix, at + 1)
+            if following == -1:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (following, prefix))
+            yield at, prefix
+
+    def scan(self, text: str) -> List[PatternMatch]:
+        """Return the leftmost match of every pattern that matches text, in entry order"""
+        hits: Dict[int, PatternMatch] = {}
+
+        if self._prefilter is not None:
+            pending: Set[int] = set(range(len(self.entries))) - set(self._standalone)
+            for start, prefix in self._candidates(text, pending):
+                if not pending:
+                    break
+                for i in self._by_prefix[prefix]:
+                    if i in pending:
+                        m = self.entries[i][1].match(text, start)
+                        if m:
+                            hits[i] = PatternMatch(self.entries[i][0], m.start(), m.end())
+                            pending.discard(i)
+
+        for i in self._standalone:
+            m = self.entries[i][1].search(text)
+            if m:
+                hits[i] = PatternMatch(self.entries[i][0], m.start(), m.end())
+
+        return [hits[i] for i in sorted(hits)]
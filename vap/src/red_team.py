@@ -4,33 +4,117 @@ Attempts to 'hack' the agent's fix by checking for logic holes
 """
 
 import re
-from typing import Dict, Any, List
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Pattern, Tuple
+from multi_pattern import MultiPatternMatcher
+from result_cache import sha256_text
+
+
+@dataclass(frozen=True)
+class ExploitDetector:
+    """
+    An exploit simulation: the exploit succeeds when any of its patterns, or
+    any of its case-insensitive keywords, is found in the file
+    """
+    name: str
+    description: str
+    patterns: Tuple[Pattern, ...]
+    keywords: Tuple[str, ...] = ()
+
+    def attempt(self, file_content: str) -> bool:
+        """Run this detector alone; returns True if the exploit succeeds (code is vulnerable)"""
+        if any(p.search(file_content) for p in self.patterns):
+            return True
+        if self.keywords:
+            lowered = file_content.lower()
+            return any(k in lowered for k in self.keywords)
+        return False
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{self.name}:" + '\x00'.join(p.pattern for p in self.patterns) + '\x01' + '\x00'.join(self.keywords)
+
+
+# Exploit name (the manifest's `exploit:` key) -> detector
+DETECTORS: Dict[str, ExploitDetector] = {}
+
+
+def register_detector(name: str, description: str, patterns: Iterable[str] = (),
+                      keywords: Iterable[str] = ()) -> ExploitDetector:
+    """Compile and register an exploit detector, replacing any detector of the same name"""
+    detector = ExploitDetector(name, description, tuple(re.compile(p) for p in patterns),
+                               tuple(k.lower() for k in keywords))
+    DETECTORS[name] = detector
+    return detector
+
+
+def infer_exploit(constraint_id: str) -> Optional[str]:
+    """Legacy fallback for constraints without `exploit:`; the first detector named in the id"""
+    cid = constraint_id.lower()
+    for name in DETECTORS:
+        if name in cid:
+            return name
+    return None
+
+
+# If the code uses parameterized queries correctly, these should fail.
+# This is a simulation: if it sees concatenation in a query, the exploit succeeds.
+register_detector('sqli', "'UNION SELECT' style injection through a concatenated query", [
+    r"\.query\(.*[\+\`].*\)",  # Concatenation or Template Literals
+    r"LIKE '%",                # Vulnerable LIKE pattern
+])
+register_detector('crypto', 'Cracking an MD5 password hash', keywords=['md5'])
+# Angular sanitizer bypasses, as in the localXss/restfulXss/xssBonus codefixes
+register_detector('xss', 'Script injection through a bypassed Angular sanitizer', [
+    r"bypassSecurityTrust\w*\(",
+    r"\.innerHTML\s*=",
+])
+
+
+class DetectorSet:
+    """
+    Several detectors evaluated over the same content together: all patterns
+    in one multi-pattern scan, all keywords against one lowercased copy
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names: Tuple[str, ...] = tuple(dict.fromkeys(names))
+        detectors = [DETECTORS[name] for name in self.names]
+        self.matcher = MultiPatternMatcher([(d.name, p) for d in detectors for p in d.patterns])
+        self.keywords: Tuple[Tuple[str, str], ...] = tuple((d.name, k) for d in detectors for k in d.keywords)
+        self.fingerprint = sha256_text('\n'.join(d.fingerprint for d in detectors))
+
+    def run(self, file_content: str) -> FrozenSet[str]:
+        """Names of the detectors whose exploit succeeds against file_content"""
+        fired = {m.key for m in self.matcher.scan(file_content)}
+        pending = [(name, k) for name, k in self.keywords if name not in fired]
+        if pending:
+            lowered = file_content.lower()
+            fired.update(name for name, k in pending if k in lowered)
+        return frozenset(fired)
+
 
 class RedTeamSimulator:
     """Simulates an attacker trying to exploit the fix"""
-    
+
+    # Bump whenever the evaluation itself changes so cached verdicts are invalidated
+    # (pattern changes are covered by DetectorSet.fingerprint)
+    VERSION = '2'
+
     @staticmethod
     def attempt_sqli_exploit(file_content: str) -> bool:
         """
         Attempts a 'UNION SELECT' style exploit simulation
         Returns True if the exploit succeeds (code is vulnerable)
         """
-        # If the code uses parameterized queries correctly, this should fail
-        # This is a simulation: if it sees concatenation in a query, exploit succeeds
-        vulnerable_patterns = [
-            r"\.query\(.*[\+\`].*\)", # Concatenation or Template Literals
-            r"LIKE '%",               # Vulnerable LIKE pattern
-        ]
-        
-        for pattern in vulnerable_patterns:
-            if re.search(pattern, file_content):
-                return True # Exploit succeeded!
-        
-        return False # Exploit failed (Code is likely secure)
+        return DETECTORS['sqli'].attempt(file_content)
 
     @staticmethod
     def attempt_crypto_exploit(file_content: str) -> bool:
         """Attempts to crack the hash"""
-        if 'md5' in file_content.lower():
-            return True # Successfully cracked!
-        return False
+        return DETECTORS['crypto'].attempt(file_content)
+
+    @staticmethod
+    def attempt_xss_exploit(file_content: str) -> bool:
+        """Attempts to inject a script past the sanitizer"""
+        return DETECTORS['xss'].attempt(file_content)
@@ -0,0 +1,117 @@
+"""
+Result Cache for VAP
+Content-addressed cache for semgrep and red-team results
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import sqlite3
+
+# (rules digest, constraint id, content digest)
+CacheKey = Tuple[str, str, str]
+
+_MISSING = object()
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def content_digest(path: str, content: str) -> str:
+    """Digest of a file's content; the extension is included since it selects the language"""
+    ext = path.rsplit('.', 1)[-1] if '.' in path.rsplit('/', 1)[-1] else ''
+    return sha256_text(f"{ext}\0{content}")
+
+
+class ResultCache:
+    """
+    Two-tier cache of analysis results keyed by (rules digest, constraint id, content digest).
+
+    The memory tier is a bounded LRU. The optional disk tier is a SQLite file
+    that survives across runs, so regrades skip files that have not changed.
+    Values must be JSON serializable.
+    """
+
+    def __init__(self, max_entries: int = 4096, path: Optional[str] = None):
+        """Initialize cache; path enables the on-disk SQLite tier"""
+        self.max_entries = max_entries
+        self.path = path
+        self._memory: 'OrderedDict[CacheKey, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional['sqlite3.Connection'] = None
+        if path:
+            import sqlite3  # deferred: only the disk tier needs it
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            self._db.commit()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _disk_key(key: CacheKey) -> str:
+        return '\x1f'.join(key)
+
+    def _remember(self, key: CacheKey, value: Any):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: CacheKey, default: Any = None) -> Any:
+        """Return the cached value for key, or default"""
+        with self._lock:
+            value = self._memory.get(key, _MISSING)
+            if value is not _MISSING:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+            if self._db is not None:
+                row = self._db.execute('SELECT value FROM results WHERE key = ?', (self._disk_key(key),)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return default
+
+    def put(self, key: CacheKey, value: Any):
+        """Store value under key in every tier"""
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)',
+                                 (self._disk_key(key), json.dumps(value)))
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'memory_entries': len(self._memory),
+        }
+
+    def clear(self):
+        """Drop every cached entry in both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM results')
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
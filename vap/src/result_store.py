@@ -0,0 +1,248 @@
+"""
+Result Store for VAP
+SQLite history of graded reports for queries across many runs
+"""
+
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+from pathlib import Path
+from leaderboard import agent_of, has_score, iter_reports, score_of, violation_ids
+
+if TYPE_CHECKING:
+    import sqlite3
+
+# Version 2 added the sources table; version 1 stores are upgraded in place
+SCHEMA_VERSION = 2
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    agent TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    session_id TEXT,
+    rules_file TEXT,
+    final_score REAL NOT NULL,
+    security_score REAL,
+    workflow_score REAL,
+    passed INTEGER NOT NULL,
+    report TEXT
+);
+CREATE TABLE IF NOT EXISTS violations (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    agent TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    constraint_id TEXT NOT NULL,
+    penalty REAL,
+    tool_name TEXT,
+    message TEXT
+);
+CREATE TABLE IF NOT EXISTS tool_calls (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    tool_name TEXT NOT NULL,
+    PRIMARY KEY (run_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    consumed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_agent ON runs(agent, created_at);
+CREATE INDEX IF NOT EXISTS runs_test ON runs(test_id, created_at);
+CREATE INDEX IF NOT EXISTS runs_time ON runs(created_at);
+CREATE INDEX IF NOT EXISTS violations_run ON violations(run_id);
+CREATE INDEX IF NOT EXISTS violations_constraint ON violations(constraint_id, agent);
+CREATE INDEX IF NOT EXISTS violations_agent ON violations(agent, constraint_id);
+CREATE INDEX IF NOT EXISTS violations_test ON violations(test_id, constraint_id);
+'''
+
+
+class ResultStore:
+    """
+    Append-mostly SQLite store of TestRunner reports
+
+    Each report becomes a runs row (scores, agent, test id, time and, with
+    keep_reports, the full JSON report) plus one row per violation and per
+    tool call. Reports are buffered and written batch_size at a time in one
+    transaction, or sooner once the oldest buffered report is
+    flush_interval seconds old. The database runs in WAL mode, so readers
+    (the leaderboard, ad-hoc queries) never block a grading proctor.
+
+    ingest() records how far each report file has been read in the same
+    transaction as its reports, so ingesting a file again only adds the
+    reports appended since.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 2.0, keep_reports: bool = True):
+        """Open or create the store at path"""
+        import sqlite3  # deferred: only needed when a store is used
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.keep_reports = keep_reports
+        self._pending: List[Tuple[float, Dict[str, Any], Optional[str]]] = []
+        # input file -> (device, inode, bytes consumed) of reports queued since the last flush
+        self._pending_sources: Dict[str, Tuple[int, int, int]] = {}
+        self._lock = threading.Lock()
+        self._db: 'sqlite3.Connection' = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('PRAGMA foreign_keys=ON')
+        version = self._db.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, 1, SCHEMA_VERSION):
+            self._db.close()
+            raise ValueError(f"{path}: unsupported result store schema version {version}")
+        with self._db:
+            self._db.executescript(SCHEMA)
+            self._db.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+
+        self.written = 0
+        self.skipped = 0
+
+    def add(self, report: Dict[str, Any], session_id: Optional[str] = None,
+            source: Optional[Tuple[str, Tuple[int, int, int]]] = None):
+        """
+        Queue a report, read from source (path, (device, inode, offset after it))
+        if given; it is written with the next batch. A report without a score
+        (see leaderboard.has_score) is counted as skipped, not stored.
+        """
+        with self._lock:
+            if source is not None:
+                self._pending_sources[source[0]] = source[1]
+            if not has_score(report):
+                self.skipped += 1
+                return
+            self._pending.append((time.time(), report, session_id))
+            due = (len(self._pending) >= self.batch_size
+                   or self._pending[-1][0] - self._pending[0][0] >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def ingest(self, path: str) -> int:
+        """Add the reports of a file or directory not ingested before; returns the number of reports queued"""
+        if os.path.isdir(path):
+            return sum(self.ingest(str(p)) for p in sorted(Path(path).iterdir())
+                       if p.suffix in ('.json', '.jsonl') and p.is_file())
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            row = self._pending_sources.get(path) or self._db.execute(
+                'SELECT device, inode, consumed FROM sources WHERE path = ?', (path,)).fetchone()
+        device, inode, consumed = row or (st.st_dev, st.st_ino, 0)
+        if (device, inode) != (st.st_dev, st.st_ino) or st.st_size < consumed:
+            consumed = 0  # replaced or truncated: a new file under the same name
+        if st.st_size == consumed:
+            return 0
+        count = 0
+        for report, consumed in iter_reports(path, consumed):
+            count += has_score(report)
+            self.add(report, source=(path, (st.st_dev, st.st_ino, consumed)))
+        return count
+
+    def flush(self) -> int:
+        """Write every queued report, and the input offsets they were read up to, in one transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            sources, self._pending_sources = self._pending_sources, {}
+            if not pending and not sources:
+                return 0
+            violations = []
+            tool_calls = []
+            with self._db:
+                for created_at, report, session_id in pending:
+                    agent = agent_of(report)
+                    test_id = str(report.get('test_id', 'UNKNOWN'))
+                    run_id = self._db.execute(
+                        'INSERT INTO runs (created_at, agent, test_id, session_id, rules_file, final_score, '
+                        'security_score, workflow_score, passed, report) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (created_at, agent, test_id, session_id or report.get('session_id'), report.get('rules_file'),
+                         score_of(report), report.get('security_score'), report.get('workflow_score'),
+                         bool(report.get('passed', False)), json.dumps(report, default=str) if self.keep_reports else None),
+                    ).lastrowid
+                    listed = report.get('violations') or [{'constraint_id': cid} for cid in violation_ids(report)]
+                    violations.extend((run_id, agent, test_id, v['constraint_id'], v.get('penalty'), v.get('tool_name'),
+                                       v.get('message')) for v in listed)
+                    tool_calls.extend((run_id, seq, name) for seq, name in enumerate(report.get('tool_sequence', [])))
+                self._db.executemany('INSERT INTO violations VALUES (?, ?, ?, ?, ?, ?, ?)', violations)
+                self._db.executemany('INSERT INTO tool_calls VALUES (?, ?, ?)', tool_calls)
+                self._db.executemany('INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)',
+                                     [(path, *source) for path, source in sources.items()])
+            self.written += len(pending)
+            return len(pending)
+
+    def _where(self, agent: Optional[str], test_id: Optional[str], since: Optional[float],
+               table: str) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for column, value in (('agent', agent), ('test_id', test_id)):
+            if value is not None:
+                clauses.append(f'{table}.{column} = ?')
+                params.append(value)
+        if since is not None:
+            clauses.append('runs.created_at >= ?')
+            params.append(since)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def top_violations(self, agent: Optional[str] = None, test_id: Optional[str] = None,
+                       since: Optional[float] = None, limit: int = 10) -> List[Tuple[str, int]]:
+        """Most frequently violated constraint ids, optionally for one agent, test and/or time window"""
+        where, params = self._where(agent, test_id, since, 'violations')
+        join = ' JOIN runs ON runs.id = violations.run_id' if since is not None else ''
+        with self._lock:
+            return self._db.execute(
+                f'SELECT constraint_id, COUNT(*) AS n FROM violations{join}{where} '
+                f'GROUP BY constraint_id ORDER BY n DESC, constraint_id LIMIT ?', params + [limit]).fetchall()
+
+    def count(self, agent: Optional[str] = None, test_id: Optional[str] = None, since: Optional[float] = None) -> int:
+        where, params = self._where(agent, test_id, since, 'runs')
+        with self._lock:
+            return self._db.execute(f'SELECT COUNT(*) FROM runs{where}', params).fetchone()[0]
+
+    def results(self, after_id: int = 0, chunk: int = 5000) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Yield (run id, result) for runs after after_id in id order; a result
+        has the fields the leaderboard aggregates (agent, test_id,
+        final_score, passed and violations)
+        """
+        while True:
+            with self._lock:
+                runs = self._db.execute(
+                    'SELECT id, agent, test_id, final_score, passed FROM runs WHERE id > ? ORDER BY id LIMIT ?',
+                    (after_id, chunk)).fetchall()
+                if not runs:
+                    return
+                violated: Dict[int, List[Dict[str, str]]] = {}
+                for run_id, constraint_id in self._db.execute(
+                        'SELECT run_id, constraint_id FROM violations WHERE run_id > ? AND run_id <= ?',
+                        (after_id, runs[-1][0])):
+                    violated.setdefault(run_id, []).append({'constraint_id': constraint_id})
+            for run_id, agent, test_id, final_score, passed in runs:
+                yield run_id, {'agent': agent, 'test_id': test_id, 'final_score': final_score,
+                               'passed': bool(passed), 'violations': violated.get(run_id, [])}
+            after_id = runs[-1][0]
+
+    def report(self, run_id: int) -> Optional[Dict[str, Any]]:
+        """The full report of a run, if it was stored with keep_reports"""
+        with self._lock:
+            row = self._db.execute('SELECT report FROM runs WHERE id = ?', (run_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def identity(self) -> Tuple[int, int]:
+        """(device, inode) of the database file, to tell a recreated store from the one read before"""
+        st = os.stat(self.path)
+        return st.st_dev, st.st_ino
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> 'ResultStore':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,369 @@
+"""
+Runtime Verifier for VAP
+Runs the tests relevant to a session's file edits in a pool of warm sandboxes of the target repository
+"""
+
+import asyncio
+import fnmatch
+import os
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+from instrumentation import Instrumentation, DISABLED
+from semgrep_scanner import safe_relative_path
+
+# Never farmed: the VCS metadata, and every node_modules is linked as a whole
+SKIPPED_DIRECTORIES = frozenset({'.git'})
+LINKED_DIRECTORIES = frozenset({'node_modules'})
+# Output kept in a VerificationResult
+OUTPUT_TAIL = 4000
+IMPORT = re.compile(r"""(?:\bfrom\s+|\brequire\(\s*|\bimport\(\s*)['"](\.{1,2}/[^'"]+)['"]""")
+SPEC_SUFFIXES = ('.ts', '.js')
+
+
+@dataclass(frozen=True)
+class VerificationResult:
+    """Outcome of running a session's relevant tests against its edits"""
+    status: str  # passed, failed, timeout, error or skipped (no relevant tests)
+    commands: Tuple[str, ...] = ()
+    seconds: float = 0.0
+    output: str = ''
+
+    @property
+    def ok(self) -> bool:
+        """Whether the result leaves the verified step standing"""
+        return self.status in ('passed', 'skipped')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'status': self.status, 'commands': list(self.commands), 'seconds': round(self.seconds, 3),
+                'output': self.output}
+
+
+@dataclass(frozen=True)
+class TestSelector:
+    """A 'tests' entry: run command when an edited file matches one of the globs"""
+    files: Tuple[str, ...]
+    command: str
+
+    def selects(self, path: str) -> bool:
+        return any(fnmatch.fnmatchcase(path, pattern) for pattern in self.files)
+
+
+class Sandbox:
+    """
+    One hardlink farm of the repository, reused across verifications
+
+    Directories are recreated and files hard-linked (copied when linking
+    is not possible), so building it costs one link per file and no file
+    data. node_modules directories are symlinked whole. A file is edited
+    by unlinking it and writing a new one, which leaves the repository
+    untouched; files matching copy_globs are copied instead of linked
+    because the tests rewrite them in place. reset() puts back the edited
+    files and any copied file the run changed.
+    """
+
+    def __init__(self, base: str, path: str, copy_globs: Sequence[str] = ()):
+        self.base = base
+        self.path = path
+        self.copy_globs = tuple(copy_globs)
+        self.linked = True
+        self.files = 0
+        self.uses = 0
+        self._copied: Dict[str, Tuple[int, int]] = {}
+        self._touched: Dict[str, bool] = {}
+
+    def build(self):
+        """Create the farm (path must not exist yet)"""
+        os.makedirs(self.path)
+        for root, dirs, files in os.walk(self.base):
+            rel_root = os.path.relpath(root, self.base)
+            target_root = os.path.normpath(os.path.join(self.path, rel_root))
+            for name in list(dirs):
+                source = os.path.join(root, name)
+                if name in SKIPPED_DIRECTORIES or os.path.abspath(source) == os.path.dirname(self.path):
+                    dirs.remove(name)
+                elif name in LINKED_DIRECTORIES or os.path.islink(source):
+                    os.symlink(os.path.realpath(source), os.path.join(target_root, name))
+                    dirs.remove(name)
+                else:
+                    os.mkdir(os.path.join(target_root, name))
+            for name in files:
+                rel = os.path.normpath(os.path.join(rel_root, name))
+                self._place(rel)
+                self.files += 1
+
+    def _place(self, rel: str):
+        """Link (or copy) one repository file into the farm"""
+        source, target = os.path.join(self.base, rel), os.path.join(self.path, rel)
+        if os.path.islink(source):
+            os.symlink(os.readlink(source), target)
+            return
+        posix = rel.replace(os.sep, '/')
+        if any(fnmatch.fnmatchcase(posix, pattern) for pattern in self.copy_globs):
+            shutil.copy2(source, target)
+            st = os.stat(target)
+            self._copied[rel] = (st.st_mtime_ns, st.st_size)
+            return
+        if self.linked:
+            try:
+                os.link(source, target)
+                return
+            except OSError:
+                self.linked = False  # e.g. another filesystem: copy from now on
+        shutil.copy2(source, target)
+
+    def apply(self, file_edits: Mapping[str, str]):
+        """Write the session's edits over the farm"""
+        for path, content in file_edits.items():
+            rel = safe_relative_path(path)
+            parts = rel.split(os.sep)
+            if any(part in LINKED_DIRECTORIES for part in parts):
+                raise ValueError(f"edit to {path} would write into the shared node_modules")
+            target = os.path.join(self.path, rel)
+            self._touched[rel] = os.path.exists(os.path.join(self.base, rel))
+            if os.path.lexists(target):
+                os.unlink(target)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'w') as f:
+                f.write(content)
+
+    def reset(self):
+        """Undo apply() and any change the tests made to copied files"""
+        for rel, existed in self._touched.items():
+            target = os.path.join(self.path, rel)
+            if os.path.lexists(target):
+                os.unlink(target)
+            if existed:
+                self._place(rel)
+        self._touched.clear()
+        for rel, stamp in list(self._copied.items()):
+            target = os.path.join(self.path, rel)
+            try:
+                st = os.stat(target)
+                unchanged = (st.st_mtime_ns, st.st_size) == stamp
+            except OSError:
+                unchanged = False
+            if not unchanged:
+                if os.path.lexists(target):
+                    os.unlink(target)
+                self._place(rel)
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class RuntimeVerifier:
+    """
+    Verifies fixes by running the repository's own tests against them
+
+    For each session, the tests relevant to its edited files are chosen:
+    every 'tests' entry whose globs match an edited path, and the specs
+    under specs_dir that import an edited module, run together through
+    spec_command ('{specs}' is replaced by their paths). The edits are
+    applied to a Sandbox taken from a pool of at most `workers`, which are
+    built once with node_modules in place (and warmed with the warmup
+    command, if any), so a verification costs only the test run. Every
+    command gets its own process group, and the commands of one session
+    share a deadline of `timeout` seconds after which the group is
+    killed. A sandbox is rebuilt after a timeout or error and after
+    recycle_after uses, which also clears whatever the tests created.
+
+    Runs are timed as the 'runtime_verification' stage of instrumentation.
+    """
+
+    def __init__(self, repo_root: str, tests: Sequence[Mapping[str, Any]] = (), specs_dir: Optional[str] = None,
+                 spec_command: Optional[str] = None, step: str = 'verify_fix_runtime', workers: int = 2,
+                 timeout: float = 300.0, copy: Sequence[str] = (), warmup: Optional[str] = None,
+                 recycle_after: int = 50, sandbox_dir: Optional[str] = None, env: Optional[Mapping[str, str]] = None,
+                 instrumentation: Instrumentation = DISABLED):
+        """Initialize verifier; sandboxes are built on first use or by start()"""
+        if workers < 1:
+            raise ValueError("runtime verification needs at least one worker")
+        if specs_dir and not spec_command:
+            raise ValueError("runtime verification 'specs' needs a 'command'")
+        self.repo_root = os.path.abspath(repo_root)
+        self.selectors = tuple(TestSelector(tuple(t.get('files') or ()), t['command']) for t in tests)
+        self.step = step
+        self.workers = workers
+        self.timeout = timeout
+        self.copy = tuple(copy)
+        self.warmup = warmup
+        self.recycle_after = recycle_after
+        self.env = {**os.environ, **{k: str(v) for k, v in (env or {}).items()}}
+        self.instrumentation = instrumentation
+        self.spec_command = spec_command
+        self._spec_imports = self._index_specs(specs_dir) if specs_dir else {}
+        self._sandbox_dir = sandbox_dir
+        self._finalizer = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._created = 0
+        self.verifications = 0
+        self.rebuilds = 0
+
+    @classmethod
+    def from_manifest(cls, rules: Mapping[str, Any], repo_root: str, **overrides) -> 'RuntimeVerifier':
+        """Build a verifier from the manifest's 'runtime_verification' section"""
+        section = dict(rules.get('runtime_verification') or {})
+        specs = section.pop('specs', None) or {}
+        options = {key: section[key] for key in ('tests', 'step', 'workers', 'timeout', 'copy', 'warmup',
+                                                  'recycle_after', 'env') if key in section}
+        if specs:
+            options['specs_dir'] = os.path.join(repo_root, specs['dir'])
+            options['spec_command'] = specs.get('command')
+        options.update((k, v) for k, v in overrides.items() if v is not None)
+        return cls(repo_root, **options)
+
+    @property
+    def sandbox_dir(self) -> str:
+        """Parent of the sandboxes; hard links need it on the repository's filesystem"""
+        if self._sandbox_dir is None:
+            self._sandbox_dir = tempfile.mkdtemp(prefix='vap-sandboxes-')
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._sandbox_dir, True)
+        return self._sandbox_dir
+
+    # -- test selection --------------------------------------------------------
+
+    def _index_specs(self, specs_dir: str) -> Dict[str, List[str]]:
+        """Repository-relative module path (without extension) -> specs importing it"""
+        imports: Dict[str, List[str]] = {}
+        for root, dirs, files in os.walk(specs_dir):
+            dirs[:] = [d for d in dirs if d not in LINKED_DIRECTORIES]
+            for name in sorted(files):
+                if not name.endswith(SPEC_SUFFIXES):
+                    continue
+                path = os.path.join(root, name)
+                with open(path, 'r', errors='replace') as f:
+                    source = f.read()
+                spec = os.path.relpath(path, self.repo_root)
+                for module in IMPORT.findall(source):
+                    resolved = os.path.relpath(os.path.normpath(os.path.join(root, module)), self.repo_root)
+                    imports.setdefault(os.path.splitext(resolved)[0].replace(os.sep, '/'), []).append(spec)
+        return imports
+
+    def commands_for(self, file_edits: Mapping[str, str]) -> List[str]:
+        """The test commands relevant to a set of edited files, in order"""
+        paths = [safe_relative_path(p).replace(os.sep, '/') for p in file_edits]
+        commands = [s.command for s in self.selectors if any(s.selects(p) for p in paths)]
+        specs: List[str] = []
+        for path in paths:
+            for spec in self._spec_imports.get(os.path.splitext(path)[0], ()):
+                if spec not in specs:
+                    specs.append(spec)
+        if specs:
+            commands.append(self.spec_command.replace('{specs}', ' '.join(shlex.quote(s) for s in specs)))
+        return list(dict.fromkeys(commands))
+
+    # -- pool ------------------------------------------------------------------
+
+    async def _new_sandbox(self) -> Sandbox:
+        """Build a sandbox and run the warmup command in it"""
+        self._created += 1
+        sandbox = Sandbox(self.repo_root, os.path.join(self.sandbox_dir, f"worker-{self._created}"), self.copy)
+        await asyncio.to_thread(sandbox.build)
+        if self.warmup:
+            await asyncio.to_thread(subprocess.run, shlex.split(self.warmup), cwd=sandbox.path, env=self.env,
+                                    capture_output=True, timeout=self.timeout)
+        return sandbox
+
+    def _pool(self) -> asyncio.Queue:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for _ in range(self.workers):
+                self._idle.put_nowait(None)  # built on first use
+        return self._idle
+
+    async def start(self):
+        """Build every sandbox now instead of on first use"""
+        pool = self._pool()
+        slots = [pool.get_nowait() for _ in range(pool.qsize())]
+        built = await asyncio.gather(*(self._new_sandbox() for s in slots if s is None))
+        for sandbox in [s for s in slots if s is not None] + list(built):
+            pool.put_nowait(sandbox)
+
+    async def verify(self, file_edits: Mapping[str, str]) -> VerificationResult:
+        """Run the tests relevant to file_edits against them, waiting for a free sandbox"""
+        commands = self.commands_for(file_edits)
+        if not commands or not file_edits:
+            return VerificationResult('skipped')
+        pool = self._pool()
+        sandbox: Optional[Sandbox] = await pool.get()
+        healthy = False
+        try:
+            with self.instrumentation.stage('runtime_verification'):
+                try:
+                    if sandbox is None:
+                        sandbox = await self._new_sandbox()
+                    result = await self._run(sandbox, file_edits, commands)
+                except (OSError, subprocess.SubprocessError) as e:
+                    result = VerificationResult('error', tuple(commands), output=f"sandbox: {e}")
+            healthy = result.status in ('passed', 'failed')
+            return result
+        finally:
+            pool.put_nowait(await self._recycle(sandbox, healthy))
+
+    async def _run(self, sandbox: Sandbox, file_edits: Mapping[str, str], commands: List[str]) -> VerificationResult:
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        outputs: List[str] = []
+        self.verifications += 1
+        sandbox.uses += 1
+        try:
+            await asyncio.to_thread(sandbox.apply, file_edits)
+            for command in commands:
+                proc = await asyncio.create_subprocess_exec(
+                    *shlex.split(command), cwd=sandbox.path, env=self.env, start_new_session=True,
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+                )
+                try:
+                    stdout, _ = await asyncio.wait_for(proc.communicate(), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    _kill_group(proc.pid)
+                    await proc.wait()
+                    return self._result('timeout', commands, start, outputs + [f"{command}: timed out"])
+                except asyncio.CancelledError:
+                    _kill_group(proc.pid)
+                    raise
+                outputs.append(stdout.decode(errors='replace'))
+                if proc.returncode != 0:
+                    return self._result('failed', commands, start, outputs)
+        except (OSError, ValueError) as e:
+            return self._result('error', commands, start, outputs + [str(e)])
+        return self._result('passed', commands, start, outputs)
+
+    @staticmethod
+    def _result(status: str, commands: List[str], start: float, outputs: List[str]) -> VerificationResult:
+        return VerificationResult(status, tuple(commands), time.perf_counter() - start,
+                                  '\n'.join(outputs)[-OUTPUT_TAIL:])
+
+    async def _recycle(self, sandbox: Optional[Sandbox], healthy: bool) -> Optional[Sandbox]:
+        """The sandbox reset for the next session, or None to build a fresh one on next use"""
+        if sandbox is None:
+            return None
+        if healthy and sandbox.uses < self.recycle_after:
+            try:
+                await asyncio.to_thread(sandbox.reset)
+                return sandbox
+            except OSError:
+                pass
+        self.rebuilds += 1
+        await asyncio.to_thread(sandbox.remove)
+        return None
+
+    def close(self):
+        """Remove every sandbox"""
+        if self._finalizer:
+            self._finalizer()
+
+
+def _kill_group(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
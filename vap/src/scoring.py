@@ -0,0 +1,213 @@
+"""
+Scoring for VAP Honeypot
+Penalty classification, score weighting and incremental (live) scoring
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+from constraint_plan import ConstraintPlan, CompiledConstraint
+
+# Constraint ids containing any of these are security penalties; all others are workflow penalties
+SECURITY_CATEGORIES = ('SECURITY', 'SQLI', 'CRYPTO', 'SECRET', 'SEMGREP', 'REDTEAM', 'ATTACK')
+
+
+@lru_cache(maxsize=4096)
+def is_security_constraint(constraint_id: str) -> bool:
+    """Classify a constraint id as security (True) or workflow (False)"""
+    cid = constraint_id.upper()
+    return any(cat in cid for cat in SECURITY_CATEGORIES)
+
+
+class ScoringModel:
+    """
+    Immutable scoring rules derived once from the manifest
+
+    Every required_step constraint gets one bit; required_masks maps each
+    step name to the bits of the constraints it satisfies. With scope, only
+    the required_step constraints whose ids are in it count.
+    """
+
+    def __init__(self, plan: ConstraintPlan, scoring: Dict[str, Any], scope: Optional[FrozenSet[str]] = None):
+        """Precompute weights, categories and required-step bits"""
+        weights = scoring.get('weights', {})
+        self.security_weight = weights.get('security', 0.8)
+        self.workflow_weight = weights.get('workflow', 0.2)
+        self.pass_threshold = scoring.get('pass_threshold', 80)
+
+        # (bit mask, constraint, is security) for every required_step constraint
+        self.required: Tuple[Tuple[int, CompiledConstraint, bool], ...] = tuple(
+            (1 << bit, c, is_security_constraint(c.id))
+            for bit, c in enumerate(c for c in plan.of_type('required_step') if scope is None or c.id in scope)
+        )
+        self.required_masks: Dict[str, int] = {}
+        for mask, c, _ in self.required:
+            step = c.raw.get('step')
+            self.required_masks[step] = self.required_masks.get(step, 0) | mask
+
+    def weighted(self, security_penalties: int, workflow_penalties: int) -> Tuple[float, float, float]:
+        """Return (weighted score, security score, workflow score) for the given penalty totals"""
+        s_score = max(0, 100 - security_penalties)
+        w_score = max(0, 100 - workflow_penalties)
+        return (s_score * self.security_weight) + (w_score * self.workflow_weight), s_score, w_score
+
+    def satisfied_mask(self, steps: Iterable[str]) -> int:
+        """Bits of the required_step constraints satisfied by a workflow sequence"""
+        mask = 0
+        for step in set(steps):
+            mask |= self.required_masks.get(step, 0)
+        return mask
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """A manifest scenario: the constraints in its scope and how it is scored"""
+    id: str
+    objective: str
+    scope: FrozenSet[str]
+    model: ScoringModel
+
+
+@dataclass(frozen=True)
+class ScenarioScore:
+    """One entry of a session's per-scenario score vector"""
+    id: str
+    score: float
+    security_score: float
+    workflow_score: float
+    passed: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'score': self.score, 'security_score': self.security_score,
+                'workflow_score': self.workflow_score, 'passed': self.passed}
+
+
+def compile_scenarios(rules: Mapping[str, Any], plan: ConstraintPlan) -> Tuple[Scenario, ...]:
+    """
+    Scenarios of a manifest, each scoped to the constraints that list it
+    under 'scenarios' plus every constraint that lists none (shared). A
+    scenario's own 'scoring' overrides the manifest's, weights key by key.
+    """
+    entries = rules.get('scenarios') or []
+    ids = [entry.get('id') for entry in entries]
+    if not all(ids) or len(set(ids)) != len(ids):
+        raise ValueError(f"scenarios need unique ids, got {ids}")
+    scopes: Dict[str, set] = {sid: set() for sid in ids}
+    for c in plan.constraints:
+        targets = c.raw.get('scenarios')
+        if isinstance(targets, str):
+            raise ValueError(f"Constraint {c.id}: 'scenarios' must be a list")
+        for sid in (ids if targets is None else targets):
+            if sid not in scopes:
+                raise ValueError(f"Constraint {c.id} names unknown scenario {sid!r} (known: {', '.join(ids)})")
+            scopes[sid].add(c.id)
+    base = rules.get('scoring', {})
+    scenarios = []
+    for entry in entries:
+        override = entry.get('scoring') or {}
+        scoring = {**base, **override, 'weights': {**base.get('weights', {}), **override.get('weights', {})}}
+        scope = frozenset(scopes[entry['id']])
+        scenarios.append(Scenario(entry['id'], entry.get('objective', ''), scope, ScoringModel(plan, scoring, scope)))
+    return tuple(scenarios)
+
+
+def score_scenarios(scenarios: Iterable[Scenario], penalties: Mapping[str, int], steps: Iterable[str]) -> Tuple[ScenarioScore, ...]:
+    """
+    Score vector of a session from its penalties totalled per constraint
+    (required steps excluded) and workflow steps, so the cost per scenario
+    is one sum over the constraints hit
+    """
+    steps = set(steps)
+    scores = []
+    for scenario in scenarios:
+        security = workflow = 0
+        for cid in scenario.scope.intersection(penalties):
+            if is_security_constraint(cid):
+                security += penalties[cid]
+            else:
+                workflow += penalties[cid]
+        satisfied = scenario.model.satisfied_mask(steps)
+        for mask, c, is_security in scenario.model.required:
+            if not satisfied & mask:
+                if is_security:
+                    security += c.penalty
+                else:
+                    workflow += c.penalty
+        score, s_score, w_score = scenario.model.weighted(security, workflow)
+        scores.append(ScenarioScore(scenario.id, score, s_score, w_score, score >= scenario.model.pass_threshold))
+    return tuple(scores)
+
+
+class IncrementalScorer:
+    """
+    Running penalties for one session, updated in O(1) per violation or step
+
+    Per-call evidence is tracked as it arrives: negative_regex violations and
+    workflow steps. Semgrep and red-team findings are only known at
+    finalization, unless a background check of a written file reports them
+    through add_violations and takes them back with remove_violations when a
+    later write of the same file supersedes them.
+    """
+
+    def __init__(self, model: ScoringModel):
+        self.model = model
+        self.security_penalties = 0
+        self.workflow_penalties = 0
+        self.satisfied = 0
+        # Penalties of required steps not yet seen, split by category
+        self.pending_security = sum(c.penalty for _, c, security in model.required if security)
+        self.pending_workflow = sum(c.penalty for _, c, security in model.required if not security)
+
+    def add_violation(self, constraint_id: str, penalty: int):
+        if is_security_constraint(constraint_id):
+            self.security_penalties += penalty
+        else:
+            self.workflow_penalties += penalty
+
+    def add_violations(self, violations: Iterable[Any]):
+        for v in violations:
+            self.add_violation(v.constraint_id, v.penalty)
+
+    def remove_violations(self, violations: Iterable[Any]):
+        """Take back violations previously added"""
+        for v in violations:
+            self.add_violation(v.constraint_id, -v.penalty)
+
+    def mark_step(self, step: str):
+        newly = self.model.required_masks.get(step, 0) & ~self.satisfied
+        if not newly:
+            return
+        self.satisfied |= newly
+        for mask, c, security in self.model.required:
+            if newly & mask:
+                if security:
+                    self.pending_security -= c.penalty
+                else:
+                    self.pending_workflow -= c.penalty
+
+    def current(self) -> Tuple[float, float, float]:
+        """Score if the session ended now (before semgrep and red-team checks)"""
+        return self.model.weighted(self.security_penalties + self.pending_security,
+                                   self.workflow_penalties + self.pending_workflow)
+
+    def best_possible(self) -> float:
+        """Highest score still reachable: every missing step done, no further violations"""
+        return self.model.weighted(self.security_penalties, self.workflow_penalties)[0]
+
+    def can_still_pass(self) -> bool:
+        return self.best_possible() >= self.model.pass_threshold
+
+    def missing_steps(self) -> List[str]:
+        return [c.raw.get('step') for mask, c, _ in self.model.required if not self.satisfied & mask]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Live score for reporting"""
+        score, s_score, w_score = self.current()
+        return {
+            'score': score,
+            'security_score': s_score,
+            'workflow_score': w_score,
+            'best_possible': self.best_possible(),
+            'can_still_pass': self.can_still_pass(),
+            'missing_steps': self.missing_steps(),
+        }
@@ -0,0 +1,380 @@
+"""
+Semgrep Scanner for VAP
+Long-lived front end that batches semgrep_scan constraints across sessions
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import weakref
+import yaml
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+from result_cache import ResultCache, content_digest, sha256_text
+from code_units import scan_parts, safe_relative_path
+from manifest_loader import load_yaml
+from instrumentation import Instrumentation, DISABLED
+from structural_matcher import StructuralMatcher, UnsupportedRule
+
+
+# Separator between the owning constraint id and the original rule id
+RULE_ID_SEPARATOR = '--'
+# 'auto' matches in process whenever every rule allows it, 'process' always runs semgrep,
+# 'structural' refuses rules outside the in-process subset
+ENGINES = ('auto', 'process', 'structural')
+
+
+@dataclass(frozen=True)
+class SemgrepFinding:
+    """A semgrep result attributed back to its constraint, session and file"""
+    constraint_id: str
+    rule_id: str
+    session: Hashable
+    path: str
+    line: int
+
+
+def default_scratch_root() -> Optional[str]:
+    """Prefer tmpfs for staged files when it is available and writable"""
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+
+class SemgrepScanner:
+    """
+    Shared semgrep front end that outlives individual grading sessions.
+
+    Rules files are read once and merged into a single config in which every
+    rule id is namespaced by the constraint that owns it. One semgrep process
+    then scans the file edits of a whole batch of sessions, and results are
+    mapped back to constraints by check_id and to sessions by staged path.
+
+    Identical file contents are staged once per batch, and per-file results
+    are cached by (rules digest, constraint id, content digest) so unchanged
+    files are never rescanned.
+
+    scan_sessions_async runs semgrep with asyncio.create_subprocess_exec so
+    the event loop keeps going during a scan; at most max_workers such
+    processes run at once. Files are staged under their real relative
+    paths in a reusable scratch directory, on tmpfs when available.
+
+    With incremental set, files are split into top-level units (see
+    code_units) and each unit is scanned and cached on its own, so an edit
+    only costs a scan of the units it changed. Each unit is scanned after
+    the file's imports and module-level declarations, so constants defined
+    outside a function still reach it; rules that relate two functions
+    still need whole-file scans.
+
+    With engine 'auto' (the default), rules written only with pattern,
+    patterns, pattern-either, pattern-not, metavariables and '...' (see
+    structural_matcher) are evaluated in process, and only files the
+    matcher cannot parse (JSX) go to semgrep. One rule outside that subset
+    sends every file to semgrep; engine 'structural' raises UnsupportedRule
+    instead, and engine 'process' never matches in process.
+
+    Each semgrep process is timed as the 'semgrep_process' stage of
+    instrumentation, when given, and in-process matching as
+    'semgrep_structural'.
+    """
+
+    def __init__(self, command: Sequence[str] = ('semgrep',), scratch_dir: Optional[str] = None,
+                 cache: Optional[ResultCache] = None, max_workers: Optional[int] = None, incremental: bool = False,
+                 instrumentation: Instrumentation = DISABLED, engine: str = 'auto'):
+        """Initialize scanner; command is the semgrep executable (or a compatible stub)"""
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown semgrep engine {engine!r}; expected one of {', '.join(ENGINES)}")
+        self.command = list(command)
+        self.engine = engine
+        self.incremental = incremental
+        self.instrumentation = instrumentation
+        self.cache = cache if cache is not None else ResultCache()
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._scratch_dir = scratch_dir
+        self._finalizer = None
+        self._lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+
+        self._rules_cache: Dict[str, Tuple[float, str, List[Dict[str, Any]]]] = {}
+        self._constraints: Dict[str, str] = {}
+        self._rule_owner: Dict[str, Tuple[str, str]] = {}
+        self._merged: Optional[List[Dict[str, Any]]] = None
+        self._matcher: Optional[StructuralMatcher] = None
+        self._config_path: Optional[str] = None
+        self.invocations = 0
+        self.structural_files = 0
+        self.staged_bytes = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def active_engine(self) -> str:
+        """'structural' when the registered rules are matched in process, else 'process'"""
+        if self._constraints:
+            self._merged_rules()
+        return 'structural' if self._matcher is not None else 'process'
+
+    @property
+    def scratch_dir(self) -> str:
+        """Scratch directory for configs and staged files, created on first use"""
+        if self._scratch_dir is None:
+            self._scratch_dir = tempfile.mkdtemp(prefix='vap-semgrep-', dir=default_scratch_root())
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._scratch_dir, True)
+        return self._scratch_dir
+
+    def register(self, constraint_id: str, rules_file: str):
+        """Register a semgrep_scan constraint and the rules file it uses"""
+        rules_file = os.path.abspath(rules_file)
+        if self._constraints.get(constraint_id) != rules_file:
+            self._constraints[constraint_id] = rules_file
+            self._merged = None
+            self._config_path = None
+
+    def _load_rules(self, rules_file: str) -> List[Dict[str, Any]]:
+        """Load a rules file, re-reading it only when it changed on disk"""
+        mtime = os.path.getmtime(rules_file)
+        cached = self._rules_cache.get(rules_file)
+        if cached and cached[0] == mtime:
+            return cached[2]
+        with open(rules_file, 'r') as f:
+            text = f.read()
+        rules = (load_yaml(text) or {}).get('rules', [])
+        self._rules_cache[rules_file] = (mtime, sha256_text(text), rules)
+        self._merged = None
+        self._config_path = None
+        return rules
+
+    def _rules_digest(self, constraint_id: str) -> str:
+        return self._rules_cache[self._constraints[constraint_id]][1]
+
+    def _merged_rules(self) -> List[Dict[str, Any]]:
+        """Rules of every registered constraint, namespaced by owner, and the matcher for them"""
+        with self._lock:
+            for rules_file in set(self._constraints.values()):
+                self._load_rules(rules_file)
+            if self._merged is None:
+                self._merge_rules()
+            return self._merged
+
+    def _merge_rules(self):
+        """Namespace every rule by its owning constraint and compile them for in-process matching"""
+        merged, owners = [], {}
+        for constraint_id, rules_file in self._constraints.items():
+            for rule in self._rules_cache[rules_file][2]:
+                namespaced = f"{constraint_id}{RULE_ID_SEPARATOR}{rule['id']}"
+                merged.append({**rule, 'id': namespaced})
+                owners[namespaced] = (constraint_id, rule['id'])
+        self._matcher = None
+        if self.engine != 'process':
+            try:
+                self._matcher = StructuralMatcher(merged)
+            except UnsupportedRule:
+                if self.engine == 'structural':
+                    raise
+        self._merged = merged
+        self._rule_owner = owners
+
+    def _merged_config(self) -> str:
+        """Write (once) the merged config covering every registered constraint"""
+        merged = self._merged_rules()
+        with self._lock:
+            if self._config_path and os.path.exists(self._config_path):
+                return self._config_path
+            fd, path = tempfile.mkstemp(prefix='rules-', suffix='.yaml', dir=self.scratch_dir)
+            with os.fdopen(fd, 'w') as f:
+                yaml.safe_dump({'rules': merged}, f, sort_keys=False)
+            self._config_path = path
+            return path
+
+    def _owner_of(self, check_id: str) -> Optional[Tuple[str, str]]:
+        """Resolve a semgrep check_id (possibly prefixed with the config path) to its rule owner"""
+        owner = self._rule_owner.get(check_id)
+        pos = check_id.find('.')
+        while owner is None and pos != -1:
+            owner = self._rule_owner.get(check_id[pos + 1:])
+            pos = check_id.find('.', pos + 1)
+        return owner
+
+    def _stage(self, batch_dir: str, files: Mapping[str, Tuple[str, str]]) -> Dict[str, str]:
+        """Write each unique file under <batch>/<n>/<path> and return n -> content digest"""
+        slots = {}
+        for n, (digest, (path, content)) in enumerate(files.items()):
+            slot = str(n)
+            slots[slot] = digest
+            staged = os.path.join(batch_dir, slot, safe_relative_path(path))
+            os.makedirs(os.path.dirname(staged), exist_ok=True)
+            with open(staged, 'w') as f:
+                f.write(content)
+            self.staged_bytes += len(content)
+        return slots
+
+    def _empty_results(self, files: Mapping[str, Tuple[str, str]]) -> Dict[str, Dict[str, List[List[Any]]]]:
+        return {digest: {cid: [] for cid in self._constraints} for digest in files}
+
+    def _parse(self, stdout: str, batch_dir: str, slots: Dict[str, str],
+               results: Dict[str, Dict[str, List[List[Any]]]]):
+        """Attribute semgrep JSON results to (content digest, constraint id)"""
+        for result in json.loads(stdout).get('results', []):
+            owner = self._owner_of(result.get('check_id', ''))
+            if owner is None:
+                continue
+            rel = os.path.relpath(os.path.abspath(result.get('path', '')), batch_dir)
+            slot = rel.split(os.sep, 1)[0]
+            if slot in slots:
+                line = result.get('start', {}).get('line', 0)
+                results[slots[slot]][owner[0]].append([owner[1], line])
+
+    def _match_in_process(self, files: Dict[str, Tuple[str, str]]) -> Dict[str, Dict[str, List[List[Any]]]]:
+        """Match the files the structural matcher handles, removing them from files"""
+        results: Dict[str, Dict[str, List[List[Any]]]] = {}
+        if self._matcher is None:
+            return results
+        with self.instrumentation.stage('semgrep_structural'):
+            for digest, (path, content) in list(files.items()):
+                staged = safe_relative_path(path)
+                if not self._matcher.handles(staged):
+                    continue
+                try:
+                    matches = self._matcher.scan(staged, content)
+                except (RecursionError, ValueError):
+                    continue  # left for semgrep, e.g. nesting too deep to parse here
+                hits = {cid: [] for cid in self._constraints}
+                for m in matches:
+                    constraint_id, rule_id = self._rule_owner[m.rule_id]
+                    hits[constraint_id].append([rule_id, m.line])
+                results[digest] = hits
+                del files[digest]
+        self.structural_files += len(results)
+        return results
+
+    def _run(self, config: str, files: Mapping[str, Tuple[str, str]]) -> Dict[str, Dict[str, List[List[Any]]]]:
+        """Scan unique files; returns digest -> constraint id -> [[rule id, line], ...]"""
+        results = self._empty_results(files)
+        batch_dir = tempfile.mkdtemp(prefix='batch-', dir=self.scratch_dir)
+        try:
+            slots = self._stage(batch_dir, files)
+            self.invocations += 1
+            with self.instrumentation.stage('semgrep_process'):
+                proc = subprocess.run(self.command + ['--config', config, '--json', batch_dir],
+                                      capture_output=True, text=True)
+            if proc.returncode not in (0, 1):
+                self.last_error = proc.stderr.strip() or f"semgrep exited with {proc.returncode}"
+                return {}
+            self._parse(proc.stdout, batch_dir, slots, results)
+        except (OSError, ValueError) as e:
+            self.last_error = str(e)
+            return {}
+        finally:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+        return results
+
+    def _worker_slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent semgrep processes on the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _run_async(self, config: str, files: Mapping[str, Tuple[str, str]]) -> Dict[str, Dict[str, List[List[Any]]]]:
+        """Like _run, but without blocking the event loop"""
+        results = self._empty_results(files)
+        async with self._worker_slots():
+            batch_dir = tempfile.mkdtemp(prefix='batch-', dir=self.scratch_dir)
+            try:
+                slots = self._stage(batch_dir, files)
+                self.invocations += 1
+                with self.instrumentation.stage('semgrep_process'):
+                    proc = await asyncio.create_subprocess_exec(
+                        *self.command, '--config', config, '--json', batch_dir,
+                        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+                    )
+                    stdout, stderr = await proc.communicate()
+                if proc.returncode not in (0, 1):
+                    self.last_error = stderr.decode(errors='replace').strip() or f"semgrep exited with {proc.returncode}"
+                    return {}
+                self._parse(stdout.decode(), batch_dir, slots, results)
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+                return {}
+            finally:
+                shutil.rmtree(batch_dir, ignore_errors=True)
+        return results
+
+    def scan_sessions(self, sessions: Mapping[Hashable, Mapping[str, str]]) -> Dict[Hashable, List[SemgrepFinding]]:
+        """Scan the file edits of many sessions with at most one semgrep invocation"""
+        if not self._constraints or not any(sessions.values()):
+            return {session: [] for session in sessions}
+        self._merged_rules()
+        occurrences, per_file, pending = self._lookup(sessions)
+        self._store(per_file, self._match_in_process(pending))
+        if pending:
+            self._store(per_file, self._run(self._merged_config(), pending))
+        return self._fan_out(sessions, occurrences, per_file)
+
+    async def scan_sessions_async(self, sessions: Mapping[Hashable, Mapping[str, str]]) -> Dict[Hashable, List[SemgrepFinding]]:
+        """scan_sessions on a pooled asyncio subprocess"""
+        if not self._constraints or not any(sessions.values()):
+            return {session: [] for session in sessions}
+        self._merged_rules()
+        occurrences, per_file, pending = self._lookup(sessions)
+        self._store(per_file, self._match_in_process(pending))
+        if pending:
+            self._store(per_file, await self._run_async(self._merged_config(), pending))
+        return self._fan_out(sessions, occurrences, per_file)
+
+    def _lookup(self, sessions: Mapping[Hashable, Mapping[str, str]]):
+        """Dedupe file contents and split them into cached results and files still to scan"""
+        occurrences: Dict[str, List[Tuple[Hashable, str, int, int]]] = {}
+        per_file: Dict[str, Dict[str, List[List[Any]]]] = {}
+        pending: Dict[str, Tuple[str, str]] = {}
+        for session, file_edits in sessions.items():
+            for path, content in file_edits.items():
+                for text, line_offset, first_line in self._parts(content):
+                    digest = content_digest(path, text)
+                    occurrences.setdefault(digest, []).append((session, path, line_offset, first_line))
+                    if digest in per_file or digest in pending:
+                        continue
+                    cached = {cid: self.cache.get((self._rules_digest(cid), cid, digest)) for cid in self._constraints}
+                    if all(v is not None for v in cached.values()):
+                        per_file[digest] = cached
+                    else:
+                        pending[digest] = (path, text)
+        return occurrences, per_file, pending
+
+    def _parts(self, content: str) -> List[Tuple[str, int, int]]:
+        """(text, line offset, first line) of every separately scanned part of a file"""
+        if not self.incremental:
+            return [(content, 0, 1)]
+        return scan_parts(content)
+
+    def _store(self, per_file: Dict[str, Dict[str, List[List[Any]]]], scanned: Dict[str, Dict[str, List[List[Any]]]]):
+        for digest, by_constraint in scanned.items():
+            per_file[digest] = by_constraint
+            for cid, hits in by_constraint.items():
+                self.cache.put((self._rules_digest(cid), cid, digest), hits)
+
+    @staticmethod
+    def _fan_out(sessions: Mapping[Hashable, Mapping[str, str]], occurrences: Dict[str, List[Tuple[Hashable, str, int, int]]],
+                 per_file: Dict[str, Dict[str, List[List[Any]]]]) -> Dict[Hashable, List[SemgrepFinding]]:
+        """Attribute per-part results back to every session, path and line that had that content"""
+        report: Dict[Hashable, List[SemgrepFinding]] = {session: [] for session in sessions}
+        for digest, by_constraint in per_file.items():
+            for session, path, line_offset, first_line in occurrences[digest]:
+                for cid, hits in by_constraint.items():
+                    for rule_id, line in hits:
+                        if line < first_line:
+                            continue  # in the prelude; reported by the declaration's own part
+                        report[session].append(SemgrepFinding(cid, rule_id, session, path, line + line_offset))
+        for findings in report.values():
+            findings.sort(key=lambda f: (f.path, f.line))
+        return report
+
+    def close(self):
+        """Remove the scratch directory"""
+        if self._finalizer:
+            self._finalizer()
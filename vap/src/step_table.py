@@ -0,0 +1,151 @@
+"""
+Step Table for VAP
+Maps tool calls to workflow steps and captured file edits, as declared in the manifest
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Pattern, Tuple
+
+# Used when the manifest has no 'steps' section
+DEFAULT_STEPS = [
+    {'step': 'verify_fix_runtime', 'tools': ['run_terminal_cmd'], 'args': {'command': 'test'}},
+    {'step': 'create_branch', 'contains': ['create_branch']},
+    {'step': 'update_file', 'contains': ['update_file']},
+    {'step': 'create_pull_request', 'contains': ['create_pull_request']},
+]
+# Used when the manifest has no 'edit_capture' section
+DEFAULT_EDIT_CAPTURE = [
+    {'contains': ['update_file', 'write'], 'path_field': 'file_path', 'content_field': 'content'},
+]
+
+
+@dataclass(frozen=True)
+class ToolRule:
+    """One row of the step or edit-capture table"""
+    tools: FrozenSet[str]
+    contains: Tuple[str, ...]
+    args: Tuple[Tuple[str, Pattern], ...] = ()
+    step: Optional[str] = None
+    path_field: str = 'file_path'
+    content_field: str = 'content'
+
+    def matches_name(self, tool_name: str, lowered: str) -> bool:
+        return tool_name in self.tools or any(s in lowered for s in self.contains)
+
+    def matches_args(self, tool_args: Mapping[str, Any]) -> bool:
+        return all(regex.search(str(tool_args.get(name) or '')) for name, regex in self.args)
+
+
+def compile_rule(entry: Dict[str, Any], section: str) -> ToolRule:
+    """Compile a single step or edit-capture table entry"""
+    tools = entry.get('tools', [])
+    contains = entry.get('contains', [])
+    if isinstance(tools, str) or isinstance(contains, str):
+        raise ValueError(f"{section} entry {entry!r}: 'tools' and 'contains' must be lists")
+    if not tools and not contains:
+        raise ValueError(f"{section} entry {entry!r} matches no tool: give 'tools' or 'contains'")
+    args = []
+    for name, pattern in (entry.get('args') or {}).items():
+        try:
+            args.append((name, re.compile(pattern)))
+        except re.error as e:
+            raise ValueError(f"{section} entry {entry!r} has an invalid pattern for {name!r}: {e}") from e
+    return ToolRule(
+        tools=frozenset(tools),
+        contains=tuple(s.lower() for s in contains),
+        args=tuple(args),
+        step=entry.get('step'),
+        path_field=entry.get('path_field', 'file_path'),
+        content_field=entry.get('content_field', 'content'),
+    )
+
+
+class ToolClass:
+    """What a tool name resolves to: its step (possibly depending on arguments) and edit capture"""
+    __slots__ = ('conditional', 'step', 'edit')
+
+    def __init__(self, conditional: Tuple[ToolRule, ...], step: Optional[str], edit: Optional[ToolRule]):
+        self.conditional = conditional
+        self.step = step
+        self.edit = edit
+
+    def step_for(self, tool_args: Mapping[str, Any]) -> Optional[str]:
+        """Workflow step of a call to this tool, or None"""
+        for rule in self.conditional:
+            if rule.matches_args(tool_args):
+                return rule.step
+        return self.step
+
+    def edit_for(self, tool_args: Mapping[str, Any]) -> Optional[Tuple[str, str]]:
+        """(file_path, content) when a call to this tool writes a file, else None"""
+        if self.edit is None:
+            return None
+        path = tool_args.get(self.edit.path_field)
+        content = tool_args.get(self.edit.content_field)
+        return (path, content) if path and content else None
+
+
+class StepTable:
+    """
+    Compiled 'steps' and 'edit_capture' manifest sections
+
+    Rules are tried in order and the first match wins. A rule matches a
+    tool listed in 'tools' exactly or whose lowercased name contains one
+    of 'contains'; step rules with 'args' also need every named argument
+    to match its regex (e.g. a terminal command that runs the tests).
+    Each distinct tool name is resolved once into a ToolClass, so
+    classifying a call is a dict lookup plus, for tools with
+    argument-dependent steps, those regex checks. At most max_tools names
+    are remembered, oldest first out.
+    """
+
+    def __init__(self, steps: Optional[List[Dict[str, Any]]] = None,
+                 edit_capture: Optional[List[Dict[str, Any]]] = None, max_tools: int = 4096):
+        """Compile the tables; None selects the defaults"""
+        self.steps = tuple(compile_rule(e, 'steps') for e in (DEFAULT_STEPS if steps is None else steps))
+        for rule in self.steps:
+            if not rule.step:
+                raise ValueError(f"steps entry for {sorted(rule.tools) or list(rule.contains)} has no 'step'")
+        self.edit_capture = tuple(compile_rule(e, 'edit_capture')
+                                  for e in (DEFAULT_EDIT_CAPTURE if edit_capture is None else edit_capture))
+        self.max_tools = max_tools
+        self._classes: Dict[str, ToolClass] = {}
+
+    @classmethod
+    def from_rules(cls, rules: Mapping[str, Any]) -> 'StepTable':
+        return cls(rules.get('steps'), rules.get('edit_capture'))
+
+    def lookup(self, tool_name: str) -> ToolClass:
+        """The ToolClass of tool_name, resolved on first use"""
+        tool_class = self._classes.get(tool_name)
+        if tool_class is None:
+            tool_class = self._resolve(tool_name)
+            if len(self._classes) >= self.max_tools:
+                self._classes.pop(next(iter(self._classes)), None)
+            self._classes[tool_name] = tool_class
+        return tool_class
+
+    def _resolve(self, tool_name: str) -> ToolClass:
+        lowered = tool_name.lower()
+        conditional = []
+        step = None
+        for rule in self.steps:
+            if not rule.matches_name(tool_name, lowered):
+                continue
+            if not rule.args:
+                step = rule.step
+                break
+            conditional.append(rule)
+        edit = next((rule for rule in self.edit_capture if rule.matches_name(tool_name, lowered)), None)
+        return ToolClass(tuple(conditional), step, edit)
+
+    def step(self, tool_name: str, tool_args: Mapping[str, Any]) -> Optional[str]:
+        return self.lookup(tool_name).step_for(tool_args)
+
+    def edit_target(self, tool_name: str, tool_args: Mapping[str, Any]) -> Optional[Tuple[str, str]]:
+        return self.lookup(tool_name).edit_for(tool_args)
+
+    def __len__(self) -> int:
+        """Number of tool names currently resolved"""
+        return len(self._classes)
@@ -0,0 +1,581 @@
+"""
+Structural Matcher for VAP
+In-process evaluation of simple semgrep rules over TypeScript and JavaScript
+"""
+
+import os
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+from js_syntax import Node, ParseError, iter_nodes, parse_module, parse_pattern
+
+# semgrep language names, and the file extensions each one scans
+LANGUAGES = {'typescript': 'ts', 'ts': 'ts', 'javascript': 'js', 'js': 'js'}
+EXTENSIONS = {'.ts': 'ts', '.js': 'js', '.mjs': 'js', '.cjs': 'js'}
+# Scanned by semgrep but not parsed here (JSX): rules touching them need the process
+UNPARSED_EXTENSIONS = ('.tsx', '.jsx')
+# Directories and files semgrep skips when the target has no .semgrepignore
+IGNORED_DIRECTORIES = frozenset({'node_modules', 'build', 'dist', 'vendor', 'test', 'tests', '.semgrep',
+                                 '.semgrep_logs', '.npm', '.yarn', '.env', '.venv', '.tox'})
+IGNORED_SUFFIXES = ('.min.js',)
+# semgrep's default --max-target-bytes
+MAX_TARGET_BYTES = 1_000_000
+RULE_KEYS = frozenset({'id', 'message', 'severity', 'languages', 'metadata', 'fix', 'pattern', 'patterns',
+                       'pattern-either'})
+# Pattern node kinds the matcher implements
+PATTERN_KINDS = frozenset({'name', 'metavar', 'ellipsis', 'anystr', 'str', 'num', 'member', 'index', 'call', 'new',
+                           'binary', 'unary', 'template'})
+
+
+class UnsupportedRule(ValueError):
+    """A rule that uses semgrep features outside the in-process subset"""
+
+
+# Constant propagation lattice: a string value, a string of unknown value, a number
+# (a ('num', literal) pair, which only ever matters when concatenated) or not a constant
+ANY_STRING = '\0any string\0'
+NOT_CONSTANT = object()
+
+
+def _merge(a, b):
+    if a is None:
+        return b
+    if b is None or a == b:
+        return a
+    if isinstance(a, str) and isinstance(b, str):
+        return ANY_STRING
+    return NOT_CONSTANT
+
+
+def _constant(value):
+    return value if isinstance(value, (str, tuple)) else None
+
+
+def _known(value):
+    return NOT_CONSTANT if value is None else value
+
+
+def _merge_envs(*envs: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(envs[0])
+    for env in envs[1:]:
+        for name, value in env.items():
+            merged[name] = _merge(merged.get(name), value)
+    return merged
+
+
+def _concat(a, b):
+    if _constant(a) is None or _constant(b) is None or not (isinstance(a, str) or isinstance(b, str)):
+        return None
+    if ANY_STRING in (a, b):
+        return ANY_STRING
+    return (a if isinstance(a, str) else a[1]) + (b if isinstance(b, str) else b[1])
+
+
+class ConstantPropagation:
+    """
+    Marks every expression whose value is a known string, the way
+    semgrep's constant propagation does: literals, constant-only templates,
+    concatenations and conditionals, and variables holding one at that
+    point of the function. Branches merge (two different strings are
+    still a string, anything else is not a constant), loops run to a
+    fixpoint, and a nested function sees the outer variables that are
+    never reassigned. Declarations are scoped to the function, not the
+    block.
+    """
+
+    def __init__(self, tree: Node):
+        self.assignments: Dict[str, int] = {}
+        for node in iter_nodes(tree):
+            if node.kind == 'decl' and node.value:
+                self._count(node.value)
+            elif node.kind == 'destructure':
+                for name in node.value:
+                    self._count(name)
+            elif node.kind in ('assign', 'update') and node.kids[0].kind == 'name':
+                self._count(node.kids[0].value)
+        self.run(tree, {})
+
+    def _count(self, name: str):
+        self.assignments[name] = self.assignments.get(name, 0) + 1
+
+    def run(self, node: Optional[Node], env: Dict[str, Any]) -> Dict[str, Any]:
+        """Propagate through node, returning the environment after it"""
+        if node is None:
+            return env
+        kind = node.kind
+        handler = getattr(self, '_' + kind, None)
+        if handler is not None:
+            return handler(node, env)
+        for kid in node.kids:
+            env = self.run(kid, env)
+        node.const = None
+        return env
+
+    def _str(self, node, env):
+        node.const = node.value
+        return env
+
+    def _num(self, node, env):
+        node.const = ('num', node.value)
+        return env
+
+    def _cast(self, node, env):
+        # semgrep sees through casts when matching but does not propagate through them
+        env = self.run(node.kids[0], env)
+        node.const = None
+        return env
+
+    def _cond(self, node, env):
+        for kid in node.kids:
+            env = self.run(kid, env)
+        a, b = node.kids[1].const, node.kids[2].const
+        node.const = _merge(a, b) if isinstance(a, str) and isinstance(b, str) else None
+        return env
+
+    def _template(self, node, env):
+        value = ''
+        for i, sub in enumerate(node.kids):
+            env = self.run(sub, env)
+            value = _concat(_concat(value, node.value[i]), sub.const)
+        node.const = _concat(value, node.value[-1])
+        return env
+
+    def _name(self, node, env):
+        node.const = _constant(env.get(node.value))
+        return env
+
+    def _binary(self, node, env):
+        env = self.run(node.kids[0], env)
+        env = self.run(node.kids[1], env)
+        node.const = _concat(node.kids[0].const, node.kids[1].const) if node.value == '+' else None
+        return env
+
+    def _assign(self, node, env):
+        target, value = node.kids
+        if target.kind != 'name':
+            env = self.run(target, env)
+        env = self.run(value, env)
+        node.const = value.const if node.value == '=' else None
+        if target.kind == 'name':
+            env = dict(env)
+            if node.value == '=':
+                env[target.value] = _known(value.const)
+            elif node.value == '+=':
+                env[target.value] = _known(_concat(env.get(target.value), value.const))
+            else:
+                env[target.value] = NOT_CONSTANT
+        else:
+            env = self._unbind(env, [n.value for n in iter_nodes(target) if n.kind == 'name'])
+        return env
+
+    def _update(self, node, env):
+        env = self.run(node.kids[0], env)
+        node.const = None
+        if node.kids[0].kind == 'name':
+            env = self._unbind(env, [node.kids[0].value])
+        return env
+
+    def _decl(self, node, env):
+        if node.kids:
+            env = self.run(node.kids[0], env)
+        if node.value:
+            env = dict(env)
+            if not node.kids:
+                env.pop(node.value, None)
+            elif node.kids[0].kind in ('func', 'class'):
+                env[node.value] = NOT_CONSTANT
+            else:
+                env[node.value] = _known(node.kids[0].const)
+        return env
+
+    def _destructure(self, node, env):
+        for kid in node.kids:
+            env = self.run(kid, env)
+        return self._unbind(env, node.value)
+
+    @staticmethod
+    def _unbind(env, names):
+        env = dict(env)
+        for name in names:
+            env[name] = NOT_CONSTANT
+        return env
+
+    def _inherited(self, env):
+        return {name: value for name, value in env.items()
+                if _constant(value) is not None and self.assignments.get(name, 0) <= 1}
+
+    def _func(self, node, env):
+        *defaults, body = node.kids
+        inner = self._unbind(self._inherited(env), node.value)
+        for default in defaults:
+            inner = self.run(default, inner)
+        self.run(body, inner)
+        node.const = None
+        return env
+
+    def _class(self, node, env):
+        inner = self._inherited(env)
+        for member in node.kids:
+            self.run(member, inner)
+        return env
+
+    def _if(self, node, env):
+        test, cons, alt = node.kids
+        env = self.run(test, env)
+        return _merge_envs(self.run(cons, env), self.run(alt, env))
+
+    def _loop(self, node, env):
+        init, test, update, body = node.kids
+        env = self.run(init, env)
+        state = env
+        for _ in range(4):
+            after = self.run(update, self.run(body, self.run(test, state)))
+            merged = _merge_envs(env, after)
+            if merged == state:
+                break
+            state = merged
+        return state
+
+    def _switch(self, node, env):
+        env = self.run(node.kids[0], env)
+        outcomes = [env]
+        state = env
+        for case in node.kids[1:]:
+            state = _merge_envs(env, state)
+            for kid in case.kids:
+                state = self.run(kid, state)
+            outcomes.append(state)
+        return _merge_envs(*outcomes)
+
+    def _try(self, node, env):
+        block, param, handler, final = node.kids
+        after = self.run(block, env)
+        if handler is not None:
+            caught = self.run(handler, self.run(param, _merge_envs(env, after)))
+            after = _merge_envs(after, caught)
+        return self.run(final, after)
+
+
+@dataclass(frozen=True)
+class StructuralMatch:
+    """A rule match; lines and columns are 1-based and end_col is exclusive, as semgrep reports them"""
+    rule_id: str
+    line: int
+    col: int
+    end_line: int
+    end_col: int
+
+
+def _node_key(node: Node):
+    """Structural identity, for metavariables bound more than once"""
+    return (node.kind, node.value, tuple(_node_key(k) for k in node.kids if k is not None))
+
+
+def _plus_chain(node: Node) -> List[Node]:
+    """Operands of a left-nested chain of '+' (semgrep matches such chains associatively)"""
+    operands = []
+    while node.kind == 'binary' and node.value == '+':
+        operands.append(node.kids[1])
+        node = node.kids[0]
+    operands.append(node)
+    operands.reverse()
+    return operands
+
+
+_WILDCARD = object()
+
+
+def _template_items(node: Node, pattern: bool) -> list:
+    items: list = []
+    for i, quasi in enumerate(node.value):
+        if pattern:
+            for j, piece in enumerate(quasi.split('...')):
+                if j:
+                    items.append(_WILDCARD)
+                items.extend(piece)
+        else:
+            items.extend(quasi)
+        if i < len(node.kids):
+            items.append(node.kids[i])
+    return items
+
+
+def match(p: Node, t: Node, binds: Dict[str, Node]) -> Iterator[Dict[str, Node]]:
+    """Yield the metavariable bindings of every way pattern p matches node t"""
+    while t.kind == 'cast':
+        t = t.kids[0]
+    kind = p.kind
+    if kind == 'ellipsis':
+        yield binds
+    elif kind == 'metavar':
+        bound = binds.get(p.value)
+        if bound is None:
+            yield {**binds, p.value: t}
+        elif _node_key(bound) == _node_key(t):
+            yield binds
+    elif kind == 'anystr':
+        if isinstance(t.const, str):
+            yield binds
+    elif kind == 'str':
+        if t.const == p.value:
+            yield binds
+    elif kind in ('name', 'num'):
+        if t.kind == kind and t.value == p.value:
+            yield binds
+    elif kind == 'member':
+        if t.kind == 'member' and t.value == p.value:
+            yield from match(p.kids[0], t.kids[0], binds)
+    elif kind == 'index':
+        if t.kind == 'index':
+            for b in match(p.kids[0], t.kids[0], binds):
+                yield from match(p.kids[1], t.kids[1], b)
+    elif kind in ('call', 'new'):
+        if t.kind == kind:
+            for b in match(p.kids[0], t.kids[0], binds):
+                yield from _match_sequence(p.kids[1:], t.kids[1:], b, 0)
+    elif kind == 'unary':
+        if t.kind == 'unary' and t.value == p.value:
+            yield from match(p.kids[0], t.kids[0], binds)
+    elif kind == 'binary':
+        if t.kind != 'binary' or t.value != p.value:
+            return
+        if p.value != '+':
+            for b in match(p.kids[0], t.kids[0], binds):
+                yield from match(p.kids[1], t.kids[1], b)
+            return
+        yield from _match_sequence(_plus_chain(p), _plus_chain(t), binds, 1)
+    elif kind == 'template':
+        if t.kind == 'template':
+            yield from _match_items(_template_items(p, True), _template_items(t, False), binds)
+
+
+def _match_sequence(ps: Sequence[Node], ts: Sequence[Node], binds, least: int) -> Iterator[Dict[str, Node]]:
+    """Match patterns to nodes in order; an ellipsis covers at least `least` nodes"""
+    if not ps:
+        if not ts:
+            yield binds
+        return
+    head, rest = ps[0], ps[1:]
+    if head.kind == 'ellipsis':
+        for k in range(least, len(ts) + 1):
+            yield from _match_sequence(rest, ts[k:], binds, least)
+    elif ts:
+        for b in match(head, ts[0], binds):
+            yield from _match_sequence(rest, ts[1:], b, least)
+
+
+def _match_items(ps: list, ts: list, binds) -> Iterator[Dict[str, Node]]:
+    """Match template characters and substitutions; a wildcard covers any run of either"""
+    if not ps:
+        if not ts:
+            yield binds
+        return
+    head = ps[0]
+    if head is _WILDCARD:
+        for k in range(len(ts) + 1):
+            yield from _match_items(ps[1:], ts[k:], binds)
+    elif not ts:
+        return
+    elif isinstance(head, str):
+        if ts[0] == head:
+            yield from _match_items(ps[1:], ts[1:], binds)
+    elif isinstance(ts[0], Node):
+        for b in match(head, ts[0], binds):
+            yield from _match_items(ps[1:], ts[1:], b)
+
+
+class Formula:
+    """pattern / patterns / pattern-either / pattern-not, evaluated at one node"""
+
+    def __init__(self, op: str, pattern: Optional[Node] = None, children: Tuple['Formula', ...] = ()):
+        self.op = op
+        self.pattern = pattern
+        self.children = children
+
+    def holds(self, node: Node) -> bool:
+        if self.op == 'pattern':
+            return next(match(self.pattern, node, {}), None) is not None
+        if self.op == 'either':
+            return any(c.holds(node) for c in self.children)
+        if self.op == 'not':
+            return not self.children[0].holds(node)
+        return all(c.holds(node) for c in self.children)
+
+    def roots(self) -> Optional[set]:
+        """Node kinds a match can start at, or None for any"""
+        if self.op == 'pattern':
+            kind = self.pattern.kind
+            return None if kind in ('metavar', 'ellipsis', 'anystr', 'str') else {kind}
+        if self.op == 'not':
+            return set()
+        if self.op == 'either':
+            kinds: set = set()
+            for c in self.children:
+                sub = c.roots()
+                if sub is None:
+                    return None
+                kinds |= sub
+            return kinds
+        positive = [c.roots() for c in self.children if c.op != 'not']
+        known = [k for k in positive if k is not None]
+        return set.intersection(*known) if known else None
+
+    def words(self) -> Optional[List[frozenset]]:
+        """
+        Identifiers a file needs for a match: all the words of at least one
+        of the returned sets, or None if the formula needs no particular word
+        """
+        if self.op == 'pattern':
+            names = frozenset(n.value for n in iter_nodes(self.pattern) if n.kind in ('name', 'member'))
+            return [names] if names else None
+        if self.op == 'not':
+            return None
+        if self.op == 'either':
+            alternatives: List[frozenset] = []
+            for c in self.children:
+                sub = c.words()
+                if sub is None:
+                    return None
+                alternatives.extend(sub)
+            return alternatives
+        return next((w for w in (c.words() for c in self.children) if w is not None), None)
+
+
+def _compile_pattern(text: Any, rule_id: str) -> Node:
+    if not isinstance(text, str):
+        raise UnsupportedRule(f"rule {rule_id}: pattern must be a string")
+    try:
+        tree = parse_pattern(text)
+    except ParseError as e:
+        raise UnsupportedRule(f"rule {rule_id}: cannot parse pattern {text.strip()!r}: {e}") from e
+    for node in iter_nodes(tree):
+        if node.kind not in PATTERN_KINDS:
+            raise UnsupportedRule(f"rule {rule_id}: unsupported {node.kind} in pattern {text.strip()!r}")
+        if node.kind == 'str' and node.value.startswith('=~/'):
+            raise UnsupportedRule(f"rule {rule_id}: regex strings are not supported")
+    return tree
+
+
+def _compile_formula(key: str, value: Any, rule_id: str) -> Formula:
+    if key == 'pattern':
+        return Formula('pattern', _compile_pattern(value, rule_id))
+    if key == 'pattern-not':
+        inner = _compile_formula('pattern', value, rule_id) if isinstance(value, str) else _compile_item(value, rule_id)
+        return Formula('not', children=(inner,))
+    if key in ('patterns', 'pattern-either'):
+        if not isinstance(value, list) or not value:
+            raise UnsupportedRule(f"rule {rule_id}: {key} must be a non-empty list")
+        children = tuple(_compile_item(item, rule_id) for item in value)
+        if key == 'pattern-either':
+            if any(c.op == 'not' for c in children):
+                raise UnsupportedRule(f"rule {rule_id}: pattern-not inside pattern-either")
+            return Formula('either', children=children)
+        if all(c.op == 'not' for c in children):
+            raise UnsupportedRule(f"rule {rule_id}: patterns needs a positive pattern")
+        return Formula('and', children=children)
+    raise UnsupportedRule(f"rule {rule_id}: {key} is not supported in process")
+
+
+def _compile_item(item: Any, rule_id: str) -> Formula:
+    if not isinstance(item, Mapping) or len(item) != 1:
+        raise UnsupportedRule(f"rule {rule_id}: expected a single pattern operator, got {item!r}")
+    (key, value), = item.items()
+    return _compile_formula(key, value, rule_id)
+
+
+@dataclass
+class CompiledRule:
+    id: str
+    languages: frozenset
+    formula: Formula
+    roots: Optional[set]
+    words: Optional[List[frozenset]]
+
+    def may_match(self, content: str) -> bool:
+        """False when content lacks the identifiers every match needs"""
+        return self.words is None or any(all(w in content for w in alt) for alt in self.words)
+
+
+def compile_rule(rule: Mapping[str, Any]) -> CompiledRule:
+    """Compile a semgrep rule, raising UnsupportedRule if it is outside the supported subset"""
+    rule_id = str(rule.get('id', '?'))
+    extra = set(rule) - RULE_KEYS
+    if extra:
+        raise UnsupportedRule(f"rule {rule_id}: {', '.join(sorted(extra))} not supported in process")
+    languages = rule.get('languages') or []
+    if not languages or any(lang not in LANGUAGES for lang in languages):
+        raise UnsupportedRule(f"rule {rule_id}: languages {languages} not supported in process")
+    operators = [key for key in ('pattern', 'patterns', 'pattern-either') if key in rule]
+    if len(operators) != 1:
+        raise UnsupportedRule(f"rule {rule_id}: needs exactly one of pattern, patterns, pattern-either")
+    formula = _compile_formula(operators[0], rule[operators[0]], rule_id)
+    return CompiledRule(rule_id, frozenset(LANGUAGES[lang] for lang in languages), formula, formula.roots(),
+                        formula.words())
+
+
+def semgrep_ignores(path: str) -> bool:
+    """Whether semgrep's default ignore list or target selection skips path"""
+    parts = path.replace('\\', '/').split('/')
+    return any(part in IGNORED_DIRECTORIES for part in parts[:-1]) or parts[-1].endswith(IGNORED_SUFFIXES)
+
+
+class StructuralMatcher:
+    """
+    Evaluates semgrep rules written with pattern, patterns, pattern-either,
+    pattern-not, metavariables and '...' without running semgrep
+
+    Files are parsed by js_syntax and every expression is checked against
+    each rule at that node: the positive patterns must all match there
+    and no pattern-not may. "..." matches any constant string, including
+    variables and concatenations that constant propagation resolves, and
+    a chain of '+' matches associatively, as in semgrep. Constructing a
+    matcher raises UnsupportedRule for anything else, so a caller can fall
+    back to the semgrep process. Results follow semgrep's target selection
+    for the rule languages, except .tsx and .jsx, which handles() rejects.
+    """
+
+    def __init__(self, rules: Sequence[Mapping[str, Any]]):
+        self.rules = [compile_rule(rule) for rule in rules]
+        self.languages = frozenset(lang for rule in self.rules for lang in rule.languages)
+
+    def handles(self, path: str) -> bool:
+        """Whether scan() gives semgrep's results for path"""
+        return not (path.endswith(UNPARSED_EXTENSIONS) and not semgrep_ignores(path))
+
+    def language_of(self, path: str) -> Optional[str]:
+        if semgrep_ignores(path):
+            return None
+        if path.endswith('.d.ts'):
+            return 'ts'
+        return EXTENSIONS.get(os.path.splitext(path)[1])
+
+    def scan(self, path: str, content: str) -> List[StructuralMatch]:
+        """Matches of every rule in one file, ordered by position"""
+        language = self.language_of(path)
+        rules = [r for r in self.rules if language in r.languages and r.may_match(content)]
+        if not rules or len(content.encode('utf-8', 'replace')) > MAX_TARGET_BYTES:
+            return []
+        tree = parse_module(content)
+        ConstantPropagation(tree)
+        nodes = list(iter_nodes(tree))
+        found: Dict[Tuple[str, int, int], Node] = {}
+        for rule in rules:
+            for node in nodes:
+                if rule.roots is not None and node.kind not in rule.roots:
+                    continue
+                key = (rule.id, node.start, node.end)
+                if key not in found and rule.formula.holds(node):
+                    found[key] = node
+        if not found:
+            return []
+        line_starts = [0] + [m.end() for m in re.finditer('\n', content)]
+        located = [self._located(rule_id, node, line_starts) for (rule_id, _, _), node in found.items()]
+        return sorted(located, key=lambda m: (m.line, m.col, m.rule_id))
+
+    @staticmethod
+    def _located(rule_id: str, node: Node, line_starts: List[int]) -> StructuralMatch:
+        line = bisect_right(line_starts, node.start)
+        end_line = bisect_right(line_starts, node.end - 1) if node.end > node.start else line
+        return StructuralMatch(rule_id, line, node.start - line_starts[line - 1] + 1,
+                               end_line, node.end - line_starts[end_line - 1] + 1)
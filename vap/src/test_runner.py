@@ -4,49 +4,102 @@ Runs tests and validates agent behavior
 """
 
 import asyncio
+import copy
 import json
-from typing import Dict, Any, List, Optional
-from rule_validator import RuleValidator
-from mcp_interceptor import MCPToolCallMonitor
+from typing import TYPE_CHECKING, Dict, Any, Iterable, List, Optional, Tuple
+from rule_validator import RuleValidator, ValidationResult
+from mcp_interceptor import MCPToolCallMonitor, RetentionPolicy, FULL_RETENTION
+from result_cache import ResultCache
+from instrumentation import Instrumentation, DISABLED
+from manifest_loader import ManifestCache, MANIFESTS
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from semgrep_scanner import SemgrepScanner
+    from runtime_verifier import RuntimeVerifier
 
 
 class TestRunner:
     """Runs tests and generates reports"""
     
-    def __init__(self, rules_file: str):
-        """Initialize test runner with rules file"""
-        self.validator = RuleValidator(rules_file)
-        self.monitor = MCPToolCallMonitor(self.validator)
+    def __init__(self, rules_file: str, semgrep: Optional['SemgrepScanner'] = None, cache: Optional[ResultCache] = None,
+                 retention: RetentionPolicy = FULL_RETENTION, instrumentation: Instrumentation = DISABLED,
+                 manifests: ManifestCache = MANIFESTS, verifier: Optional['RuntimeVerifier'] = None):
+        """
+        Initialize test runner with rules file, an optional shared semgrep scanner, result cache and runtime verifier
+
+        With instrumentation enabled, every report gets an 'instrumentation'
+        section with the stage and constraint timings of its own session,
+        and instrumentation accumulates the totals over all sessions.
+        """
+        self.instrumentation = instrumentation
+        self.validator = RuleValidator(rules_file, semgrep=semgrep, cache=cache, instrumentation=instrumentation,
+                                       manifests=manifests, verifier=verifier)
+        self.retention = retention
+        self.monitor = MCPToolCallMonitor(self.validator, retention)
         self.rules_file = rules_file
+        self.manifests = manifests
     
-    async def run_test(self, tool_calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def run_test(self, tool_calls: Iterable[Dict[str, Any]], keep_intercepted: bool = True) -> Dict[str, Any]:
         """
-        Run a test with a list of tool calls
+        Run a test with a list (or any iterable, e.g. a stream) of tool calls
         
         Args:
-            tool_calls: List of dicts with 'tool_name' and 'tool_args' keys
+            tool_calls: Iterable of dicts with 'tool_name' and 'tool_args' keys
+            keep_intercepted: Keep every per-call result in 'intercepted_results';
+                disable when streaming long transcripts
         
         Returns:
             Test results dictionary
         """
-        # Start monitoring
-        self.monitor.start_monitoring()
-        
-        # Process each tool call
-        intercepted_results = []
-        for tool_call in tool_calls:
-            tool_name = tool_call['tool_name']
-            tool_args = tool_call.get('tool_args', {})
+        cache_before = self.validator.cache.stats()
+        intercepted_results = await self.replay(tool_calls, keep_intercepted)
+        return await self.finish(intercepted_results, cache_before)
+    
+    async def replay(self, tool_calls: Iterable[Dict[str, Any]], keep_intercepted: bool = True) -> List[Dict[str, Any]]:
+        """Feed tool calls through the monitor; returns the per-call results that were kept"""
+        # Session timings go to a fresh child of the runner's instrumentation
+        self.validator.instrumentation = self.instrumentation.child()
+        with self.validator.instrumentation.stage('replay'):
+            # Start monitoring
+            self.monitor.start_monitoring()
             
-            result = await self.monitor.handle_tool_call(tool_name, tool_args)
-            intercepted_results.append(result)
-        
-        # Stop monitoring and get results
-        self.monitor.stop_monitoring()
-        summary = self.monitor.get_summary()
-        final_result = self.monitor.get_final_result()
+            # Process each tool call
+            intercepted_results = []
+            for tool_call in tool_calls:
+                tool_name = tool_call['tool_name']
+                tool_args = tool_call.get('tool_args', {})
+                
+                result = await self.monitor.handle_tool_call(tool_name, tool_args)
+                if keep_intercepted:
+                    intercepted_results.append(result)
+            
+            # Stop monitoring once subscribers have seen every call
+            await self.monitor.stop_monitoring_async()
+        return intercepted_results
+    
+    async def finish(self, intercepted_results: List[Dict[str, Any]], cache_before: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the final (semgrep and red-team) checks of a replayed session and build its report"""
+        with self.validator.instrumentation.stage('finish'):
+            await self.monitor.interceptor.bus.flush()
+            final_result = await self.monitor.get_final_result_async()
+            summary = self.monitor.get_summary(final_result)
+        cache_after = self.validator.cache.stats()
         
-        # Build test report
+        return self._build_report(summary, final_result, intercepted_results, _cache_delta(cache_before, cache_after),
+                                  self.validator.edit_deltas(), self.validator.instrumentation)
+    
+    def fork(self) -> 'TestRunner':
+        """Runner for one more concurrent session, sharing compiled rules, scanner and cache"""
+        runner = copy.copy(self)
+        runner.validator = self.validator.fork()
+        runner.monitor = MCPToolCallMonitor(runner.validator, self.retention)
+        return runner
+    
+    def _build_report(self, summary: Dict[str, Any], final_result: ValidationResult,
+                      intercepted_results: List[Dict[str, Any]], cache: Dict[str, Any],
+                      file_edits: Dict[str, Dict[str, Any]], instrumentation: Instrumentation = DISABLED) -> Dict[str, Any]:
+        """Build the test report dictionary"""
         report = {
             'test_id': self.validator.rules.get('test_id', 'UNKNOWN'),
             'objective': self.validator.rules.get('objective', ''),
@@ -63,16 +116,104 @@ class TestRunner:
                     'message': v.message,
                     'penalty': v.penalty,
                     'tool_name': v.tool_name,
-                    'tool_args': v.tool_args
+                    'tool_args': dict(v.tool_args),
+                    **({'count': final_result.repeats[v.constraint_id]} if v.constraint_id in final_result.repeats else {})
                 }
                 for v in final_result.violations
             ],
             'tool_sequence': final_result.tool_call_sequence,
-            'intercepted_results': intercepted_results
+            'file_edits': file_edits,
+            'intercepted_results': intercepted_results,
+            'cache': cache
         }
-        
+        if final_result.scenarios:
+            report['scenarios'] = [s.to_dict() for s in final_result.scenarios]
+        if final_result.runtime_verification is not None:
+            report['runtime_verification'] = final_result.runtime_verification.to_dict()
+        if instrumentation.enabled:
+            report['instrumentation'] = instrumentation.snapshot()
         return report
     
+    async def run_tests(self, transcripts: Iterable[List[Dict[str, Any]]], concurrency: Optional[int] = None,
+                        semgrep_batch_size: int = 64, executor: Optional['Executor'] = None) -> List[Dict[str, Any]]:
+        """
+        Grade many transcripts concurrently
+        
+        Replaying tool calls, negative_regex checks and the red team are
+        CPU bound and run in a process pool (one compiled validator per
+        worker). Semgrep runs in batches of finished sessions as asyncio
+        subprocesses while the pool keeps grading. Every session has its own state.
+        Batched semgrep scans are timed in the runner's instrumentation totals
+        only, not in the per-session report sections.
+        
+        Args:
+            transcripts: Iterable of tool call lists, as accepted by run_test
+            concurrency: Number of worker processes (defaults to the CPU count)
+            semgrep_batch_size: Sessions merged into one semgrep invocation
+            executor: Optional executor to use instead of a new process pool
+        
+        Returns:
+            Test reports, in the order of transcripts
+        """
+        loop = asyncio.get_running_loop()
+        transcripts = list(transcripts)
+        reports: List[Optional[Dict[str, Any]]] = [None] * len(transcripts)
+        if executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+        pool = executor or ProcessPoolExecutor(max_workers=concurrency)
+        
+        async def grade(index: int, tool_calls: List[Dict[str, Any]]) -> Tuple[int, Dict[str, Any]]:
+            return index, await loop.run_in_executor(
+                pool, _grade_offline, self.rules_file, tool_calls, self.validator.cache.path, self.retention,
+                self.instrumentation.enabled, self.manifests.cache_dir
+            )
+        
+        try:
+            batch: List[Tuple[int, Dict[str, Any]]] = []
+            finishing = []
+            for next_done in asyncio.as_completed([grade(i, t) for i, t in enumerate(transcripts)]):
+                batch.append(await next_done)
+                if len(batch) >= semgrep_batch_size:
+                    finishing.append(asyncio.create_task(self._finish_batch(batch, reports)))
+                    batch = []
+            if batch:
+                finishing.append(asyncio.create_task(self._finish_batch(batch, reports)))
+            await asyncio.gather(*finishing)
+        finally:
+            if executor is None:
+                pool.shutdown()
+        
+        return reports
+    
+    async def _finish_batch(self, batch: List[Tuple[int, Dict[str, Any]]], reports: List[Optional[Dict[str, Any]]]):
+        """Run one semgrep pass (and the runtime verifications) over a batch of offline-graded sessions and build their reports"""
+        semgrep = await self.validator.scan_semgrep_batch_async({i: partial['file_edits'] for i, partial in batch})
+        sessions = []
+        for i, partial in batch:
+            session = self.validator.fork()
+            session.workflow_sequence = partial['workflow_sequence']
+            session.file_edits = partial['file_edits']
+            session.instrumentation = self.instrumentation.child()
+            session.instrumentation.merge(partial['instrumentation'])
+            sessions.append(session)
+        runtime = await asyncio.gather(*(session.verify_runtime() for session in sessions))
+        for (i, partial), session, verification in zip(batch, sessions, runtime):
+            final_result = session.calculate_final_score(
+                partial['violations'], semgrep_violations=semgrep[i], redteam_violations=partial['redteam_violations'],
+                runtime=verification
+            )
+            summary = partial['summary']
+            summary['validation_result'] = {
+                'score': final_result.score,
+                'security_score': final_result.security_score,
+                'workflow_score': final_result.workflow_score,
+                'pass_threshold': session.pass_threshold,
+                'passed': final_result.score >= session.pass_threshold,
+                'tool_sequence': final_result.tool_call_sequence
+            }
+            reports[i] = self._build_report(summary, final_result, partial['intercepted_results'], partial['cache'],
+                                            session.edit_deltas(), session.instrumentation)
+    
     def print_report(self, report: Dict[str, Any]):
         """Print a formatted test report"""
         print("\n" + "="*80)
@@ -88,6 +229,10 @@ class TestRunner:
         print(f"Workflow Score:   {report['workflow_score']:.2f} / 100.0")
         print(f"Pass Threshold:   {report['pass_threshold']}")
         print(f"Status:           {'PASSED ✓' if report['passed'] else 'FAILED ✗'}")
+        if len(report.get('scenarios', ())) > 1:
+            print("Scenarios:")
+            for scenario in report['scenarios']:
+                print(f"  {scenario['id']:<24} {scenario['score']:6.2f}  {'PASSED' if scenario['passed'] else 'FAILED'}")
         
         print(f"\n{'─'*80}")
         print("VIOLATIONS")
@@ -117,6 +262,8 @@ class TestRunner:
         summary = report['summary']
         print(f"Total Tool Calls: {summary['total_tool_calls']}")
         print(f"Total Violations: {summary['total_violations']}")
+        if 'cache' in report:
+            print(f"Cache Hits/Misses: {report['cache']['hits']} / {report['cache']['misses']}")
         print("\n" + "="*80 + "\n")
     
     async def run_example_test(self):
@@ -135,3 +282,57 @@ class TestRunner:
         report = await self.run_test(example_tool_calls)
         self.print_report(report)
         return report
+
+
+def _cache_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Cache counters accumulated between two ResultCache.stats() snapshots"""
+    return {
+        'hits': after['hits'] - before['hits'],
+        'disk_hits': after['disk_hits'] - before['disk_hits'],
+        'misses': after['misses'] - before['misses'],
+        'memory_entries': after['memory_entries'],
+    }
+
+
+# Per-process validators for run_tests workers, compiled once per rules file
+_worker_validators: Dict[str, RuleValidator] = {}
+
+
+def _grade_offline(rules_file: str, tool_calls: List[Dict[str, Any]], cache_path: Optional[str] = None,
+                   retention: RetentionPolicy = FULL_RETENTION, instrument: bool = False,
+                   manifest_cache_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Replay one transcript and run every check except semgrep (runs in a worker process)"""
+    validator = _worker_validators.get(rules_file)
+    if validator is None:
+        cache = ResultCache(path=cache_path) if cache_path else None
+        manifests = ManifestCache(cache_dir=manifest_cache_dir) if manifest_cache_dir else MANIFESTS
+        validator = _worker_validators[rules_file] = RuleValidator(rules_file, cache=cache, manifests=manifests)
+    session = validator.fork()
+    session.instrumentation = Instrumentation() if instrument else DISABLED
+    monitor = MCPToolCallMonitor(session, retention)
+    cache_before = session.cache.stats()
+    
+    async def replay() -> List[Dict[str, Any]]:
+        monitor.start_monitoring()
+        results = [
+            await monitor.handle_tool_call(call['tool_name'], call.get('tool_args', {}))
+            for call in tool_calls
+        ]
+        await monitor.stop_monitoring_async()
+        return results
+    
+    with session.instrumentation.stage('replay'):
+        intercepted_results = asyncio.run(replay())
+    redteam_violations = session._run_redteam_attack()
+    cache_after = session.cache.stats()
+    
+    return {
+        'summary': monitor.interceptor.get_summary(),
+        'intercepted_results': intercepted_results,
+        'violations': monitor.interceptor.all_violations,
+        'redteam_violations': redteam_violations,
+        'workflow_sequence': session.workflow_sequence,
+        'file_edits': session.file_edits,
+        'cache': _cache_delta(cache_before, cache_after),
+        'instrumentation': session.instrumentation.snapshot() if instrument else None
+    }
@@ -0,0 +1,142 @@
+"""
+Transcript Streaming for VAP
+Reads JSONL agent transcripts lazily and writes JSONL reports incrementally
+"""
+
+import dataclasses
+import json
+from collections.abc import Mapping
+from typing import Any, AsyncIterator, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_SESSION = 'default'
+
+# A session as produced by iter_sessions: (session_id, metadata, lazily read tool calls)
+Session = Tuple[str, Dict[str, Any], Iterator[Dict[str, Any]]]
+
+
+def parse_record(line: str, lineno: int) -> Optional[Dict[str, Any]]:
+    """Parse one JSONL line; None for a blank line"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"line {lineno}: invalid JSON ({e.msg})") from e
+    if not isinstance(record, dict):
+        raise ValueError(f"line {lineno}: expected a JSON object")
+    return record
+
+
+def iter_jsonl(stream: IO[str]) -> Iterator[Dict[str, Any]]:
+    """Yield one JSON object per non-blank line"""
+    for lineno, line in enumerate(stream, 1):
+        record = parse_record(line, lineno)
+        if record is not None:
+            yield record
+
+
+def _session_key(record: Dict[str, Any]) -> str:
+    return str(record.get('session_id', DEFAULT_SESSION))
+
+
+def _metadata(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in record.items() if k not in ('tool_calls', 'tool_name', 'tool_args', 'event')}
+
+
+def iter_sessions(records: Iterable[Dict[str, Any]]) -> Iterator[Session]:
+    """
+    Group transcript records into sessions without buffering them.
+
+    Two record shapes are accepted and may be mixed:
+      - one session per line: {"session_id": ..., "tool_calls": [...], ...}
+      - one tool call per line: {"session_id": ..., "tool_name": ..., "tool_args": {...}}
+        Consecutive calls with the same session_id form one session; an
+        optional {"session_id": ..., "event": "end"} record closes it early.
+
+    Each session's calls are read from the input as they are consumed; any
+    calls left unconsumed are skipped when the next session is requested.
+    """
+    records = iter(records)
+    pending: Optional[Dict[str, Any]] = None
+    while True:
+        if pending is not None:
+            record, pending = pending, None
+        else:
+            record = next(records, None)
+        if record is None:
+            return
+        if 'tool_calls' in record:
+            yield _session_key(record), _metadata(record), iter(record['tool_calls'])
+            continue
+        if record.get('event') == 'end':
+            continue
+
+        session_id = _session_key(record)
+
+        def calls(record: Optional[Dict[str, Any]] = record) -> Iterator[Dict[str, Any]]:
+            nonlocal pending
+            while record is not None:
+                if _session_key(record) != session_id or 'tool_calls' in record:
+                    pending = record
+                    return
+                if record.get('event') == 'end':
+                    return
+                if 'tool_name' in record:
+                    yield {'tool_name': record['tool_name'], 'tool_args': record.get('tool_args', {})}
+                record = next(records, None)
+
+        session_calls = calls()
+        yield session_id, _metadata(record), session_calls
+        for _ in session_calls:
+            pass
+
+
+async def aiter_sessions(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[str, Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    iter_sessions for a live connection: each session is yielded as soon as
+    it is known to be complete, with its calls buffered in a list.
+
+    A one-line session is complete at once; a session sent one call per
+    line is complete at its {"event": "end"} record, at the first record of
+    another session, or at the end of the stream.
+    """
+    current: Optional[Tuple[str, Dict[str, Any], List[Dict[str, Any]]]] = None
+    lineno = 0
+    async for line in lines:
+        lineno += 1
+        record = parse_record(line, lineno)
+        if record is None:
+            continue
+        if current is not None and ('tool_calls' in record or _session_key(record) != current[0]):
+            yield current
+            current = None
+        if 'tool_calls' in record:
+            yield _session_key(record), _metadata(record), list(record['tool_calls'])
+        elif record.get('event') == 'end':
+            if current is not None:
+                yield current
+                current = None
+        else:
+            if current is None:
+                current = (_session_key(record), _metadata(record), [])
+            if 'tool_name' in record:
+                current[2].append({'tool_name': record['tool_name'], 'tool_args': record.get('tool_args', {})})
+    if current is not None:
+        yield current
+
+
+def _to_jsonable(value: Any) -> Any:
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {f.name: getattr(value, f.name) for f in dataclasses.fields(value)}
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def write_report(out: IO[str], report: Dict[str, Any], session_id: Optional[str] = None):
+    """Write one report as a single JSONL line and flush it"""
+    if session_id is not None:
+        report = {'session_id': session_id, **report}
+    out.write(json.dumps(report, default=_to_jsonable) + '\n')
+    out.flush()
@@ -0,0 +1,145 @@
+"""
+Columnar Violation Export for VAP
+Dictionary-encoded, column-oriented storage of many violations
+"""
+
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Tuple
+
+if TYPE_CHECKING:
+    from rule_validator import Violation
+
+# Per-session fields kept next to the violation columns
+SESSION_FIELDS = ('agent', 'test_id', 'final_score', 'passed')
+
+
+class _Categories:
+    """String column stored as integer codes into a table of distinct values"""
+    __slots__ = ('values', 'codes', '_index')
+
+    def __init__(self, values: Iterable[str] = (), codes: Iterable[int] = ()):
+        self.values: List[str] = list(values)
+        self.codes = array('I', codes)
+        self._index: Dict[str, int] = {v: i for i, v in enumerate(self.values)}
+
+    def append(self, value: str):
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, row: int) -> str:
+        return self.values[self.codes[row]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'categories': self.values, 'codes': self.codes.tolist()}
+
+
+class ViolationColumns:
+    """
+    Violations of many sessions as parallel columns
+
+    constraint_id, tool_name and message are dictionary encoded, penalty and
+    session are plain integer arrays. A million violations take a few MB,
+    and the aggregation helpers work on the codes without materializing
+    Violation objects. sessions holds, per session index, the fields the
+    leaderboard aggregates by (agent, test id, score, passed) when the
+    columns were built from reports with add_report.
+    """
+
+    STRING_COLUMNS = ('constraint_id', 'tool_name', 'message')
+
+    def __init__(self):
+        self.constraint_id = _Categories()
+        self.tool_name = _Categories()
+        self.message = _Categories()
+        self.penalty = array('i')
+        self.session = array('I')
+        self.sessions: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_violations(cls, violations: Iterable['Violation'], session: int = 0) -> 'ViolationColumns':
+        columns = cls()
+        columns.extend(violations, session)
+        return columns
+
+    def append(self, violation: 'Violation', session: int = 0):
+        self.append_row(violation.constraint_id, violation.tool_name, violation.message, violation.penalty, session)
+
+    def append_row(self, constraint_id: str, tool_name: str, message: str, penalty: int, session: int = 0):
+        self.constraint_id.append(constraint_id)
+        self.tool_name.append(tool_name)
+        self.message.append(message)
+        self.penalty.append(penalty)
+        self.session.append(session)
+
+    def extend(self, violations: Iterable['Violation'], session: int = 0):
+        for v in violations:
+            self.append(v, session)
+
+    def add_report(self, report: Mapping[str, Any], agent: str) -> int:
+        """Add a TestRunner report as the next session; returns its session index"""
+        session = len(self.sessions)
+        self.sessions.append({'agent': agent, 'test_id': str(report.get('test_id', 'UNKNOWN')),
+                              'final_score': report['final_score'], 'passed': bool(report['passed'])})
+        for v in report.get('violations', []):
+            self.append_row(v['constraint_id'], v.get('tool_name', ''), v.get('message', ''),
+                            int(v.get('penalty', 0)), session)
+        return session
+
+    def __len__(self) -> int:
+        return len(self.penalty)
+
+    def row(self, i: int) -> Tuple[str, str, str, int, int]:
+        """(constraint_id, tool_name, message, penalty, session) of row i"""
+        return self.constraint_id[i], self.tool_name[i], self.message[i], self.penalty[i], self.session[i]
+
+    def counts_by_constraint(self) -> Dict[str, int]:
+        counts = [0] * len(self.constraint_id.values)
+        for code in self.constraint_id.codes:
+            counts[code] += 1
+        return {cid: n for cid, n in zip(self.constraint_id.values, counts) if n}
+
+    def penalty_by_constraint(self) -> Dict[str, int]:
+        totals = [0] * len(self.constraint_id.values)
+        for code, penalty in zip(self.constraint_id.codes, self.penalty):
+            totals[code] += penalty
+        return {cid: total for cid, total in zip(self.constraint_id.values, totals)}
+
+    def constraint_ids_by_session(self) -> Dict[int, List[str]]:
+        """Constraint ids of every session, in row order"""
+        sessions: Dict[int, List[str]] = {}
+        values = self.constraint_id.values
+        for session, code in zip(self.session, self.constraint_id.codes):
+            sessions.setdefault(session, []).append(values[code])
+        return sessions
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form (see from_dict)"""
+        data = {name: getattr(self, name).to_dict() for name in self.STRING_COLUMNS}
+        data['penalty'] = self.penalty.tolist()
+        data['session'] = self.session.tolist()
+        data['sessions'] = {name: [s[name] for s in self.sessions] for name in SESSION_FIELDS}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ViolationColumns':
+        columns = cls()
+        for name in cls.STRING_COLUMNS:
+            setattr(columns, name, _Categories(data[name]['categories'], data[name]['codes']))
+        columns.penalty = array('i', data['penalty'])
+        columns.session = array('I', data.get('session', [0] * len(data['penalty'])))
+        sessions = data.get('sessions') or {}
+        columns.sessions = [dict(zip(SESSION_FIELDS, row)) for row in zip(*(sessions.get(n, []) for n in SESSION_FIELDS))]
+        return columns
+
+    def save(self, path: str):
+        """Atomically write to_dict() as JSON"""
+        import json
+        import os
+        import tempfile
+        fd, tmp = tempfile.mkstemp(prefix='.columns-', dir=os.path.dirname(os.path.abspath(path)))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
@@ -0,0 +1,9 @@
+"""Puts vap/src on the import path, as the bench scripts and proctor do"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+REPO = Path(__file__).parent.parent.parent
+MANIFEST = REPO / 'vap_manifest.yaml'
@@ -0,0 +1,120 @@
+"""Enforce mode of VAPMCPMiddleware"""
+
+import asyncio
+
+import pytest
+import yaml
+
+from conftest import MANIFEST as MANIFEST_FILE
+from mcp_integration_example import VAPMCPMiddleware
+
+MANIFEST = {
+    'constraints': [
+        {'id': 'NO_EVAL', 'type': 'negative_regex', 'location': 'tool_calls.update_file.content', 'pattern': r'\beval\(',
+         'penalty': 10, 'message': 'eval() in a file write'},
+        {'id': 'TESTS_RUN', 'type': 'required_step', 'step': 'update_file', 'penalty': 10, 'message': 'No edit'},
+    ],
+    'scoring': {'pass_threshold': 0},
+}
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    path = tmp_path / 'manifest.yaml'
+    path.write_text(yaml.safe_dump(MANIFEST))
+    return str(path)
+
+
+def write(content):
+    return {'file_path': 'routes/search.ts', 'content': content}
+
+
+def test_blocked_write_is_not_recorded(manifest):
+    async def run():
+        middleware = VAPMCPMiddleware(manifest, mode='enforce', latency_budget_ms=1000)
+        blocked = await middleware.on_tool_call('update_file', write('eval(x)'))
+        await middleware.drain()
+        return middleware, blocked
+
+    middleware, blocked = asyncio.run(run())
+    assert not blocked['allowed'] and blocked['blocked_reason'] == 'constraint violation'
+    assert middleware.validator.file_edits == {}
+    assert middleware.validator.workflow_sequence == []
+    assert middleware.write_analyses == 0
+    report = middleware.get_report()
+    assert report['tool_calls'][0]['blocked'] is True
+    assert report['validation_result']['tool_sequence'] == []
+    assert report['total_violations'] == 1
+
+
+def test_allowed_write_is_recorded(manifest):
+    async def run():
+        middleware = VAPMCPMiddleware(manifest, mode='enforce', latency_budget_ms=1000)
+        result = await middleware.on_tool_call('update_file', write('safe()'))
+        await middleware.drain()
+        return middleware, result
+
+    middleware, result = asyncio.run(run())
+    assert result['allowed']
+    assert middleware.validator.file_edits == {'routes/search.ts': 'safe()'}
+    assert middleware.validator.workflow_sequence == ['update_file']
+
+
+def test_checks_over_budget_fall_back_to_observe(manifest):
+    async def run():
+        middleware = VAPMCPMiddleware(manifest, mode='enforce', latency_budget_ms=0)
+        result = await middleware.on_tool_call('update_file', write('eval(x)'))
+        await middleware.drain()
+        return middleware, result
+
+    middleware, result = asyncio.run(run())
+    assert result['allowed'] and result['over_budget']
+    assert [v.constraint_id for v in result['violations']] == ['NO_EVAL']
+    assert middleware.validator.file_edits == {'routes/search.ts': 'eval(x)'}
+    assert middleware.get_latency_stats()['budget_fallbacks'] == 1
+
+
+VULNERABLE = "module.exports = (req, res) => models.sequelize.query('SELECT * FROM Products WHERE name = ' + req.query.q)\n"
+FIXED = "module.exports = (req, res) => models.sequelize.query('SELECT * FROM Products WHERE name = ?', " \
+        "{ replacements: [req.query.q] })\n"
+
+
+def test_write_findings_reach_the_live_score():
+    async def run():
+        middleware = VAPMCPMiddleware(str(MANIFEST_FILE), mode='enforce', latency_budget_ms=1000)
+        await middleware.on_tool_call('update_file', write(VULNERABLE))
+        await middleware.drain()
+        doomed = middleware.validator.live_score()
+        refused = await middleware.on_tool_call('create_branch', {'branch_name': 'fix/sqli'})
+        return middleware, doomed, refused
+
+    middleware, doomed, refused = asyncio.run(run())
+    assert middleware.current_write_findings()
+    assert not doomed['can_still_pass']
+    assert not refused['allowed'] and refused['blocked_reason'] == 'pass threshold out of reach'
+
+
+def test_later_write_replaces_earlier_findings(tmp_path):
+    # A session that stays passable, so the fixing write is not refused
+    rules = yaml.safe_load(MANIFEST_FILE.read_text())
+    for c in rules['constraints']:
+        if c['type'] == 'semgrep_scan':
+            c['rules_file'] = str(MANIFEST_FILE.parent / c['rules_file'])
+    rules['scoring'] = {'pass_threshold': 0}
+    manifest = tmp_path / 'manifest.yaml'
+    manifest.write_text(yaml.safe_dump(rules))
+
+    async def run():
+        middleware = VAPMCPMiddleware(str(manifest), mode='enforce', latency_budget_ms=1000)
+        await middleware.on_tool_call('update_file', write(VULNERABLE))
+        await middleware.drain()
+        vulnerable = middleware.validator.scorer.security_penalties
+        await middleware.on_tool_call('update_file', write(FIXED))
+        await middleware.drain()
+        return middleware, vulnerable
+
+    middleware, vulnerable = asyncio.run(run())
+    assert vulnerable == 140
+    assert middleware.current_write_findings() == []
+    assert middleware.validator.scorer.security_penalties == 0
+    assert middleware.validator.live_score()['can_still_pass']
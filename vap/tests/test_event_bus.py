@@ -0,0 +1,83 @@
+"""Event delivery to interceptor subscribers across shutdown"""
+
+import asyncio
+import time
+
+from conftest import MANIFEST
+from mcp_interceptor import MCPToolCallMonitor
+from rule_validator import RuleValidator
+import test_runner
+
+CALLS = [{'tool_name': 'create_branch', 'tool_args': {'branch_name': f'fix/{i}'}} for i in range(20)]
+
+
+def slow_callback(seen):
+    def callback(tool_name, tool_args, violations):
+        time.sleep(0.002)
+        seen.append(tool_args['branch_name'])
+    return callback
+
+
+async def replay(monitor):
+    monitor.start_monitoring()
+    for call in CALLS:
+        await monitor.handle_tool_call(call['tool_name'], call['tool_args'])
+    await monitor.stop_monitoring_async()
+
+
+def test_stop_monitoring_async_delivers_every_call():
+    seen = []
+    monitor = MCPToolCallMonitor(RuleValidator(str(MANIFEST)))
+    monitor.interceptor.register_callback(slow_callback(seen))
+    asyncio.run(replay(monitor))
+    assert seen == [c['tool_args']['branch_name'] for c in CALLS]
+
+
+def test_stop_monitoring_after_the_loop_delivers_every_call():
+    seen = []
+    monitor = MCPToolCallMonitor(RuleValidator(str(MANIFEST)))
+    monitor.interceptor.register_callback(slow_callback(seen))
+
+    async def run():
+        monitor.start_monitoring()
+        for call in CALLS:
+            await monitor.handle_tool_call(call['tool_name'], call['tool_args'])
+
+    asyncio.run(run())
+    assert monitor.interceptor.bus.pending()
+    monitor.stop_monitoring()
+    assert sorted(seen) == sorted(c['tool_args']['branch_name'] for c in CALLS)
+
+
+def test_run_test_delivers_every_call():
+    seen = []
+    runner = test_runner.TestRunner(str(MANIFEST))
+    runner.monitor.interceptor.register_callback(slow_callback(seen))
+    asyncio.run(runner.run_test(CALLS))
+    assert seen == [c['tool_args']['branch_name'] for c in CALLS]
+
+
+def test_callback_sees_a_burst_larger_than_its_queue():
+    seen = []
+    monitor = MCPToolCallMonitor(RuleValidator(str(MANIFEST)))
+    subscription = monitor.interceptor.register_callback(lambda name, args, violations: seen.append(args['n']))
+    calls = subscription.max_queue + 200
+
+    async def run():
+        monitor.start_monitoring()
+        for n in range(calls):
+            await monitor.handle_tool_call('create_branch', {'branch_name': 'fix/burst', 'n': n})
+        await monitor.stop_monitoring_async()
+
+    asyncio.run(run())
+    assert seen == list(range(calls))
+    assert subscription.dropped == 0
+
+
+def test_register_callback_replaces_the_previous_one():
+    first, second = [], []
+    monitor = MCPToolCallMonitor(RuleValidator(str(MANIFEST)))
+    subscription = monitor.interceptor.register_callback(slow_callback(first))
+    assert monitor.interceptor.register_callback(slow_callback(second)) is subscription
+    asyncio.run(replay(monitor))
+    assert first == [] and second == [c['tool_args']['branch_name'] for c in CALLS]
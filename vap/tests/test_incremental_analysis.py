@@ -0,0 +1,129 @@
+"""Per-unit (incremental) semgrep scans and edit deltas against the repository"""
+
+import os
+
+import pytest
+
+from code_units import _OriginalFiles, read_original, scan_parts, split_units
+from conftest import MANIFEST
+from rule_validator import RuleValidator
+from semgrep_scanner import SemgrepScanner
+
+# The query string is a module-level constant; only constant propagation across units sees the injection
+CROSS_UNIT = """const models = require('../models/index')
+const sql = 'SELECT * FROM Products WHERE name LIKE '
+
+module.exports = function search () {
+  return (req, res) => {
+    models.sequelize.query(sql + req.query.q)
+  }
+}
+"""
+
+
+def grade(content, incremental):
+    validator = RuleValidator(str(MANIFEST), semgrep=SemgrepScanner(incremental=incremental, engine='structural'))
+    validator.validate_tool_call('update_file', {'file_path': 'routes/search.ts', 'content': content})
+    return validator.calculate_final_score([])
+
+
+def findings(result):
+    return sorted((v.constraint_id, v.tool_args.get('line')) for v in result.violations if v.tool_name == 'semgrep')
+
+
+def test_incremental_is_opt_in():
+    assert RuleValidator(str(MANIFEST)).incremental is False
+
+
+def test_module_level_constant_reaches_function_unit():
+    whole, incremental = grade(CROSS_UNIT, False), grade(CROSS_UNIT, True)
+    assert findings(whole) == [('SEMGREP_SQLI_CHECK', 6)]
+    assert findings(incremental) == findings(whole)
+    assert incremental.score == whole.score
+
+
+def test_declaration_findings_are_not_repeated_per_unit():
+    content = ("const models = require('../models/index')\n"
+               "const rows = models.sequelize.query('SELECT * FROM Users WHERE id = ' + process.argv[2])\n"
+               "\n"
+               "function a () { return 1 }\n"
+               "function b () { return 2 }\n")
+    assert findings(grade(content, True)) == findings(grade(content, False)) == [('SEMGREP_SQLI_CHECK', 2)]
+
+
+# A top-level template literal spans lines that look like the start of a new unit
+MULTILINE_TEMPLATE = """const models = require('../models/index')
+const base = `SELECT * FROM Products
+WHERE deletedAt IS NULL
+AND name LIKE `
+
+module.exports = function search () {
+  return (req, res) => { models.sequelize.query(base + req.query.q) }
+}
+"""
+
+
+def test_multiline_template_stays_in_one_unit():
+    whole, incremental = grade(MULTILINE_TEMPLATE, False), grade(MULTILINE_TEMPLATE, True)
+    assert findings(whole) == [('SEMGREP_SQLI_CHECK', 7)]
+    assert findings(incremental) == findings(whole)
+    assert [u.start_line for u in split_units(MULTILINE_TEMPLATE)] == [1, 2, 6]
+
+
+@pytest.mark.parametrize('content, starts', [
+    ("const a = 1\n/* block\nnot a unit */\nconst b = 2\n", [1, 2, 4]),
+    ("// leading comment\nfunction f () {}\n", [1, 2]),
+    ("const s = '(' \nconst t = 2\n", [1, 2]),
+    ("const r = /[(]/\nconst t = 2\n", [1, 2]),
+    ("const c = `${`\n}`}`\nconst t = 2\n", [1, 3]),
+])
+def test_unit_boundaries_skip_literals_and_comments(content, starts):
+    units = split_units(content)
+    assert [u.start_line for u in units] == starts
+    assert ''.join(u.text for u in units) == content
+
+
+def test_scan_parts_keep_file_line_numbers():
+    parts = scan_parts(CROSS_UNIT)
+    units = split_units(CROSS_UNIT)
+    assert len(parts) == len(units)
+    for (text, offset, first_line), unit in zip(parts, units):
+        own = text.splitlines(keepends=True)[first_line - 1:]
+        assert ''.join(own) == unit.text
+        assert first_line + offset == unit.start_line
+
+
+@pytest.mark.parametrize('path', ['/etc/passwd', '../../etc/passwd', 'routes/../../../etc/passwd'])
+def test_read_original_stays_inside_repo(tmp_path, path):
+    (tmp_path / 'routes').mkdir()
+    assert read_original(str(tmp_path), path) is None
+
+
+def test_read_original_rejects_symlink_out_of_repo(tmp_path):
+    outside = tmp_path / 'outside.txt'
+    outside.write_text('secret')
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    os.symlink(outside, repo / 'link.txt')
+    assert read_original(str(repo), 'link.txt') is None
+    (repo / 'inside.txt').write_text('ok')
+    assert read_original(str(repo), '/inside.txt') == 'ok'
+
+
+@pytest.mark.parametrize('args', [{'file_path': 'routes/search.ts', 'content': ['x']},
+                                  {'file_path': None, 'content': 'x'}])
+def test_non_string_edit_is_skipped(args):
+    validator = RuleValidator(str(MANIFEST))
+    assert validator.validate_tool_call('update_file', args) == []
+    assert validator.file_edits == {}
+    assert validator.edit_deltas() == {}
+    untouched = RuleValidator(str(MANIFEST)).calculate_final_score([])
+    assert validator.calculate_final_score([]).score == untouched.score
+
+
+def test_original_cache_is_bounded_by_size(tmp_path):
+    cache = _OriginalFiles(max_chars=10)
+    for name, text in (('a', 'x' * 6), ('b', 'y' * 6), ('big', 'z' * 50)):
+        (tmp_path / name).write_text(text)
+        assert cache.read(str(tmp_path / name)) == text
+    assert cache.chars == 6 and len(cache._files) == 1
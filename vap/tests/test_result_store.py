@@ -0,0 +1,79 @@
+"""ResultStore ingestion of report files"""
+
+import json
+import subprocess
+import sys
+
+from conftest import REPO
+from result_store import ResultStore
+
+
+def write_reports(path, scores, mode='w'):
+    with open(path, mode) as f:
+        for score in scores:
+            f.write(json.dumps({'agent_name': 'A', 'test_id': 'T', 'final_score': score, 'passed': score >= 80,
+                                'violations': []}) + '\n')
+
+
+def test_ingesting_a_file_again_adds_only_new_reports(tmp_path):
+    reports, db = tmp_path / 'reports.jsonl', str(tmp_path / 'results.db')
+    write_reports(reports, [50, 60, 70])
+    for expected in (3, 0, 0):
+        with ResultStore(db) as store:
+            assert store.ingest(str(reports)) == expected
+    write_reports(reports, [90], mode='a')
+    with ResultStore(db) as store:
+        assert store.ingest(str(tmp_path)) == 1
+        store.flush()
+        assert store.count() == 4
+
+
+def test_offsets_are_committed_with_their_reports(tmp_path):
+    reports, db = tmp_path / 'reports.jsonl', str(tmp_path / 'results.db')
+    write_reports(reports, range(10))
+    store = ResultStore(db, batch_size=4)
+    assert store.ingest(str(reports)) == 10
+    store.flush()
+    assert store.ingest(str(reports)) == 0
+    store.close()
+
+
+def test_replaced_file_is_read_from_the_start(tmp_path):
+    reports, db = tmp_path / 'reports.jsonl', str(tmp_path / 'results.db')
+    write_reports(reports, [50, 60])
+    with ResultStore(db) as store:
+        store.ingest(str(reports))
+    reports.unlink()
+    write_reports(reports, [70])
+    with ResultStore(db) as store:
+        assert store.ingest(str(reports)) == 1
+        store.flush()
+        assert store.count() == 3
+
+
+def test_leaderboard_rows_are_stored_and_unscored_reports_skipped(tmp_path):
+    reports = tmp_path / 'reports.jsonl'
+    rows = [{'agent_name': 'A', 'test_id': 'T', 'score': 72.0, 'passed': False, 'violations': [{'constraint_id': 'X'}]},
+            {'agent_name': 'A', 'test_id': 'T', 'error': 'timeout'},
+            {'agent_name': 'A', 'test_id': 'T', 'final_score': 90.0, 'passed': True, 'violations': []}]
+    reports.write_text(''.join(json.dumps(r) + '\n' for r in rows))
+    with ResultStore(str(tmp_path / 'results.db')) as store:
+        assert store.ingest(str(reports)) == 2
+        store.flush()
+        assert store.skipped == 1
+        assert sorted(r['final_score'] for _, r in store.results()) == [72.0, 90.0]
+        assert store.ingest(str(reports)) == 0 and store.skipped == 1
+
+
+def test_generate_leaderboard_counts_the_same_with_and_without_db(tmp_path):
+    reports = tmp_path / 'reports.jsonl'
+    reports.write_text(''.join(json.dumps(r) + '\n' for r in (
+        {'agent_name': 'A', 'test_id': 'T', 'score': 72.0, 'passed': False},
+        {'agent_name': 'A', 'test_id': 'T', 'error': 'timeout'})))
+    outputs = []
+    for extra in ([], ['--db', str(tmp_path / 'results.db')]):
+        proc = subprocess.run([sys.executable, str(REPO / 'generate_leaderboard.py'), str(reports),
+                               '--markdown', str(tmp_path / 'board.md'), *extra],
+                              capture_output=True, text=True, check=True)
+        outputs.append(proc.stderr.strip())
+    assert outputs[0] == outputs[1] == 'Read 2 new report(s), skipped 1 without a score; 1 agent/test row(s)'
@@ -0,0 +1,46 @@
+"""Bounded retention in ToolCallInterceptor"""
+
+import asyncio
+
+import yaml
+
+from mcp_interceptor import BOUNDED_RETENTION, FULL_RETENTION, MCPToolCallMonitor
+from rule_validator import RuleValidator
+
+MANIFEST = {
+    'constraints': [
+        {'id': 'NO_TODO', 'type': 'negative_regex', 'location': 'tool_calls.create_issue.body', 'pattern': 'TODO',
+         'penalty': 1, 'message': 'TODO in an issue'},
+        {'id': 'NO_SECRET_LEAK', 'type': 'negative_regex', 'location': 'tool_calls.create_issue.body',
+         'pattern': 'ghp_', 'penalty': 2, 'message': 'Token in an issue'},
+    ],
+}
+CALLS = ([('create_issue', {'body': 'TODO'})] * 30 + [('create_issue', {'body': 'ghp_x'})] * 12
+         + [('create_issue', {'body': 'fine'})])
+
+
+def replay(manifest, retention):
+    monitor = MCPToolCallMonitor(RuleValidator(manifest), retention)
+
+    async def run():
+        monitor.start_monitoring()
+        for name, args in CALLS:
+            await monitor.handle_tool_call(name, args)
+        monitor.stop_monitoring()
+        return await monitor.get_final_result_async()
+
+    return monitor, asyncio.run(run())
+
+
+def test_bounded_scores_like_full_from_a_tally(tmp_path):
+    manifest = tmp_path / 'manifest.yaml'
+    manifest.write_text(yaml.safe_dump(MANIFEST))
+    _, full = replay(str(manifest), FULL_RETENTION)
+    monitor, bounded = replay(str(manifest), BOUNDED_RETENTION)
+    assert (full.workflow_score, full.security_score) == (100 - 30, 100 - 24)
+    assert (bounded.score, bounded.security_score, bounded.workflow_score) == \
+        (full.score, full.security_score, full.workflow_score)
+    tally = monitor.interceptor.all_violations
+    assert {cid: n for cid, (_, n) in tally.items()} == {'NO_TODO': 30, 'NO_SECRET_LEAK': 12}
+    assert bounded.repeats == {'NO_TODO': 30, 'NO_SECRET_LEAK': 12}
+    assert len(bounded.violations) == 2 and len(full.violations) == 42
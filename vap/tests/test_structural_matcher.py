@@ -0,0 +1,147 @@
+"""In-process semgrep matching: when it falls back to the semgrep process, and constant propagation"""
+
+import json
+import sys
+
+import pytest
+
+import structural_matcher
+from conftest import REPO
+from js_syntax import ParseError
+from manifest_loader import load_yaml
+from semgrep_scanner import SemgrepScanner
+from structural_matcher import StructuralMatcher, UnsupportedRule
+
+RULES = REPO / 'vap_semgrep_rules.yaml'
+FIXTURES = REPO / 'vap' / 'bench' / 'fixtures' / 'semgrep'
+STUB = [sys.executable, str(REPO / 'vap' / 'tools' / 'semgrep_stub.py')]
+
+QUERY = "models.sequelize.query(q + x)"
+CONCATENATED = "function search (x) { return models.sequelize.query('SELECT ' + x) }\n"
+
+
+def bundled_rules():
+    return load_yaml(RULES.read_text())['rules']
+
+
+def lines(content, path='routes/search.ts'):
+    return [m.line for m in StructuralMatcher(bundled_rules()).scan(path, content)]
+
+
+def scanner(tmp_path, rules, engine='auto'):
+    rules_file = tmp_path / 'rules.yaml'
+    rules_file.write_text(json.dumps({'rules': rules}))
+    semgrep = SemgrepScanner(command=STUB, scratch_dir=str(tmp_path), engine=engine)
+    semgrep.register('SEMGREP_SQLI_CHECK', str(rules_file))
+    return semgrep
+
+
+@pytest.mark.parametrize('rule', [
+    {'pattern-regex': 'query\\('},
+    {'patterns': [{'pattern-inside': 'function $F(...) { ... }'}, {'pattern': '$M.sequelize.query(...)'}]},
+    {'pattern': '$M.sequelize.query("=~/SELECT.*/")'},
+    {'pattern-either': [{'pattern': '$M.query(...)'}, {'pattern-not': '$M.query("...")'}]},
+    {'patterns': [{'pattern-not': '$M.query("...")'}]},
+], ids=['pattern-regex', 'pattern-inside', 'regex-string', 'not-in-either', 'only-negative'])
+def test_unsupported_rule_falls_back_to_process(tmp_path, rule):
+    rules = [{'id': 'r', 'languages': ['typescript'], 'message': 'm', 'severity': 'ERROR', **rule}]
+    with pytest.raises(UnsupportedRule):
+        StructuralMatcher(rules)
+
+    auto = scanner(tmp_path, rules)
+    assert auto.active_engine == 'process'
+    auto.scan_sessions({'s': {'routes/search.ts': CONCATENATED}})
+    assert (auto.invocations, auto.structural_files) == (1, 0)
+
+    with pytest.raises(UnsupportedRule):
+        scanner(tmp_path, rules, engine='structural').active_engine
+
+
+def test_unsupported_language_falls_back_to_process(tmp_path):
+    rules = [{**bundled_rules()[0], 'languages': ['python']}]
+    assert scanner(tmp_path, rules).active_engine == 'process'
+
+
+@pytest.mark.parametrize('error', [ParseError('unexpected token', 0), RecursionError()])
+def test_unparsable_file_is_left_to_semgrep(tmp_path, monkeypatch, error):
+    def parse_module(content):
+        raise error
+
+    monkeypatch.setattr(structural_matcher, 'parse_module', parse_module)
+    semgrep = scanner(tmp_path, bundled_rules())
+    assert semgrep.active_engine == 'structural'
+    findings = semgrep.scan_sessions({'s': {'routes/search.ts': CONCATENATED}})
+    assert (semgrep.invocations, semgrep.structural_files) == (1, 0)
+    assert [f.line for f in findings['s']] == [1]
+
+
+def test_deep_nesting_is_left_to_semgrep(tmp_path):
+    nested = 'models.sequelize.query(' + '(' * 5000 + "'S'" + ')' * 5000 + ' + x)\n'
+    semgrep = scanner(tmp_path, bundled_rules())
+    semgrep.scan_sessions({'s': {'routes/deep.ts': nested}})
+    assert (semgrep.invocations, semgrep.structural_files) == (1, 0)
+
+
+@pytest.mark.parametrize('path', ['routes/search.tsx', 'frontend/src/app.jsx'])
+def test_tsx_and_jsx_go_to_semgrep(tmp_path, path):
+    assert not StructuralMatcher(bundled_rules()).handles(path)
+    semgrep = scanner(tmp_path, bundled_rules())
+    semgrep.scan_sessions({'s': {path: CONCATENATED, 'routes/search.ts': CONCATENATED}})
+    assert (semgrep.invocations, semgrep.structural_files) == (1, 1)
+
+
+@pytest.mark.parametrize('path', ['node_modules/x/index.tsx', 'test/component.jsx'])
+def test_ignored_tsx_and_jsx_stay_in_process(tmp_path, path):
+    matcher = StructuralMatcher(bundled_rules())
+    assert matcher.handles(path) and matcher.language_of(path) is None
+    semgrep = scanner(tmp_path, bundled_rules())
+    assert semgrep.scan_sessions({'s': {path: CONCATENATED}}) == {'s': []}
+    assert (semgrep.invocations, semgrep.structural_files) == (0, 1)
+
+
+# Expectations follow semgrep's output recorded in bench/fixtures/semgrep/constants.ts
+@pytest.mark.parametrize('source, matches', [
+    ("let q = 'S'; if (c) { q = 'T' } else { q = 'U' } " + QUERY, True),
+    ("let q = 'S'; if (c) { q = 'T' } " + QUERY, True),
+    ("let q = 'S'; if (c) { q = y } else { q = 'U' } " + QUERY, False),
+    ("let q; if (c) { q = 'T' } else { q = y } " + QUERY, False),
+    ("let q = 'S'; switch (c) { case 1: q = 'T'; break; default: q = 'U' } " + QUERY, True),
+    ("let q = 'S'; try { q = y } catch (e) { } " + QUERY, False),
+    ("const q = c ? 'S' : 'T'; " + QUERY, True),
+], ids=['both-branches', 'one-branch', 'non-constant-branch', 'unset-then-non-constant', 'switch', 'try',
+        'conditional'])
+def test_constant_propagation_merges_branches(source, matches):
+    assert bool(lines(source)) is matches
+
+
+@pytest.mark.parametrize('source, matches', [
+    ("let q = 'S'; while (c) { " + QUERY + "; q = y }", False),
+    ("let q = 'S'; while (c) { q = y } " + QUERY, False),
+    ("let q = 'S'; do { q = y } while (c); " + QUERY, False),
+    ("let q = 'S'; for (let i = 0; i < 3; i++) { " + QUERY + "; q = 'T' }", True),
+    ("let q = 'S'; for (const q of xs) { " + QUERY + " }", False),
+    ("const q = 'S'; for (const y of xs) { " + QUERY + " }", True),
+], ids=['while-reassigned-after', 'while-reassigned-before', 'do-while', 'for-constant-reassigned', 'for-of-shadow',
+        'for-of-constant'])
+def test_constant_propagation_through_loops(source, matches):
+    assert bool(lines(source)) is matches
+
+
+@pytest.mark.parametrize('source, matches', [
+    ("let q = 'S'; function f() { " + QUERY + " }", True),
+    ("const q = 'S'; const f = () => " + QUERY, True),
+    ("let q = 'S'; function f() { " + QUERY + " } q = y", False),
+    ("let q = 'S'; q = 'T'; function f() { " + QUERY + " }", False),
+    ("const q = 'S'; function f(q) { " + QUERY + " }", False),
+    ("const q = 'S'; function f() { const q = y; " + QUERY + " }", False),
+    ("function f() { " + QUERY + " } const q = 'S'", False),
+], ids=['assigned-once', 'arrow', 'reassigned-later', 'reassigned-before', 'parameter-shadow', 'local-shadow',
+        'declared-after'])
+def test_constant_propagation_into_functions(source, matches):
+    assert bool(lines(source)) is matches
+
+
+def test_recorded_semgrep_parity():
+    recorded = json.loads((FIXTURES / 'semgrep_results.json').read_text())
+    expected = sorted(r['start']['line'] for r in recorded['results'] if r['path'] == 'constants.ts')
+    assert lines((FIXTURES / 'constants.ts').read_text(), 'constants.ts') == expected
@@ -0,0 +1,36 @@
+"""Columnar violation export and its leaderboard aggregation"""
+
+import json
+
+from leaderboard import Leaderboard
+from violation_columns import ViolationColumns
+
+REPORTS = [
+    {'agent': 'A', 'test_id': 'T', 'final_score': 40.0, 'passed': False,
+     'violations': [{'constraint_id': 'X', 'penalty': 60}, {'constraint_id': 'Y', 'penalty': 10}]},
+    {'agent': 'A', 'test_id': 'T', 'final_score': 100.0, 'passed': True, 'violations': []},
+    {'agent': 'B', 'test_id': 'T', 'final_score': 90.0, 'passed': True, 'violations': [{'constraint_id': 'Y'}]},
+]
+
+
+def test_columns_aggregate_per_session_like_reports(tmp_path):
+    columns = ViolationColumns()
+    for report in REPORTS:
+        columns.add_report(report, report['agent'])
+    path = tmp_path / 'run.columns.json'
+    columns.save(str(path))
+
+    from_columns, from_reports = Leaderboard(), Leaderboard()
+    assert from_columns.ingest(str(path)) == 3
+    from_reports.add_all(REPORTS)
+    assert from_columns.rows() == from_reports.rows()
+    assert from_columns.ingest(str(path)) == 0
+
+
+def test_round_trip_keeps_sessions():
+    columns = ViolationColumns()
+    for report in REPORTS:
+        columns.add_report(report, report['agent'])
+    restored = ViolationColumns.from_dict(json.loads(json.dumps(columns.to_dict())))
+    assert restored.sessions == columns.sessions
+    assert restored.constraint_ids_by_session() == {0: ['X', 'Y'], 2: ['Y']}
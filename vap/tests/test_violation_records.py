@@ -0,0 +1,24 @@
+"""Violation records crossing process boundaries (TestRunner's worker pool)"""
+
+import pickle
+
+from rule_validator import EMPTY_ARGS, ArgRef, Violation
+
+
+def test_argref_pickles_only_its_field():
+    args = {'file_path': 'routes/search.ts', 'content': 'x' * 1_000_000}
+    violation = Violation('NO_SECRET', 'secret in path', 10, 'update_file', ArgRef(args, 'file_path'))
+    data = pickle.dumps(violation)
+    assert len(data) < 1000
+    restored = pickle.loads(data)
+    assert (restored.constraint_id, restored.tool_name) == ('NO_SECRET', 'update_file')
+    assert dict(restored.tool_args) == {'file_path': 'routes/search.ts'}
+
+
+def test_argref_to_a_missing_field_stays_empty():
+    restored = pickle.loads(pickle.dumps(ArgRef({'content': 'x'}, 'file_path')))
+    assert list(restored) == ['file_path'] and restored.get('file_path') is None
+
+
+def test_empty_args_stays_shared():
+    assert pickle.loads(pickle.dumps(EMPTY_ARGS)) is EMPTY_ARGS
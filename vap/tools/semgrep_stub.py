@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Offline semgrep stand-in for VAP tests and benchmarks
+
+Accepts the subset of the semgrep CLI used by SemgrepScanner
+(--config FILE --json TARGET...) and prints semgrep-shaped JSON.
+
+Matching is deliberately approximate: for every rule the call expression
+in front of the first '(' of its first pattern is turned into a regex
+(metavariables match any dotted name), and a line is reported when it
+calls that expression with a concatenated or interpolated argument.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import yaml
+from typing import Any, Dict, Iterator, List, Optional, Pattern
+
+EXTENSIONS = {'.ts', '.js', '.tsx', '.jsx', '.mjs', '.cjs', '.py'}
+DYNAMIC_ARGUMENT = re.compile(r"\+|\$\{")
+
+
+def first_pattern(rule: Dict[str, Any]) -> Optional[str]:
+    """Return the first positive 'pattern' found anywhere in a rule"""
+    stack: List[Any] = [rule]
+    while stack:
+        node = stack.pop(0)
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == 'pattern' and isinstance(value, str):
+                    return value
+                if key not in ('pattern-not', 'pattern-not-inside'):
+                    stack.append(value)
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+
+def callee_regex(pattern: str) -> Optional[Pattern]:
+    """Turn '$MODEL.sequelize.query(...)' into a regex for the call expression"""
+    callee = pattern.strip().split('(', 1)[0]
+    if not callee:
+        return None
+    parts = [r'[\w$]+(?:\.[\w$]+)*' if p.startswith('$') else re.escape(p) for p in callee.split('.')]
+    return re.compile(r'\.'.join(parts) + r'\s*\(')
+
+
+def iter_files(targets: List[str]) -> Iterator[str]:
+    for target in targets:
+        if os.path.isfile(target):
+            yield target
+            continue
+        for root, _, files in os.walk(target):
+            for name in sorted(files):
+                if os.path.splitext(name)[1] in EXTENSIONS:
+                    yield os.path.join(root, name)
+
+
+def scan(config: str, targets: List[str]) -> Dict[str, Any]:
+    with open(config, 'r') as f:
+        rules = (yaml.safe_load(f) or {}).get('rules', [])
+    compiled = [(rule, callee_regex(first_pattern(rule) or '')) for rule in rules]
+
+    results = []
+    for path in iter_files(targets):
+        with open(path, 'r', errors='replace') as f:
+            lines = f.read().splitlines()
+        for lineno, line in enumerate(lines, 1):
+            for rule, regex in compiled:
+                m = regex.search(line) if regex else None
+                if m and DYNAMIC_ARGUMENT.search(line, m.end()):
+                    results.append({
+                        'check_id': rule['id'],
+                        'path': path,
+                        'start': {'line': lineno, 'col': m.start() + 1},
+                        'end': {'line': lineno, 'col': len(line) + 1},
+                        'extra': {'message': rule.get('message', ''), 'severity': rule.get('severity', 'ERROR'),
+                                  'lines': line},
+                    })
+    return {'results': results, 'errors': [], 'version': 'stub'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline semgrep stand-in')
+    parser.add_argument('--config', required=True)
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('targets', nargs='*', default=['.'])
+    args, _ = parser.parse_known_args()
+
+    output = scan(args.config, args.targets)
+    print(json.dumps(output))
+    sys.exit(1 if output['results'] else 0)
+
+
+if __name__ == '__main__':
+    main()